@@ -0,0 +1,58 @@
+"""
+Stress test of the LeaseScheduler: Add, renew, cancel and expire 1M leases.
+The clock is paused while the leases are added, renewed and cancelled => No lease expires before it is measured.
+
+Usage: python -m benchmarks.leases [leases]
+"""
+import sys
+import threading
+import time
+
+import benchmarks
+from insalata.LeaseScheduler import LeaseScheduler
+
+LEASES = 1000000
+DURATION = 2 #Seconds until the leases expire
+
+def main(count):
+    scheduler = LeaseScheduler("benchmark")
+    expired = [0]
+    done = threading.Event()
+    remaining = count - count // 4 #The first quarter is cancelled
+
+    def expire():
+        expired[0] += 1
+        if expired[0] == remaining:
+            done.set()
+
+    scheduler.pauseClock()
+    start = time.perf_counter()
+    leases = [scheduler.schedule(DURATION, expire) for _ in range(count)]
+    print("add     {0:>9} leases {1:8.2f} s".format(count, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for lease in leases[count // 2:]:
+        lease.renew()
+    print("renew   {0:>9} leases {1:8.2f} s".format(count - count // 2, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for lease in leases[:count // 4]:
+        lease.cancel()
+    print("cancel  {0:>9} leases {1:8.2f} s".format(count // 4, time.perf_counter() - start))
+
+    time.sleep(DURATION + 1)
+    expiredWhilePaused = expired[0]
+    scheduler.resumeClock()
+    print("pause   {0:>9} expired while paused".format(expiredWhilePaused))
+
+    start = time.perf_counter()
+    done.wait(10 * DURATION)
+    print("expire  {0:>9} leases {1:8.2f} s after resuming, {2} pending".format(expired[0], time.perf_counter() - start,
+                                                                              scheduler.getLeaseCount()))
+    scheduler.stop()
+    if expiredWhilePaused != 0 or expired[0] != remaining:
+        print("FAILED: expected {0} expired leases and none while paused".format(remaining))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else LEASES)
@@ -0,0 +1,68 @@
+"""
+Memory used per object of the graph, measured with tracemalloc.
+
+Every object type is created count times in one graph, the difference of the traced memory is divided by count.
+Graph objects include their leases and the entries of the identity indexes, edges are measured by connecting
+hosts to interfaces.
+
+Usage: python -m benchmarks.memory [count]
+"""
+import gc
+import sys
+import tracemalloc
+
+import benchmarks
+from insalata.model.Graph import Graph
+from insalata.LeaseScheduler import LeaseScheduler
+
+COUNT = 20000 #Objects created of every type
+
+def mac(i):
+    return "00:16:3e:{0:02x}:{1:02x}:{2:02x}".format(i >> 16 & 255, i >> 8 & 255, i & 255)
+
+def address(i):
+    return "10.{0}.{1}.{2}".format(i >> 16 & 255, i >> 8 & 255, i & 255)
+
+def measure(count, create):
+    """
+    Create count objects and measure the memory they keep.
+
+    :returns: Bytes per object and the created objects
+    :rtype: tuple
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [create(i) for i in range(count)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count, objects
+
+def main(count):
+    graph = Graph("memory")
+    location = graph.getOrCreateLocation("location", "benchmark", 600)
+    results = list()
+
+    size, hosts = measure(count, lambda i: graph.getOrCreateHost("host{0}".format(i), "benchmark", 600, location))
+    results.append(("Host", size))
+    size, interfaces = measure(count, lambda i: graph.getOrCreateInterface(mac(i), "benchmark", 600))
+    results.append(("Interface", size))
+    size, _ = measure(count, lambda i: graph.getOrCreateLayer3Address(address(i), "benchmark", 600))
+    results.append(("Layer3Address", size))
+    size, _ = measure(count, lambda i: graph.getOrCreateRoute("benchmark", 600, hosts[i], "10.0.{0}.0".format(i & 255), "255.255.255.0", address(i)))
+    results.append(("Route", size))
+    size, _ = measure(count, lambda i: hosts[i].addInterface(interfaces[i], "benchmark", 600))
+    results.append(("Edge", size))
+    scheduler = LeaseScheduler("memory")
+    size, _ = measure(count, lambda i: scheduler.schedule(600, print))
+    results.append(("Lease", size))
+
+    print("{0:>14} {1:>10}   ({2} objects)".format("type", "bytes", count))
+    for name, size in results:
+        print("{0:>14} {1:>10.0f}".format(name, size))
+    scheduler.stop()
+    graph.stop()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else COUNT)
@@ -0,0 +1,83 @@
+"""
+Soak test of subscribing and cancelling handlers of the graph events.
+
+Every round subscribes short-lived consumers to the objectChanged event and to topics of the graph while a host
+is changed. Half of the subscriptions are cancelled, the others are weak and dropped with their consumer.
+After every round the number of handlers has to be back at its start and the traced memory has to stay
+within a bound => Neither cancelled tokens nor collected handlers accumulate.
+
+Usage: python -m benchmarks.soak [rounds] [subscriptions per round]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+import benchmarks
+from insalata.model.Graph import Graph
+from insalata.model.Host import Host
+
+ROUNDS = 20
+SUBSCRIPTIONS = 10000
+GROWTH = 256 * 1024 #Bytes the traced memory may grow after the first round
+
+class Consumer:
+    def __init__(self):
+        self.events = 0
+
+    def handle(self, sender, args):
+        self.events += 1
+
+def handlers(graph):
+    """
+    Get the number of handlers of the graph events and topics.
+    """
+    counts = graph.getStats()["handlers"]
+    return counts["objectChanged"], counts["topics"]
+
+def churn(graph, host, count):
+    consumers = list()
+    for i in range(count):
+        consumer = Consumer()
+        if i % 2 == 0:
+            graph.getObjectChangedEvent().subscribe(consumer.handle).cancel()
+            graph.subscribe(consumer.handle, types={Host}, members={"cpu"}).cancel()
+        else: #Dropped with the consumer
+            graph.getObjectChangedEvent().subscribe(consumer.handle, weak=True)
+            graph.subscribe(consumer.handle, types={Host}, members={"cpu"}, weak=True)
+            consumers.append(consumer)
+        if i % 100 == 0:
+            host.setCPUs(i + 1, "benchmark", 600)
+            if len(consumers) > 100:
+                del consumers[:50]
+
+def main(rounds, count):
+    graph = Graph("soak")
+    host = graph.getOrCreateHost("host", "benchmark", 600)
+    start = handlers(graph)
+
+    tracemalloc.start()
+    base = None
+    failed = False
+    print("{0:>5} {1:>8} {2:>8} {3:>10} {4:>10}".format("round", "changed", "topics", "memory KB", "subs/s"))
+    for round in range(rounds):
+        begin = time.perf_counter()
+        churn(graph, host, count)
+        elapsed = time.perf_counter() - begin
+        gc.collect()
+        current = tracemalloc.get_traced_memory()[0]
+        if base is None:
+            base = current
+        counts = handlers(graph)
+        print("{0:>5} {1:>8} {2:>8} {3:>10.1f} {4:>10.0f}".format(round, counts[0], counts[1], (current - base) / 1024, 2 * count / elapsed))
+        if counts != start or current - base > GROWTH:
+            failed = True
+    tracemalloc.stop()
+    graph.stop()
+
+    if failed:
+        print("Handlers or memory not bounded: {0} handlers at the start, growth limit {1} KB".format(start, GROWTH // 1024))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS, int(sys.argv[2]) if len(sys.argv) > 2 else SUBSCRIPTIONS)
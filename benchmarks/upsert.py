@@ -0,0 +1,55 @@
+"""
+Cost of an upsert (getOrCreate* of an existing object) depending on the size of the graph.
+
+The cost per upsert shall stay flat from 100 to 100k objects as the graph looks objects up in its identity indexes.
+
+Usage: python -m benchmarks.upsert [sizes...]
+"""
+import sys
+import time
+
+import benchmarks
+from insalata.model.Graph import Graph
+
+SIZES = (100, 1000, 10000, 100000)
+UPSERTS = 10000 #Upserts measured for every size
+
+def mac(i):
+    return "00:16:3e:{0:02x}:{1:02x}:{2:02x}".format(i >> 16 & 255, i >> 8 & 255, i & 255)
+
+def address(i):
+    return "10.{0}.{1}.{2}".format(i >> 16 & 255, i >> 8 & 255, i & 255)
+
+def measure(size):
+    """
+    Fill a graph with size hosts, interfaces and addresses and measure upserts of existing objects.
+
+    :returns: Microseconds per upsert by object type
+    :rtype: dict
+    """
+    graph = Graph("upsert")
+    location = graph.getOrCreateLocation("location", "benchmark", 600)
+    for i in range(size):
+        graph.getOrCreateHost("host{0}".format(i), "benchmark", 600, location)
+        graph.getOrCreateInterface(mac(i), "benchmark", 600)
+        graph.getOrCreateLayer3Address(address(i), "benchmark", 600)
+
+    results = dict()
+    for name, upsert in (("Host", lambda i: graph.getOrCreateHost("host{0}".format(i), "benchmark", 600, location)),
+                         ("Interface", lambda i: graph.getOrCreateInterface(mac(i), "benchmark", 600)),
+                         ("Layer3Address", lambda i: graph.getOrCreateLayer3Address(address(i), "benchmark", 600))):
+        start = time.perf_counter()
+        for k in range(UPSERTS):
+            upsert(k * 7919 % size)
+        results[name] = (time.perf_counter() - start) / UPSERTS * 1e6
+    graph.stop()
+    return results
+
+def main(sizes):
+    print("{0:>8} {1:>10} {2:>10} {3:>14}   (us per upsert)".format("objects", "Host", "Interface", "Layer3Address"))
+    for size in sizes:
+        results = measure(size)
+        print("{0:>8} {1:>10.2f} {2:>10.2f} {3:>14.2f}".format(size, results["Host"], results["Interface"], results["Layer3Address"]))
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
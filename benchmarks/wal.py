@@ -0,0 +1,74 @@
+"""
+Throughput of the WriteAheadLog: Write a log of a fixed number of records and recover a graph from it.
+
+Every record is one group commit of the changes made to hosts and interfaces since the previous one.
+The background commits are disabled => The log holds exactly the requested number of records.
+
+Usage: python -m benchmarks.wal [records] [hosts changed per record]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import benchmarks
+from insalata.model.Graph import Graph
+from insalata.model.WriteAheadLog import WriteAheadLog
+
+RECORDS = 1000
+CHANGES = 50 #Hosts changed in one record, each gets a new CPU count and a new interface
+HOSTS = 2000 #Hosts in the graph when the checkpoint is written
+
+def mac(i):
+    return "00:16:3e:{0:02x}:{1:02x}:{2:02x}".format(i >> 16 & 255, i >> 8 & 255, i & 255)
+
+def count(graph):
+    """
+    Get the number of hosts and of their interfaces.
+    """
+    hosts = graph.getHosts()
+    return len(hosts), sum(len(host.getInterfaces()) for host in hosts)
+
+def main(records, changes):
+    directory = tempfile.mkdtemp(prefix="insalata-wal-")
+    try:
+        path = os.path.join(directory, "graph.checkpoint")
+        graph = Graph("wal")
+        for i in range(HOSTS):
+            graph.getOrCreateHost("host{0}".format(i), "benchmark", 600)
+        log = WriteAheadLog(graph, path, fsyncInterval=3600, compactionSize=1 << 40)
+        log.start()
+
+        start = time.perf_counter()
+        n = 0
+        for record in range(records):
+            for _ in range(changes):
+                host = graph.getOrCreateHost("host{0}".format(n % HOSTS), "benchmark", 600)
+                host.setCPUs(record + 1, "benchmark", 600)
+                host.addInterface(graph.getOrCreateInterface(mac(n), "benchmark", 600), "benchmark", 600)
+                n += 1
+            log.flush()
+        written = time.perf_counter() - start
+        statistics = log.getStatistics()
+        log.stop()
+        expected = count(graph)
+        graph.stop()
+
+        recovered = Graph("wal")
+        result = WriteAheadLog(recovered, path).recover()
+        if result["records"] != records or count(recovered) != expected:
+            print("Recovered {0} of {1} records, (hosts, interfaces) {2} instead of {3}".format(result["records"], records,
+                  count(recovered), expected))
+            sys.exit(1)
+        recovered.stop()
+
+        print("{0} records, {1} mutations, {2:.1f} MB, {3:.2f} s in fsync".format(records, statistics["mutations"],
+              statistics["bytes"] / 1e6, statistics["syncTime"]))
+        print("write   {0:>10.0f} records/s {1:>10.0f} mutations/s".format(records / written, statistics["mutations"] / written))
+        print("recover {0:>10.0f} records/s {1:>10.0f} mutations/s".format(records / result["time"], result["mutations"] / result["time"]))
+    finally:
+        shutil.rmtree(directory, True)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RECORDS, int(sys.argv[2]) if len(sys.argv) > 2 else CHANGES)
@@ -1,5 +1,6 @@
 import os
 import queue
+import asyncio
 import configobj
 import datetime
 import traceback
@@ -7,16 +8,22 @@ import threading
 import importlib
 import time
 from configobj  import ConfigObj, ConfigObjError
-from queue import PriorityQueue
 from functools import partial
 #from threading import Thread
 from lxml import etree
 
 from insalata.Timer import Timer
+from insalata.JobQueue import JobQueue
 from insalata.model.Graph import Graph
+from insalata.model.EventDispatcher import EventDispatcher, DROP_OLDEST, DEFAULT_QUEUE_SIZE as DEFAULT_DISPATCH_QUEUE_SIZE
+from insalata.model.EventBatcher import EventBatcher, DEFAULT_BATCH_SIZE, DEFAULT_WINDOW
+from insalata.model.WriteAheadLog import WriteAheadLog, DEFAULT_FSYNC_INTERVAL, DEFAULT_SEGMENT_SIZE, DEFAULT_COMPACTION_SIZE
+from insalata.model.HistoryStore import HistoryStore, DEFAULT_KEYFRAME_INTERVAL, DEFAULT_RETENTION
 from insalata.builder.Builder import Builder
 from insalata.Logging import createLogger
 from insalata.scanner.Worker import Worker
+from insalata.scanner.AsyncGraph import AsyncGraph
+from insalata.scanner.CollectorExecutor import CollectorExecutor, DEFAULT_SIZE as DEFAULT_EXECUTOR_SIZE, DEFAULT_LIMIT as DEFAULT_COLLECTOR_LIMIT, DEFAULT_BLOCKING_SIZE
 from insalata.scanner.modules import XmlScanner
 from insalata.helper import diff
 from insalata.planning import planner
@@ -26,8 +33,13 @@ JOBS = 20
 PRIORITY = 5
 HIGHEST_PRIO = 1
 TIMEOUT = 30
-DEFAULT_QUEUE_SIZE = 20
 CONFIG_FILE = "environment.conf"
+CHECKPOINT_FILE = "graph.checkpoint"
+CHECKPOINT_INTERVAL = 300 #Seconds between two checkpoints of the graph
+FREEZE_STOP = "stop" #Running collectors are stopped when the environment is frozen
+FREEZE_DRAIN = "drain" #Running and pending collectors are finished when the environment is frozen
+DRAIN_TIMEOUT = 60 #Seconds to wait for the collectors when draining, they are stopped afterwards
+BACKOFF = 2 #Factor the interval of an adaptive collector grows with after a run without changes
 
 class EnvironmentHandler(threading.Thread):
     """
@@ -65,16 +77,27 @@ class EnvironmentHandler(threading.Thread):
         self.globalLogger = globalLogger
 
         self.collectorModules = dict()
-        self.timers = dict()
+        self.timers = dict() #Collector -> Lease of the scheduler of the graph queueing its next run
+        self.intervals = dict() #Collector -> Current interval of an adaptive collector
+        self.changeCounts = dict() #Collector -> Changes of the graph counted for it when its last run finished
         self.workingSet = list()
 
         self.graph = Graph(self.name)
-        self.workers = list()
+        self.executor = None #CollectorExecutor running the collectors of this environment
+        self.freezeMode = FREEZE_STOP
+        self.drainTimeout = DRAIN_TIMEOUT
         self.__stopEvent = threading.Event()
 
         self.continuousExporters = dict()
+        self.eventDispatchers = dict() #Exporter -> EventDispatcher if the events are delivered asynchronously
+        self.eventBatchers = dict() #Exporter -> EventBatcher for exporters receiving batches
         self.triggeredExporters = dict()
         self.exportTrigger = dict()
+        self.history = None #HistoryStore of the graph if enabled in the configuration
+        self.checkpointPath = None #Checkpoint file of the graph if enabled in the configuration
+        self.checkpointInterval = CHECKPOINT_INTERVAL
+        self.checkpointTimer = None
+        self.mutationLog = None #WriteAheadLog of the graph if enabled in the configuration
 
         self.taskState = ""
 
@@ -86,7 +109,10 @@ class EnvironmentHandler(threading.Thread):
                 self.config["logSize"] if "logSize" in self.config else logSize,
                 self.config["backupCount"] if "backupCount" in self.config else backupCount)
 
-            self.queue = PriorityQueue(self.config["queueSize"] if "queueSize" in self.config else DEFAULT_QUEUE_SIZE)
+            self.queue = JobQueue() #At most one pending job per collector
+            self.initExecutor()
+            self.initCheckpoint()
+            self.initHistory()
 
             self.logger.info("Environment started!")
         except KeyError as e:
@@ -131,10 +157,13 @@ class EnvironmentHandler(threading.Thread):
                 self.logger.error("Error while initializing scanner.")
                 return
             self.initExporters()
+            if self.checkpointPath is not None and self.checkpointInterval > 0:
+                self.checkpointTimer = Timer(self.checkpointInterval, self.writeCheckpoint)
+                self.checkpointTimer.start()
             self.logger.info("Environment running...")
             while not self.__stopEvent.isSet():
                 try:
-                    _, interval, name = self.queue.get(True, TIMEOUT) #Priority is only used by queue
+                    _, interval, name = self.queue.get(TIMEOUT, self.executor.canAccept) #Jobs of busy collectors stay pending and can be coalesced
                     self.logger.debug("Starting collector module {}.".format(name))
                     if "config" not in self.config["modules"][name]:
                         self.logger.error("No configuration given for collector {0}.".format(name))
@@ -146,13 +175,13 @@ class EnvironmentHandler(threading.Thread):
                             self.logger.warning("Connection information for module {0} empty.".format(name))
                         connectionInfo["name"] = name
 
-                        #interval -1 means "No restart" 
-                        if interval != -1:
-                            self.timers[name] = Timer(int(interval), self.executeScan, [name])
-
-                        worker = Worker(partial(self.collectorModules[name], self.graph, connectionInfo ,self.logger), name, partial(self.finishedCallback, name, interval), self.logger)
-                        self.workers.append(worker)
-                        worker.start()
+                        if "maxInterval" in self.config["modules"][name]: #Adaptive => Its renewed verifications may be extended
+                            self.graph.recordVerifications(name)
+                        started = self.graph.getScheduler().now()
+                        module = self.collectorModules[name]
+                        graph = AsyncGraph(self.graph) if asyncio.iscoroutinefunction(module) else self.graph #Asynchronous collectors share one thread
+                        worker = Worker(partial(module, graph, connectionInfo ,self.logger), name, partial(self.finishedCallback, name, interval, started), self.logger)
+                        self.executor.submit(worker)
                 except ConfigObjError:
                     self.logger.error("Can not parse connectionInfo for module {0}: Path: {1}.".format(name, configPath))
                 except queue.Empty:
@@ -166,12 +195,12 @@ class EnvironmentHandler(threading.Thread):
         except Exception as e:
             self.logger.critical("Error in EnvironmentHandler: {}".format(str(e)))
 
-    def finishedCallback(self, module, interval, worker):
+    def finishedCallback(self, module, interval, started, worker):
         """
-        All Worker threads will call this method if their work is finished.
+        The executor calls this method if the work of a Worker is finished.
 
-        If the interval is -1 (no_restart) this method only removes the worker from the list of workers
-        If the interval != -1 the new timer for this collector module will be started (created by run method)
+        If the interval != -1 the timer of this collector module is re-armed as a lease of the scheduler of the graph
+        => It is paused while the environment is frozen.
 
         :param module: Collector module finished its work
         :type module: str
@@ -179,22 +208,174 @@ class EnvironmentHandler(threading.Thread):
         :param interval: Timer interval the module uses
         :type interval: int
 
-        :param worker: Worker thread which executed the collector module
+        :param started: Time on the clock of the lease scheduler the run was started at
+        :type started: float
+
+        :param worker: Worker which executed the collector module
         :type worker: insalata.scanner.Worker.Worker
         """
         if interval >= 0:
-            self.timers[module].start() # Start the timer if requested and the timer shall restart (no -1)
-        self.workers.remove(worker)
+            self.timers[module].cancel() #A lease still pending, e.g. for a job queued by hand, is replaced
+            self.timers[module] = self.graph.getScheduler().schedule(self.adaptInterval(module, started), self.executeScan, [module])
+
+    def adaptInterval(self, module, started):
+        """
+        Get the interval until the next run of a collector.
+
+        Collectors with a 'maxInterval' in their configuration are adaptive: The interval grows by the factor 'backoff'
+        up to maxInterval after every run that did not change the graph and falls back to 'interval' after a run with
+        changes. The verifications renewed by a run are extended by the time the interval exceeds 'interval'
+        => Objects do not expire because the collector runs less often.
+
+        :param module: Name of the collector
+        :type module: str
+
+        :param started: Time on the clock of the lease scheduler the run was started at
+        :type started: float
+
+        :returns: Interval in seconds
+        :rtype: float
+        """
+        config = self.config["modules"][module]
+        minimum = int(config["interval"])
+        if "maxInterval" not in config:
+            return minimum
+
+        count = self.graph.getChangeCount(module)
+        changes = count - self.changeCounts.get(module, 0)
+        self.changeCounts[module] = count
+        if changes > 0:
+            interval = minimum
+        else:
+            interval = min(int(config["maxInterval"]), self.intervals.get(module, minimum) * float(config.get("backoff", BACKOFF)))
+        if interval != self.intervals.get(module, minimum):
+            self.logger.debug("Interval of collector {0} is {1} seconds after {2} changes.".format(module, interval, changes))
+        self.intervals[module] = interval
+
+        self.graph.extendVerifications(module, interval - minimum, started) #Also drops the recorded verifications if the interval is not longer
+        return interval
+
+    def initExecutor(self):
+        """
+        Create the thread pool running the collector modules as configured in the section 'executor'.
+        """
+        executorConfig = self.config["executor"] if "executor" in self.config else {}
+        self.freezeMode = executorConfig.get("freeze", FREEZE_STOP)
+        if self.freezeMode not in (FREEZE_STOP, FREEZE_DRAIN):
+            self.logger.error("Unknown freeze mode '{0}'. Using '{1}'.".format(self.freezeMode, FREEZE_STOP))
+            self.freezeMode = FREEZE_STOP
+        self.drainTimeout = float(executorConfig.get("drainTimeout", DRAIN_TIMEOUT))
+        self.executor = CollectorExecutor(self.name, int(executorConfig.get("workers", DEFAULT_EXECUTOR_SIZE)), self.logger, self.queue.wake,
+                                          int(executorConfig.get("blockingWorkers", DEFAULT_BLOCKING_SIZE)))
+
+    def initCheckpoint(self):
+        """
+        Restore the graph from its checkpoint if enabled in the [checkpoint] section of the configuration.
+        Collectors started afterwards only confirm the restored objects instead of creating them again.
+        If the write-ahead log is enabled its records are replayed on top of the checkpoint and logging starts.
+        """
+        checkpointConfig = self.config["checkpoint"] if "checkpoint" in self.config else {}
+        if str(checkpointConfig.get("enabled", "false")).lower() not in ["true", "yes", "1"]:
+            return
+        self.checkpointPath = os.path.join(self.dataPath, checkpointConfig.get("file", CHECKPOINT_FILE))
+        self.checkpointInterval = int(checkpointConfig.get("interval", CHECKPOINT_INTERVAL))
+        logChanges = str(checkpointConfig.get("log", "false")).lower() in ["true", "yes", "1"]
+
+        try:
+            start = time.time()
+            if logChanges:
+                self.mutationLog = self.createMutationLog(checkpointConfig)
+                result = self.mutationLog.recover()
+                if result is not None:
+                    self.logger.info("Restored graph version {0} from checkpoint and {1} log records ({2} mutations) in {3:.2f} seconds.".format(
+                                        result["version"], result["records"], result["mutations"], result["time"]))
+            elif os.path.isfile(self.checkpointPath):
+                version = self.graph.loadCheckpoint(self.checkpointPath)
+                self.logger.info("Restored graph version {0} from checkpoint in {1:.2f} seconds.".format(version, time.time() - start))
+        except Exception as e:
+            self.logger.error("Cannot restore checkpoint {0}: {1}".format(self.checkpointPath, e))
+            self.graph.stop() #Start with an empty graph instead of a partially restored one
+            self.graph = Graph(self.name)
+            if logChanges:
+                self.mutationLog = self.createMutationLog(checkpointConfig)
+
+        if self.mutationLog is not None:
+            try:
+                self.mutationLog.start() #Writes a new checkpoint => The replayed segments are removed
+            except Exception as e:
+                self.logger.error("Cannot start write-ahead log: {0}".format(e))
+                self.mutationLog = None
+
+    def createMutationLog(self, checkpointConfig):
+        """
+        Create the write-ahead log of the graph.
+
+        :param checkpointConfig: [checkpoint] section of the configuration
+        :type checkpointConfig: dict
+        """
+        return WriteAheadLog(self.graph, self.checkpointPath, float(checkpointConfig.get("fsyncInterval", DEFAULT_FSYNC_INTERVAL)),
+                             int(checkpointConfig.get("segmentSize", DEFAULT_SEGMENT_SIZE)),
+                             int(checkpointConfig.get("compactionSize", DEFAULT_COMPACTION_SIZE)), self.logger)
+
+    def writeCheckpoint(self, reschedule=True):
+        """
+        Write the checkpoint of the graph and schedule the next one.
+        With the write-ahead log enabled the checkpoint replaces the segments of the log.
+
+        :param reschedule: Start the timer for the next checkpoint
+        :type reschedule: bool
+        """
+        try:
+            start = time.time()
+            if self.mutationLog is not None:
+                version = self.mutationLog.checkpoint()
+            else:
+                version = self.graph.saveCheckpoint(self.checkpointPath)
+            self.logger.debug("Wrote checkpoint of graph version {0} in {1:.2f} seconds.".format(version, time.time() - start))
+        except Exception as e:
+            self.logger.error("Cannot write checkpoint {0}: {1}".format(self.checkpointPath, e))
+        if reschedule and not self.__stopEvent.isSet():
+            self.checkpointTimer = Timer(self.checkpointInterval, self.writeCheckpoint)
+            self.checkpointTimer.start()
+
+    def initHistory(self):
+        """
+        Start recording the history of the graph if enabled in the [history] section of the configuration.
+        The history is started before any collector runs => All objects are recorded from their creation on.
+        """
+        historyConfig = self.config["history"] if "history" in self.config else {}
+        if str(historyConfig.get("enabled", "false")).lower() not in ["true", "yes", "1"]:
+            return
+        try:
+            self.history = HistoryStore(self.graph, int(historyConfig.get("keyframeInterval", DEFAULT_KEYFRAME_INTERVAL)),
+                                        float(historyConfig.get("retention", DEFAULT_RETENTION)))
+            self.logger.debug("Recording history of the graph.")
+        except ValueError as e:
+            self.logger.error("Invalid history configuration: {0}".format(e))
 
     def initExporters(self):
         # Continuous
+        dispatchConfig = self.config["eventDispatch"] if "eventDispatch" in self.config else {}
+        asynchronous = dispatchConfig.get("mode", "sync") == "async"
         if "continuousExporters" in self.config.keys():
             for exporter in (self.config["continuousExporters"] if isinstance(self.config["continuousExporters"], list) else [self.config["continuousExporters"]]):
                 try:
                     module = importlib.import_module("insalata.export.continuous.{0}".format(exporter))
                     self.logger.debug(str(module))
-                    self.continuousExporters[exporter] = getattr(module, "Exporter")(self.graph.getObjectNewEvent(), self.graph.getObjectDeletedEvent(),
-                                                                                        self.graph.getObjectChangedEvent(), self.logger, self.dataPath)
+                    events = [self.graph.getObjectNewEvent(), self.graph.getObjectDeletedEvent(), self.graph.getObjectChangedEvent()]
+                    if getattr(module, "BATCHED", False): #The batcher delivers with its own thread and bounds its buffer like a dispatcher
+                        batcher = EventBatcher(exporter, *events, maxSize=int(dispatchConfig.get("batchSize", DEFAULT_BATCH_SIZE)),
+                                                window=float(dispatchConfig.get("batchWindow", DEFAULT_WINDOW)), logger=self.logger,
+                                                queueSize=int(dispatchConfig.get("queueSize", DEFAULT_DISPATCH_QUEUE_SIZE)),
+                                                policy=dispatchConfig.get("overflow", DROP_OLDEST), holdsLock=self.graph.holdsLock)
+                        self.eventBatchers[exporter] = batcher
+                        events = [batcher.getBatchEvent()]
+                    elif asynchronous: #One queue and delivery thread for each exporter
+                        dispatcher = EventDispatcher(exporter, int(dispatchConfig.get("queueSize", DEFAULT_DISPATCH_QUEUE_SIZE)),
+                                                        dispatchConfig.get("overflow", DROP_OLDEST), self.logger, self.graph.holdsLock)
+                        self.eventDispatchers[exporter] = dispatcher
+                        events = [dispatcher.wrap(event) for event in events]
+                    self.continuousExporters[exporter] = getattr(module, "Exporter")(*events, self.logger, self.dataPath)
                     self.logger.debug("Added continuous exporter {0}.".format(exporter))
                 except ImportError:
                     self.logger.error("No exporter {0}.py in insalata.export.continuous!".format(exporter))
@@ -203,6 +384,9 @@ class EnvironmentHandler(threading.Thread):
                     self.logger.debug(str(e))
                     self.logger.error("No class 'Exporter' in module {0}!".format(exporter))
                     continue
+                except ValueError as e:
+                    self.logger.error("Invalid event dispatch configuration: {0}".format(e))
+                    continue
 
         # Triggered
         if "triggeredExporters" in self.config.keys():
@@ -228,9 +412,8 @@ class EnvironmentHandler(threading.Thread):
                     continue
 
     def startTriggeredExporter(self, exporter, interval, configuration=None):
-        graph = self.graph
-        if configuration:
-            graph = Graph.copy(configuration)
+        #Both copy every selected object (O(n)), a snapshot is shared with other readers of the same version
+        graph = self.graph.copy(configuration) if configuration else self.graph.snapshot()
         self.triggeredExporters[exporter](self.dataPath, graph)
         self.exportTrigger[exporter] = Timer(interval, partial(self.startTriggeredExporter, exporter, interval))
 
@@ -264,6 +447,7 @@ class EnvironmentHandler(threading.Thread):
             try:
                 module = importlib.import_module("insalata.scanner.modules.{0}".format(collectorType))
                 self.collectorModules[collectorName] = getattr(module, "scan")
+                self.executor.setLimit(collectorName, int(config.get("maxConcurrent", DEFAULT_COLLECTOR_LIMIT)))
             except ImportError:
                 self.logger.error("No module {0}.py!".format(collectorType))
                 continue
@@ -296,8 +480,9 @@ class EnvironmentHandler(threading.Thread):
         """
         This method initializes the scanning schedule.
         The scanning interval for each scanner will be loaded and a timer for each scanning-module
-        will be launched.
+        will be launched. The timers are leases of the scheduler of the graph => They pause with the graph.
         """
+        scheduler = self.graph.getScheduler()
 
         for collectorName in self.collectorModules.keys():
             config = self.config["modules"][collectorName]
@@ -307,12 +492,8 @@ class EnvironmentHandler(threading.Thread):
             interval = int(config["interval"] if "interval" in config else -1)
             if interval == -1:
                 self.logger.warning("No intervall/ interval -1 defined for collector module {0}. This module will be started only once!".format(collectorName))
-                self.queue.put((PRIORITY, interval, collectorName), True, TIMEOUT)
-                self.timers[collectorName] = None
-            else:
-                self.timers[collectorName] = Timer(int(interval), self.executeScan, [collectorName])
-        for timer in self.timers.keys():
-            self.timers[timer].start()
+                self.queue.put(collectorName, PRIORITY, interval)
+            self.timers[collectorName] = scheduler.schedule(interval, self.executeScan, [collectorName]) #Never expires if -1
         return True
 
     def executeScan(self, collectorName):
@@ -327,9 +508,8 @@ class EnvironmentHandler(threading.Thread):
 
             interval = int(self.config["modules"][collectorName]["interval"])
 
-            self.queue.put((PRIORITY, interval, collectorName), True, TIMEOUT)
-        except queue.Full:
-            self.logger.error("Queue is full. Not able to add scanner {0}.".format(collectorName))
+            if not self.queue.put(collectorName, PRIORITY, interval):
+                self.logger.debug("Scanner {0} is already pending.".format(collectorName))
         except KeyError as e:
             self.logger.error("Missing interval for module {0}. Key: {1}".format(collectorName, e.args[0]))
 
@@ -411,17 +591,15 @@ class EnvironmentHandler(threading.Thread):
         self.logger.info("Next job is a full scan.")
         for timer in self.timers.keys():
             self.timers[timer].cancel()
-        try:
-            for module in self.collectorModules.keys():
-                self.queue.put((HIGHEST_PRIO, -1, module), True, TIMEOUT)
-        except queue.Full:
-            self.logger.error("Job queue is full. Not able to enqueue full scan.")
+        for module in self.collectorModules.keys():
+            self.queue.put(module, HIGHEST_PRIO, -1) #Pending jobs of the module are raised to the highest priority
 
     def applyConfig(self, newConfigFileName):
         """
         Apply a given configuration to the environment.
-        This method processes the new configuration, freezes this environment and copies the relevant part.
+        This method processes the new configuration and copies the relevant part of the environment (O(n) in its objects).
         Afterwards a new thread will be launched whichruns planning and setup itself.
+        The collectors keep running => The graph follows the changes of the setup.
 
         :param newConfigFileName: Name of the previously uploaded configuration containing the configuration to setup
         :type newConfigFileName: str
@@ -432,8 +610,6 @@ class EnvironmentHandler(threading.Thread):
             
             startTime = datetime.datetime.now()
             self.logger.info("Starting setup at {0}".format(startTime.strftime("%d.%b.%Y %H.%M.%S")))
-            self.logger.info("Freezing Environment '{0}'".format(self.getName()))
-            self.freezeEnvironment()
 
             newConfigPath = os.path.join(self.dataPath, newConfigFileName)
             id = etree.parse(newConfigPath).getroot().attrib["name"]
@@ -443,9 +619,9 @@ class EnvironmentHandler(threading.Thread):
             newGraph = Graph(id)
             XmlScanner.scan(newGraph, {"name" : "applyLogger", "file" : newConfigPath}, self.logger, None)
 
-            #get current graph
+            #get current graph => Detached copy, the collectors do not change it during diff and planning
             currentGraph = self.graph.copy(id)
-            
+
             diff.resolveGraph(newGraph)
             diff.resolveGraph(currentGraph)
             diffDict = diff.diff(newGraph, currentGraph)
@@ -462,7 +638,6 @@ class EnvironmentHandler(threading.Thread):
     def runSetup(self, newGraph, currentGraph, diffDict, startTime):
         """
         Run the planner and setup the new configuration.
-        Afterwards the environment will be unfreezed.
 
         :param newGraph: Graph to deploy on the environment
         :type newGraph: insalata.model.Graph.Graph
@@ -509,55 +684,149 @@ class EnvironmentHandler(threading.Thread):
                 self.logger.error("{0}: {1}".format(type(e), traceback.format_exc()))
                 self.logger.error("Error while executing step '{0}'".format(cmd[0].__name__))
 
-        try:
-            self.taskState = "Finished setup started at '{0}'.".format(time.strftime("%d.%b.%Y %H:%M:%S", initTime))
-            self.logger.info(self.taskState)
-            self.unfreezeEnvironment()
-        except Exception as e:
-                self.logger.error("{0}: {1}".format(type(e), traceback.format_exc()))
+        self.taskState = "Finished setup started at '{0}'.".format(time.strftime("%d.%b.%Y %H:%M:%S", initTime))
+        self.logger.info(self.taskState)
 
-    def freezeEnvironment(self):
+    def freezeEnvironment(self, drain=None):
         """
-        Freeze the environment by pausing all module timers and stopping the running collectors.
+        Freeze the environment by pausing the graph, whose clock drives the module timers, and stopping
+        or finishing the running collectors.
+
+        :param drain: (optional) Finish the running and pending collectors instead of stopping them.
+                      Drained collectors still running after the drain timeout are stopped.
+                      Configured by the freeze mode of the environment if None
+        :type drain: bool
         """
         self.graph.freeze()
-        for module in self.collectorModules:
-            self.timers[module].pause()
-
-        for worker in self.workers:
-            worker.stop()
 
-        for worker in self.workers:
-            worker.join()
+        if drain is None:
+            drain = self.freezeMode == FREEZE_DRAIN
+        if not drain or not self.executor.drain(False, self.drainTimeout):
+            if drain:
+                self.logger.warning("Collectors not finished after {0} seconds. Stopping them.".format(self.drainTimeout))
+            self.executor.drain(True)
 
     def unfreezeEnvironment(self):
         """
-        Unfreeze the envornment by restarting all timers.
+        Unfreeze the envornment by resuming the graph and with it all module timers.
         """
         self.logger.info("Unfreezing Environment: {}".format(self.name))
         self.graph.melt()
-        for module in self.collectorModules:
-            self.timers[module].resume()
 
     def stopEnvironment(self):
         """
         Stop the environment by stopping all collectors and the Thread of the environment itself.
         """
-        for module in self.collectorModules:
-            self.timers[module].cancel()
+        for lease in self.timers.values():
+            lease.cancel()
 
-        for worker in self.workers:
-            worker.stop()
+        if self.executor is not None:
+            self.executor.drain(True, 0)
 
-        for exporter in self.continuousExporters:
+        for batcher in self.eventBatchers.values():
+            batcher.stop()
+
+        for dispatcher in self.eventDispatchers.values():
+            dispatcher.stop()
+            self.logger.debug("Event dispatch statistics: {0}".format(dispatcher.getStatistics()))
+
+        for exporter in self.continuousExporters.values():
             exporter.stop()
 
-        for exporter in self.exportTrigger:
+        for exporter in self.exportTrigger.values():
             exporter.cancel()
 
+        if self.history is not None:
+            self.history.stop()
+
+        if self.checkpointTimer is not None:
+            self.checkpointTimer.cancel()
+
+        self.graph.stop()
         self.__stopEvent.set()
-        for worker in self.workers:
-            worker.join()
+        if self.executor is not None:
+            self.executor.stop()
+
+        if self.checkpointPath is not None: #Final checkpoint after all collectors finished
+            self.writeCheckpoint(reschedule=False)
+        if self.mutationLog is not None:
+            self.mutationLog.stop()
+
+    def getDispatchStatistics(self):
+        """
+        Get the counters of the asynchronous event delivery to the continuous exporters.
+
+        :returns: Exporter -> Statistics of its dispatcher or batcher. Empty if the events are delivered synchronously
+        :rtype: dict
+        """
+        statistics = {exporter : dispatcher.getStatistics() for exporter, dispatcher in self.eventDispatchers.items()}
+        statistics.update((exporter, batcher.getStatistics()) for exporter, batcher in self.eventBatchers.items())
+        return statistics
+
+    def getLockStatistics(self):
+        """
+        Get the contention counters of the graph lock of this environment.
+        """
+        return self.graph.getLockStatistics()
+
+    def getGraphAt(self, timestamp):
+        """
+        Reconstruct the objects of this environment at a point in time from the recorded history.
+
+        :param timestamp: Point in time as seconds since the epoch
+        :type timestamp: float
+
+        :returns: See insalata.model.HistoryStore.HistoryStore.getGraphAt. None if the point in time is not recorded
+        :rtype: dict
+        """
+        if self.history is None:
+            return None
+        return self.history.getGraphAt(timestamp)
+
+    def getStats(self):
+        """
+        Get the accounting of this environment: The counters of the graph (See insalata.model.Graph.Graph.getStats),
+        the number of running timers of collectors, exporters and checkpoints, the current intervals of the
+        adaptive collectors, the counters of the job queue (See insalata.JobQueue.JobQueue.getStatistics),
+        the number of running collectors, the counters of the collector executor
+        (See insalata.scanner.CollectorExecutor.CollectorExecutor.getStatistics)
+        the counters of the event dispatchers of the continuous exporters (See getDispatchStatistics)
+        and the contention counters of the graph lock (See getLockStatistics).
+        Counters exceeding 32 bit, e.g. the bytes of large graphs, are returned as strings for XML-RPC.
+
+        :rtype: dict
+        """
+        stats = self.graph.getStats()
+        timers = list(self.exportTrigger.values())
+        if self.checkpointTimer is not None:
+            timers.append(self.checkpointTimer)
+        leases = sum(1 for lease in self.timers.values() if lease.getRemaining() is not None) #Timers of the collectors
+        stats["timers"] = leases + sum(1 for timer in timers if timer.running and not timer.getOver())
+        stats["workers"] = self.executor.getRunningCount() if self.executor is not None else 0
+        stats["intervals"] = dict(self.intervals)
+        stats["queue"] = self.queue.getStatistics()
+        stats["executor"] = self.executor.getStatistics() if self.executor is not None else {}
+        stats["dispatch"] = self.getDispatchStatistics()
+        stats["lock"] = self.getLockStatistics()
+        return _marshal(stats)
+
+    def query(self, expression, limit=None, cursor=None):
+        """
+        Run a declarative query on the objects of this environment.
+
+        :param expression: Query, see insalata.model.Query.Query
+        :type expression: str
+
+        :param limit: (optional) Maximal number of objects returned
+        :type limit: int
+
+        :param cursor: (optional) Cursor returned with the previous page
+        :type cursor: str
+
+        :returns: See insalata.model.Query.Query.execute
+        :rtype: dict
+        """
+        return self.graph.query(expression, limit, cursor)
 
     def printXml(self, fileName):
         """
@@ -567,4 +836,16 @@ class EnvironmentHandler(threading.Thread):
         :type fileName: str
         """
         filePath = os.path.join(self.dataPath, fileName)
-        insalata.XmlPrint.printXML(filePath, self.graph)
+        insalata.XmlPrint.printXML(filePath, self.graph.snapshot()) #O(n) copy unless a reader took one at this version
+
+def _marshal(value):
+    """
+    Convert the counters of nested dictionaries and lists to types XML-RPC can send. Integers are limited to 32 bit.
+    """
+    if isinstance(value, dict):
+        return dict((str(k), _marshal(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_marshal(v) for v in value]
+    if isinstance(value, (bool, float, str)) or (isinstance(value, int) and -2**31 <= value < 2**31) or value is None:
+        return value
+    return str(value)
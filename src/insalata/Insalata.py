@@ -2,6 +2,7 @@ CONF_FILE = "/etc/insalata/insalata.conf"
 
 import sys, socket
 import signal
+import datetime
 from functools import partial
 from configobj  import ConfigObj, ParseError
 from insalata.EnvironmentHandler import EnvironmentHandler
@@ -252,6 +253,82 @@ class Insalata:
         else:
             return "Environment '{0}' unkown.".format(environmentName)
 
+    def getGraphAt(self, environmentName, timestamp):
+        """
+        Get the objects of an environment at a point in time. Requires the history of the environment to be enabled.
+
+        :param environmentName: Name of the environment.
+        :type environmentName: str
+
+        :param timestamp: Point in time as seconds since the epoch or as 'YYYY-MM-DD HH:MM:SS' (local time).
+        :type timestamp: str
+
+        :returns: Dictionary with the timestamp and the list of objects with their type, ID, creation time and values.
+        :rtype: dict
+        """
+        if environmentName not in self.environments:
+            return "Environment '{0}' unkown.".format(environmentName)
+        try:
+            timestamp = float(timestamp)
+        except ValueError:
+            try:
+                timestamp = datetime.datetime.strptime(str(timestamp).replace("T", " "), "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                return "Invalid timestamp '{0}'.".format(timestamp)
+        graph = self.environments[environmentName].getGraphAt(timestamp)
+        if graph is None:
+            return "No history of environment '{0}' at {1}.".format(environmentName, timestamp)
+        return graph
+
+    def getStats(self, environmentName):
+        """
+        Get the accounting of an environment for capacity planning and leak detection.
+
+        :param environmentName: Name of the environment.
+        :type environmentName: str
+
+        :returns: Dictionary with the number of objects and edges and their approximate bytes by type, the number of
+                  running leases and timers, the number of handlers of each graph event and of the object events,
+                  the current intervals of the adaptive collectors, the depth and coalescing counters of the job
+                  queue, the number of running collectors, the queue, execution and run times of the collectors
+                  and the version of the graph.
+        :rtype: dict
+        """
+        if environmentName not in self.environments:
+            return "Environment '{0}' unkown.".format(environmentName)
+        return self.environments[environmentName].getStats()
+
+    def query(self, environmentName, expression, limit=100, cursor=""):
+        """
+        Query the objects of an environment, e.g. 'Host where interface.address.service.port = 22'.
+
+        :param environmentName: Name of the environment.
+        :type environmentName: str
+
+        :param expression: Query, see insalata.model.Query.Query for the syntax.
+        :type expression: str
+
+        :param limit: Maximal number of objects returned.
+        :type limit: int
+
+        :param cursor: Cursor returned with the previous page. Empty for the first page.
+        :type cursor: str
+
+        :returns: Dictionary with the list of results, each with its type, ID and values, and the cursor of the next
+                  page, which is empty if there are no more results.
+        :rtype: dict
+        """
+        if environmentName not in self.environments:
+            return "Environment '{0}' unkown.".format(environmentName)
+        try:
+            limit = int(limit)
+        except ValueError:
+            return "Invalid limit '{0}'.".format(limit)
+        try:
+            return self.environments[environmentName].query(expression, limit, cursor if cursor else None)
+        except ValueError as e:
+            return "Invalid query: {0}".format(e)
+
     def getCommands(self):
         """
         Retrieve a list of all commands publicly available for clients of this service.
@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+
+class JobQueue():
+    """
+    Queue of the pending collector runs of one environment with at most one job per collector.
+
+    Putting a job for a collector that already has a pending job coalesces both: The pending job keeps its position,
+    takes the higher priority of both and keeps its interval unless it is -1 => A one-time job, e.g. of a full scan,
+    does not stop the restarts of a periodic collector. The queue therefore never holds more jobs than there are
+    collectors and putting a job never blocks or fails.
+
+    Jobs are taken in the order of their priority (lower value first) and then in the order they were put.
+    """
+
+    def __init__(self):
+        self.__jobs = dict() #Collector -> [priority, sequence number, interval]
+        self.__sequence = 0
+        self.__condition = threading.Condition()
+
+        self.__enqueued = 0
+        self.__coalesced = 0
+        self.__upgraded = 0
+        self.__maxDepth = 0
+
+    def put(self, name, priority, interval):
+        """
+        Add a job or coalesce it with the pending job of the collector.
+
+        :param name: Name of the collector
+        :type name: str
+
+        :param priority: Priority of the job, lower values are taken first
+        :type priority: int
+
+        :param interval: Interval of the collector, -1 if the collector shall not be restarted after this run
+        :type interval: int
+
+        :returns: False if the job was coalesced with a pending job
+        :rtype: bool
+        """
+        with self.__condition:
+            job = self.__jobs.get(name)
+            if job is not None:
+                self.__coalesced += 1
+                if priority < job[0]:
+                    job[0] = priority
+                    self.__upgraded += 1
+                job[2] = interval if job[2] == -1 else job[2]
+                return False
+
+            self.__sequence += 1
+            self.__jobs[name] = [priority, self.__sequence, interval]
+            self.__enqueued += 1
+            if len(self.__jobs) > self.__maxDepth:
+                self.__maxDepth = len(self.__jobs)
+            self.__condition.notify_all()
+            return True
+
+    def get(self, timeout=None, ready=None):
+        """
+        Remove and return the first job.
+
+        :param timeout: (optional) Maximum time in seconds to wait for a job. Waits forever if None
+        :type timeout: float
+
+        :param ready: (optional) Function returning if a job of a collector can be executed now.
+                      Jobs of other collectors stay pending. Call wake when the result may have changed
+        :type ready: function reference
+
+        :returns: Tuple (priority, interval, name)
+        :rtype: tuple
+
+        :raises queue.Empty: If no job was available within the timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.__condition:
+            while True:
+                candidates = [(job[0], job[1], name) for name, job in self.__jobs.items() if ready is None or ready(name)]
+                if len(candidates) > 0:
+                    _, _, name = min(candidates)
+                    priority, _, interval = self.__jobs.pop(name)
+                    return (priority, interval, name)
+
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty()
+                self.__condition.wait(remaining)
+
+    def wake(self):
+        """
+        Wake up the threads waiting in get to test the readiness of the pending jobs again.
+        """
+        with self.__condition:
+            self.__condition.notify_all()
+
+    def getDepth(self):
+        """
+        Get the number of pending jobs.
+        """
+        return len(self.__jobs)
+
+    def getStatistics(self):
+        """
+        Get the counters of this queue.
+
+        :returns: Dictionary with the current and maximal number of pending jobs, the names of the collectors with
+                  a pending job and the number of enqueued, coalesced and upgraded jobs
+        :rtype: dict
+        """
+        with self.__condition:
+            return {
+                "depth" : len(self.__jobs),
+                "maxDepth" : self.__maxDepth,
+                "pending" : sorted(self.__jobs.keys()),
+                "enqueued" : self.__enqueued,
+                "coalesced" : self.__coalesced,
+                "upgraded" : self.__upgraded
+            }
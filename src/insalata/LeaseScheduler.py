@@ -0,0 +1,415 @@
+import threading
+import traceback
+import math
+import time
+
+RESOLUTION = 0.1 #Length of one slot of the timing wheel in seconds
+
+class Lease():
+    """
+    Verification lease registered with a LeaseScheduler.
+    A lease executes its method once its duration elapsed without being renewed or canceled.
+    """
+    __slots__ = ("scheduler", "duration", "method", "args", "kwargs", "deadline", "slot", "over")
+
+    def __init__(self, scheduler, duration, method, args=[], kwargs={}):
+        """
+        Initialize the Lease object.
+
+        :param scheduler: Scheduler this lease is registered with
+        :type scheduler: insalata.LeaseScheduler.LeaseScheduler
+
+        :param duration: Time in seconds the lease lasts. The lease never expires if the duration is -1
+        :type duration: int
+
+        :param method: Method to execute if the lease expires
+        :type method: Function pointer
+
+        :param args: List of arguments for the method
+        :type args: list
+
+        :param kwargs: Keyword arguments for the method
+        :type kwargs: dict
+        """
+        self.scheduler = scheduler
+        self.duration = duration
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+        self.deadline = None #Expiry time on the logical clock of the scheduler
+        self.slot = None #Slot of the wheel containing this lease
+        self.over = False
+
+    def start(self):
+        """
+        Start the lease.
+        """
+        self.scheduler.add(self)
+
+    def renew(self, duration=None):
+        """
+        Restart the lease with the given duration.
+
+        :param duration: (optional) New duration of the lease. The current duration is kept if None
+        :type duration: int
+
+        :returns: False if the lease already expired and has to be replaced
+        :rtype: bool
+        """
+        return self.scheduler.renew(self, duration)
+
+    def extend(self, duration):
+        """
+        Postpone the expiry of this lease without changing its duration.
+
+        :param duration: Additional time in seconds
+        :type duration: float
+
+        :returns: False if the lease is not running
+        :rtype: bool
+        """
+        return self.scheduler.extend(self, duration)
+
+    def cancel(self):
+        """
+        Cancel the lease.
+        """
+        self.scheduler.remove(self)
+
+    def getOver(self):
+        return self.over
+
+    def getRemaining(self):
+        """
+        Get the time in seconds until this lease expires.
+        The remaining time does not decrease while the clock of the scheduler is paused.
+
+        :returns: Remaining time or None if the lease is not running
+        :rtype: float
+        """
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - self.scheduler.now())
+
+
+class LeaseScheduler():
+    """
+    Expiry service for all verification leases of one environment.
+
+    Leases are stored in the slots of a timing wheel. Each slot covers RESOLUTION seconds and maps the
+    absolute slot number to the leases expiring in it. Starting, renewing and canceling a lease is O(1).
+    A single thread advances the wheel and executes all leases of the elapsed slots as one batch.
+
+    Deadlines are expressed on a logical clock which can be paused and resumed as a single operation.
+    Leases do not expire while the clock is paused and keep their exact remaining time.
+    """
+
+    def __init__(self, name=None, resolution=RESOLUTION, lock=None):
+        """
+        Create a new scheduler. The thread is started with the first lease.
+
+        :param name: (optional) Name of the scheduler used for its thread
+        :type name: str
+
+        :param resolution: Length of one slot in seconds
+        :type resolution: float
+
+        :param lock: (optional) Function returning a context manager that is held while a batch of expired leases is executed
+        :type lock: Function pointer
+        """
+        self.name = name
+        self.resolution = resolution
+        self.lock = lock
+
+        self.__pausedAt = None #Monotonic time the logical clock was paused at
+        self.__pausedTotal = 0 #Sum of all finished pauses
+
+        self.__wheel = dict() #Slot number -> Set of leases expiring in this slot
+        self.__nextSlot = self.__slotOf(self.now())
+        self.__count = 0
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__stopped = False
+
+        self.__journals = dict() #Name -> Set of leases recorded since the journal was taken
+        self.__journalLock = threading.Lock()
+
+    def now(self):
+        """
+        Get the current time of the logical clock of this scheduler in seconds.
+        """
+        pausedAt = self.__pausedAt
+        return (pausedAt if pausedAt is not None else time.monotonic()) - self.__pausedTotal
+
+    def pauseClock(self):
+        """
+        Pause the logical clock. No lease expires until the clock is resumed.
+        """
+        with self.__condition:
+            if self.__pausedAt is None:
+                self.__pausedAt = time.monotonic()
+
+    def resumeClock(self):
+        """
+        Resume the logical clock. The time elapsed during the pause is not counted.
+        """
+        with self.__condition:
+            if self.__pausedAt is not None:
+                self.__pausedTotal += time.monotonic() - self.__pausedAt
+                self.__pausedAt = None
+                self.__condition.notify()
+
+    def isPaused(self):
+        return self.__pausedAt is not None
+
+    def __slotOf(self, timestamp):
+        return int(math.floor(timestamp / self.resolution))
+
+    def schedule(self, duration, method, args=[], kwargs={}):
+        """
+        Create and start a new lease.
+
+        :param duration: Time in seconds the lease lasts. The lease never expires if the duration is -1
+        :type duration: int
+
+        :param method: Method to execute if the lease expires
+        :type method: Function pointer
+
+        :param args: List of arguments for the method
+        :type args: list
+
+        :param kwargs: Keyword arguments for the method
+        :type kwargs: dict
+
+        :returns: The started lease
+        :rtype: insalata.LeaseScheduler.Lease
+        """
+        lease = Lease(self, duration, method, args, kwargs)
+        lease.start()
+        return lease
+
+    def getLeaseCount(self):
+        """
+        Get the number of leases currently waiting for their expiry.
+        """
+        return self.__count
+
+    def add(self, lease, duration=None):
+        """
+        Register a lease in the wheel.
+
+        :param lease: Lease to register
+        :type lease: insalata.LeaseScheduler.Lease
+
+        :param duration: (optional) Time until expiry. The duration of the lease is used if None
+        :type duration: float
+        """
+        with self.__condition:
+            self.__insert(lease, lease.duration if duration is None else duration)
+
+    def __insert(self, lease, duration):
+        if lease.slot is not None:
+            self.__unlink(lease)
+        lease.over = False
+        if lease.duration == -1: #Do nothing if duration is -1
+            lease.deadline = None
+            return
+        lease.deadline = self.now() + duration
+        slot = max(self.__slotOf(lease.deadline) + 1, self.__nextSlot)
+        bucket = self.__wheel.get(slot)
+        if bucket is None:
+            bucket = self.__wheel[slot] = set()
+        bucket.add(lease)
+        lease.slot = slot
+        self.__count += 1
+
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name="LeaseScheduler-{0}".format(self.name))
+            self.__thread.daemon = True
+            self.__thread.start()
+        elif self.__count == 1:
+            self.__condition.notify()
+
+    def __unlink(self, lease):
+        bucket = self.__wheel.get(lease.slot)
+        if bucket is not None and lease in bucket:
+            bucket.remove(lease)
+            self.__count -= 1
+            if len(bucket) == 0:
+                del self.__wheel[lease.slot]
+        lease.slot = None
+
+    def renew(self, lease, duration=None):
+        """
+        Restart a lease.
+
+        :param lease: Lease to restart
+        :type lease: insalata.LeaseScheduler.Lease
+
+        :param duration: (optional) New duration of the lease
+        :type duration: int
+
+        :returns: False if the lease already expired
+        :rtype: bool
+        """
+        with self.__condition:
+            if lease.over:
+                return False
+            if duration is not None:
+                lease.duration = duration
+            self.__insert(lease, lease.duration)
+            return True
+
+    def extend(self, lease, duration):
+        """
+        Postpone the expiry of a running lease. The duration used by the next renewal is not changed.
+
+        :param lease: Lease to postpone
+        :type lease: insalata.LeaseScheduler.Lease
+
+        :param duration: Additional time in seconds
+        :type duration: float
+
+        :returns: False if the lease is not running
+        :rtype: bool
+        """
+        with self.__condition:
+            if lease.over or lease.deadline is None:
+                return False
+            self.__insert(lease, lease.deadline - self.now() + duration)
+            return True
+
+    def remove(self, lease):
+        """
+        Cancel a lease.
+
+        :param lease: Lease to cancel
+        :type lease: insalata.LeaseScheduler.Lease
+        """
+        with self.__condition:
+            if lease.slot is not None:
+                self.__unlink(lease)
+            lease.deadline = None
+
+    def keepJournal(self, name):
+        """
+        Start recording the leases renewed for a name, e.g. a collector. Nothing happens if the journal is already kept.
+
+        :param name: Name of the journal
+        :type name: str
+        """
+        with self.__journalLock:
+            self.__journals.setdefault(name, set())
+
+    def record(self, name, lease):
+        """
+        Record a started or renewed lease in the journal of a name. Ignored if no journal is kept for the name.
+
+        :param name: Name of the journal
+        :type name: str
+
+        :param lease: Lease to record
+        :type lease: insalata.LeaseScheduler.Lease
+        """
+        if name not in self.__journals: #Names without journal do not take the lock
+            return
+        with self.__journalLock:
+            journal = self.__journals.get(name)
+            if journal is not None:
+                journal.add(lease)
+
+    def takeJournal(self, name):
+        """
+        Get the leases recorded for a name since the journal was taken the last time and start a new journal.
+
+        :param name: Name of the journal
+        :type name: str
+
+        :returns: Recorded leases, empty if no journal is kept for the name
+        :rtype: set
+        """
+        with self.__journalLock:
+            journal = self.__journals.get(name)
+            if journal is None:
+                return set()
+            self.__journals[name] = set()
+            return journal
+
+    def stop(self):
+        """
+        Stop the thread of this scheduler. Pending leases will not expire anymore.
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+
+    def __run(self):
+        """
+        Advance the wheel and execute all expired leases.
+        """
+        while True:
+            with self.__condition:
+                batch = list()
+                while len(batch) == 0:
+                    if self.__stopped:
+                        return
+                    if self.__count == 0 or self.__pausedAt is not None:
+                        self.__condition.wait()
+                        self.__nextSlot = max(self.__nextSlot, self.__slotOf(self.now()))
+                        continue
+
+                    currentSlot = self.__slotOf(self.now())
+                    while self.__nextSlot <= currentSlot:
+                        bucket = self.__wheel.pop(self.__nextSlot, None)
+                        if bucket:
+                            batch.extend(bucket)
+                        self.__nextSlot += 1
+
+                    if len(batch) == 0:
+                        self.__condition.wait(self.resolution)
+
+                for lease in batch:
+                    lease.slot = None
+                    lease.deadline = None
+                    lease.over = True
+                self.__count -= len(batch)
+
+            self.__deliver(batch)
+
+    def __deliver(self, batch):
+        """
+        Execute the methods of a batch of expired leases.
+
+        :param batch: Expired leases
+        :type batch: list
+        """
+        if self.lock is None:
+            self.__execute(batch)
+        else:
+            with self.lock():
+                self.__execute(batch)
+
+    def __execute(self, batch):
+        for lease in batch:
+            try:
+                lease.method(*lease.args, **lease.kwargs)
+            except Exception:
+                traceback.print_exc()
+
+
+_defaultScheduler = None
+_defaultLock = threading.Lock()
+
+def getDefaultScheduler():
+    """
+    Get the scheduler used by leases of objects that do not belong to an environment.
+
+    :returns: The process wide default scheduler
+    :rtype: insalata.LeaseScheduler.LeaseScheduler
+    """
+    global _defaultScheduler
+    with _defaultLock:
+        if _defaultScheduler is None:
+            _defaultScheduler = LeaseScheduler("default")
+        return _defaultScheduler
@@ -1,11 +1,12 @@
 from threading import Timer as pyTimer
 from functools import partial
-import datetime
+import time
 
 class Timer():
     """
     Own Timer implementation that uses pythons threading.Timer but supports pausing and resuming.
     """
+    __slots__ = ("duration", "method", "args", "kwargs", "running", "startTime", "pauseTime", "timer", "over")
     
     def __init__(self, duration, method, args=[], kwargs={}):
         """
@@ -39,7 +40,7 @@ class Timer():
         Start the timer.
         """
         self.running = True
-        self.startTime = datetime.datetime.now()
+        self.startTime = time.monotonic()
         self.pauseTime = None
         if self.duration != -1: #Do nothing if duration is -1
             self.timer = pyTimer(self.duration, partial(self.caller, self.method), self.args, self.kwargs)
@@ -60,7 +61,7 @@ class Timer():
         if self.running and self.duration != -1 and self.timer:
             self.timer.cancel()
             self.timer = None
-            self.pauseTime = datetime.datetime.now()
+            self.pauseTime = time.monotonic()
         self.running = False
 
     def resume(self):
@@ -71,7 +72,7 @@ class Timer():
         if not self.pauseTime:
             self.start()
         if not self.running and self.duration != -1:
-            self.duration = self.duration - (int((self.pauseTime-self.startTime).total_seconds()))
+            self.duration = max(0, self.duration - (self.pauseTime - self.startTime))
             self.start()
 
 
@@ -15,11 +15,12 @@ def printXML(file, graph):
     """
     root = Element("config")
     root.attrib['name'] = graph.getID()
-    printLocations(root, graph.getLocations())
-    printHosts(root, graph.getHosts())
-    printLayer2Networks(root, graph.getL2Networks())
-    printLayer3Networks(root, graph.getL3Networks())
-    #printVlans(root, graph.getVlan())
+    with graph.reading(): #Collectors may not change the graph while it is printed
+        printLocations(root, graph.getLocations())
+        printHosts(root, graph.getHosts())
+        printLayer2Networks(root, graph.getL2Networks())
+        printLayer3Networks(root, graph.getL3Networks())
+        #printVlans(root, graph.getVlan())
     ElementTree(root).write(file)
 
 def printLocations(root, locations):
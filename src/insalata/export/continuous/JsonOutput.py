@@ -1,45 +1,50 @@
-from functools import partial
 import datetime
-from insalata.Timer import Timer
 import json
-import threading
 import os
 
-WRITE_INTERVAL = 1
+BATCHED = True #Receive the events as batches of an insalata.model.EventBatcher.EventBatcher
 OUTFILE = "/etc/insalata/testEnv/data/changeLog.txt"
-TYPE="w"
 
 class Exporter:
-    def __init__(self, onNewEvent, onDeletedEvent, onChangedEvent, logger, outputDirectory):
-        onNewEvent.add(partial(self.onNewHandler))
-        onChangedEvent.add(partial(self.onChangedHandler))
-        onDeletedEvent.add(partial(self.onDeletedHandler))
+    def __init__(self, onBatchEvent, logger, outputDirectory):
+        self.subscription = onBatchEvent.subscribe(self.onBatchHandler, weak=True) #Unsubscribed if the exporter is dropped without stop
 
-        self.buffer = list()
         self.outFile = os.path.join(outputDirectory, "jsonChangeLog.txt")
         self.logger = logger
+        self.version = None #Graph version written to the change log
 
-        self.writer = Timer(WRITE_INTERVAL, partial(self.writeFile))
-        self.writer.start()
-        self.__stopEvent = threading.Event()
+        try:
+            open(self.outFile, "w").close() #Start a new change log, batches are appended
+        except:
+            self.logger.error("Cannot print JSON change log to file {0}.".format(self.outFile))
 
     def stop(self):
-        self.writer.cancel()
-        self.__stopEvent.set()
+        self.subscription.cancel()
 
-    def onNewHandler(self, sender, args):
-        self.logger.debug("Received onNewEvent writing to file: {0}".format(self.outFile))
+    def onBatchHandler(self, sender, batch):
+        self.logger.debug("Received batch of {0} events writing to file: {1}".format(len(batch["events"]), self.outFile))
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d@%H:%M:%S")
-        message = {"time" : timestamp,
-                "type" : "new",
-                "objectType" : args["objectType"],
-                "initialValues" : args["values"]}
-        self.buffer.append(json.dumps(message))
+        lines = list()
+        for kind, args in batch["events"]:
+            try:
+                lines.append(json.dumps(self.toMessage(timestamp, kind, args)))
+            except KeyError as e:
+                self.logger.error("Invalid {0} event: {1}".format(kind, str(args)))
 
-    def onChangedHandler(self, sender, args):
-        self.logger.debug("Received onChangedEvent writing to file: {0}".format(self.outFile))
         try:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d@%H:%M:%S")
+            with open(self.outFile, "a") as fileHandler:
+                fileHandler.write("\n".join(lines) + "\n")
+            self.version = batch["version"]
+        except:
+            self.logger.error("Cannot print JSON change log to file {0}.".format(self.outFile))
+
+    def toMessage(self, timestamp, kind, args):
+        if kind == "new":
+            message = {"time" : timestamp,
+                    "type" : "new",
+                    "objectType" : args["objectType"],
+                    "initialValues" : args["values"]}
+        elif kind == "changed":
             message = {"time" : timestamp,
                     "type" : "change_" + args["type"],
                     "objectType" : args["objectType"],
@@ -47,27 +52,11 @@ class Exporter:
                     "value" : args["value"]}
             if "member" in args:
                 message["member"] = args["member"]
-            self.buffer.append(json.dumps(message))
-        except KeyError as e:
-            print(str(args))
-
-    def onDeletedHandler(self, sender, args):
-        self.logger.debug("Received onDeletedEvent writing to file: {0}".format(self.outFile))
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d@%H:%M:%S")
-        message = {"time" : timestamp,
-                "type" : "delete",
-                "objectType" : args["objectType"],
-                "object" : args["object"]}
-        self.buffer.append(json.dumps(message))
-
-    def writeFile(self):
-        if len(self.buffer) > 0:
-            try:
-                with open(self.outFile, TYPE) as fileHandler:
-                    for entry in self.buffer:
-                        print(entry, file=fileHandler)
-            except:
-                self.logger.error("Cannot print JSON change log to file {0}.".format(self.outFile))
-        if not self.__stopEvent.isSet():
-            self.writer = Timer(WRITE_INTERVAL, partial(self.writeFile))
-            self.writer.start()
+        else:
+            message = {"time" : timestamp,
+                    "type" : "delete",
+                    "objectType" : args["objectType"],
+                    "object" : args["object"]}
+        if "version" in args:
+            message["version"] = args["version"]
+        return message
@@ -0,0 +1,165 @@
+import threading
+import time
+
+class Holding:
+    """
+    Reusable context manager holding a lock in one mode. It has no state of its own => One instance serves all threads.
+    """
+    __slots__ = ("lock", "acquire", "release")
+
+    def __init__(self, lock, acquire, release):
+        self.lock = lock
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self.lock
+
+    def __exit__(self, excType, excValue, traceback):
+        self.release()
+        return False
+
+class ReadWriteLock:
+    """
+    Reentrant reader/writer lock preferring writers.
+
+    Any number of threads may hold the lock for reading while no thread holds it for writing.
+    New readers wait as long as a writer is waiting => Continuous reading does not starve the writers.
+    A thread already holding the lock may acquire it again in any mode, except upgrading from read to write
+    as two upgrading readers would wait for each other.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = dict() #Thread identifier -> Number of read acquisitions
+        self.__writer = None #Thread identifier of the writer
+        self.__writerDepth = 0 #Only changed by the writer
+        self.__waitingWriters = 0
+        self.__reading = Holding(self, self.acquireRead, self.releaseRead)
+        self.__writing = Holding(self, self.acquireWrite, self.releaseWrite)
+
+        #Contention counters
+        self.__reads = 0
+        self.__writes = 0
+        self.__reentrantWrites = 0 #Only changed by the writer
+        self.__contendedReads = 0
+        self.__contendedWrites = 0
+        self.__readWaitTime = 0
+        self.__writeWaitTime = 0
+        self.__maxReaders = 0
+
+    def acquireRead(self):
+        """
+        Acquire the lock for reading. Blocks while a writer holds or waits for the lock.
+        """
+        me = threading.get_ident()
+        with self.__condition:
+            self.__reads += 1
+            if self.__writer != me and me not in self.__readers and (self.__writer is not None or self.__waitingWriters > 0):
+                self.__contendedReads += 1
+                start = time.monotonic()
+                while self.__writer is not None or self.__waitingWriters > 0:
+                    self.__condition.wait()
+                self.__readWaitTime += time.monotonic() - start
+            self.__readers[me] = self.__readers.get(me, 0) + 1
+            if len(self.__readers) > self.__maxReaders:
+                self.__maxReaders = len(self.__readers)
+
+    def releaseRead(self):
+        """
+        Release one read acquisition of the calling thread.
+        """
+        me = threading.get_ident()
+        with self.__condition:
+            depth = self.__readers.get(me)
+            if depth is None:
+                raise RuntimeError("Cannot release a read lock that is not held.")
+            if depth == 1:
+                del self.__readers[me]
+                if len(self.__readers) == 0:
+                    self.__condition.notify_all()
+            else:
+                self.__readers[me] = depth - 1
+
+    def acquireWrite(self):
+        """
+        Acquire the lock exclusively. Blocks while other threads hold the lock.
+        """
+        me = threading.get_ident()
+        if self.__writer == me: #Only this thread sets or clears the writer => No need to lock
+            self.__writerDepth += 1
+            self.__reentrantWrites += 1
+            return
+        with self.__condition:
+            self.__writes += 1
+            if me in self.__readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+
+            if self.__writer is not None or len(self.__readers) > 0:
+                self.__contendedWrites += 1
+                start = time.monotonic()
+                self.__waitingWriters += 1
+                try:
+                    while self.__writer is not None or len(self.__readers) > 0:
+                        self.__condition.wait()
+                finally:
+                    self.__waitingWriters -= 1
+                self.__writeWaitTime += time.monotonic() - start
+            self.__writer = me
+            self.__writerDepth = 1
+
+    def isWriting(self):
+        """
+        Test if the calling thread holds the lock for writing.
+        """
+        return self.__writer == threading.get_ident()
+
+    def releaseWrite(self):
+        """
+        Release one write acquisition of the calling thread.
+        """
+        if self.__writer != threading.get_ident():
+            raise RuntimeError("Cannot release a write lock that is not held.")
+        if self.__writerDepth > 1: #Reentrant release, the lock stays held
+            self.__writerDepth -= 1
+            return
+        with self.__condition:
+            self.__writerDepth -= 1
+            if self.__writerDepth == 0:
+                self.__writer = None
+                self.__condition.notify_all()
+
+    def reading(self):
+        """
+        Context manager holding the lock for reading.
+        """
+        return self.__reading
+
+    def writing(self):
+        """
+        Context manager holding the lock for writing.
+        """
+        return self.__writing
+
+    def getStatistics(self):
+        """
+        Get the contention counters of this lock.
+
+        :returns: Number of acquisitions and of acquisitions that had to wait, accumulated waiting time in seconds,
+                  current and maximal number of concurrent readers and the number of waiting writers
+        :rtype: dict
+        """
+        with self.__condition:
+            return {
+                "reads" : self.__reads,
+                "writes" : self.__writes + self.__reentrantWrites,
+                "contendedReads" : self.__contendedReads,
+                "contendedWrites" : self.__contendedWrites,
+                "readWaitTime" : self.__readWaitTime,
+                "writeWaitTime" : self.__writeWaitTime,
+                "readers" : len(self.__readers),
+                "maxReaders" : self.__maxReaders,
+                "waitingWriters" : self.__waitingWriters,
+                "writing" : self.__writer is not None
+            }
@@ -1,4 +1,5 @@
-from insalata.model.PartOfEdge import PartOfEdge
+from insalata.model.Node import Node
+from insalata.model.Edge import CONTAINS
 
 def resolveGraph(config):
     """
@@ -7,20 +8,30 @@ def resolveGraph(config):
     Keyword arguments:
         config -- The config to resolve edges of for all subelements
     """
-    for x in config.getHosts():
-        resolveEdges(x)
+    for obj, _ in config.traverse(config.getHosts(), edgeKinds=[CONTAINS]):
+        resolvePartOfEdges(obj)
 
 def resolveEdges(obj):
     """
     Resolves all "part of" edges in the graph based data structure and creates sets for the hierarchically structured diff  
     
+    Keyword arguments:
+        obj -- The object to resolve edges of
+    """
+    for node, _ in Node.iterateBFS(obj, edgeKinds=[CONTAINS]):
+        resolvePartOfEdges(node)
+
+def resolvePartOfEdges(obj):
+    """
+    Creates the sets for the parts of a single object. Parts of the parts are not resolved.
+
     Keyword arguments:
         obj -- The object to resolve edges of
     """
 
     #create new properties on the config object based on the adjacent type of all part-of edges
     for e in obj.getEdges():
-        if isinstance(e, PartOfEdge) and (e.getNodes()[1] == obj):
+        if e.getKind(obj) == CONTAINS:
             typeOfOther = e.getOther(obj).__class__.__name__.lower()
             typeOfOther += 'es' if typeOfOther.endswith('s') else 's'   #add plural 's' :3
             if typeOfOther in obj.__dict__:
@@ -28,9 +39,6 @@ def resolveEdges(obj):
                 s.add(e.getOther(obj))
             else:
                 setattr(obj, typeOfOther, set([e.getOther(obj)]))
-            
-            #recursively resolve edges for part-of element
-            resolveEdges(e.getOther(obj))
 
 def diff(newConfig, currentConfig):
     """
@@ -0,0 +1,240 @@
+import sys
+from array import array
+from collections import deque
+
+from insalata.model.Edge import EDGE, PART_OF, CONTAINS
+
+class CompactGraph:
+    """
+    Read-only, array based representation of a graph.
+
+    Nodes are numbered from 0 to n-1. The adjacency is stored in compressed sparse row form:
+    The neighbors of node i are indices[indptr[i]:indptr[i + 1]], the kind of each edge (EDGE, PART_OF, CONTAINS)
+    is stored at the same position in edgeKinds. Types and identifiers of the nodes are stored in interned tables.
+    The root node of the graph and its edges are not contained.
+
+    Traversals, degrees and components work on the arrays only and do not touch any model object.
+    """
+
+    def __init__(self, graph):
+        """
+        Build the arrays of a graph. The graph is locked for reading while its nodes are numbered.
+
+        :param graph: Graph to convert
+        :type graph: insalata.model.Graph.Graph
+        """
+        with graph.reading():
+            self.version = graph.getVersion()
+            self.name = graph.getID()
+            nodes = list(graph.getAllNeighbors())
+            numbers = dict((id(node), i) for i, node in enumerate(nodes))
+
+            self.typeNames = list() #Type code -> Class name
+            typeCodes = dict() #Class name -> Type code
+            self.typeCodes = array('B')
+            self.ids = list() #Node -> Interned global ID
+            self.__index = dict() #(Class name, global ID) -> Node
+
+            self.indptr = array('l', [0])
+            self.indices = array('l')
+            self.edgeKinds = array('B')
+
+            for i, node in enumerate(nodes):
+                typeName = node.__class__.__name__
+                code = typeCodes.get(typeName)
+                if code is None:
+                    code = typeCodes[typeName] = len(self.typeNames)
+                    self.typeNames.append(typeName)
+                self.typeCodes.append(code)
+
+                globalID = sys.intern(node.getGlobalID())
+                self.ids.append(globalID)
+                self.__index[(typeName, globalID)] = i
+
+                for edge in node.getEdges():
+                    j = numbers.get(id(edge.getOther(node)))
+                    if j is None: #Edge to the root or to an object not attached to the graph
+                        continue
+                    self.indices.append(j)
+                    self.edgeKinds.append(edge.getKind(node))
+                self.indptr.append(len(self.indices))
+
+    def getNodeCount(self):
+        return len(self.typeCodes)
+
+    def getEdgeCount(self):
+        """
+        Get the number of edges. Every edge is stored once for each of its nodes.
+        """
+        return len(self.indices) // 2
+
+    def getVersion(self):
+        return self.version
+
+    def getIndex(self, typeName, globalID):
+        """
+        Get the number of a node.
+
+        :param typeName: Class name of the node, e.g. 'Host'
+        :type typeName: str
+
+        :param globalID: Global identifier of the node
+        :type globalID: str
+
+        :returns: Number of the node or None if it is not contained
+        :rtype: int
+        """
+        return self.__index.get((typeName, globalID))
+
+    def getID(self, node):
+        return self.ids[node]
+
+    def getType(self, node):
+        return self.typeNames[self.typeCodes[node]]
+
+    def getTypeCode(self, typeName):
+        """
+        Get the code of a type or None if no node has this type.
+        """
+        return self.typeNames.index(typeName) if typeName in self.typeNames else None
+
+    def getNeighbors(self, node):
+        """
+        Get the numbers of all neighbors of a node.
+
+        :returns: Slice of the indices array
+        :rtype: array.array
+        """
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def getDegree(self, node):
+        return self.indptr[node + 1] - self.indptr[node]
+
+    def getDegrees(self):
+        """
+        Get the degree of every node.
+
+        :rtype: array.array
+        """
+        indptr = self.indptr
+        return array('l', (indptr[i + 1] - indptr[i] for i in range(len(indptr) - 1)))
+
+    def getDegreeStatistics(self):
+        """
+        Get minimum, maximum, mean and number of nodes of the degrees per type.
+
+        :returns: Class name -> Dictionary with the keys 'count', 'min', 'max' and 'mean'
+        :rtype: dict
+        """
+        statistics = dict()
+        typeCodes = self.typeCodes
+        for node, degree in enumerate(self.getDegrees()):
+            entry = statistics.get(typeCodes[node])
+            if entry is None:
+                statistics[typeCodes[node]] = [1, degree, degree, degree]
+            else:
+                entry[0] += 1
+                entry[1] = min(entry[1], degree)
+                entry[2] = max(entry[2], degree)
+                entry[3] += degree
+        return dict((self.typeNames[code], { "count" : count, "min" : low, "max" : high, "mean" : total / count })
+                    for code, (count, low, high, total) in statistics.items())
+
+    def traverse(self, start, maxDepth=None, types=None, edgeKinds=None):
+        """
+        Breadth first traversal starting at a node.
+
+        :param start: Number of the start node
+        :type start: int
+
+        :param maxDepth: (optional) Maximal distance to the start node
+        :type maxDepth: int
+
+        :param types: (optional) Class names of the nodes the traversal may enter. The start node is always visited
+        :type types: list
+
+        :param edgeKinds: (optional) Kinds of edges the traversal may follow (EDGE, PART_OF, CONTAINS)
+        :type edgeKinds: list
+
+        :returns: Generator of tuples (node, depth) in breadth first order
+        :rtype: generator
+        """
+        allowed = None
+        if types is not None:
+            allowed = bytearray(len(self.typeNames))
+            for typeName in types:
+                code = self.getTypeCode(typeName)
+                if code is not None:
+                    allowed[code] = 1
+        kinds = None
+        if edgeKinds is not None:
+            kinds = bytearray(3)
+            for kind in edgeKinds:
+                kinds[kind] = 1
+
+        indptr, indices, edgeKindArray, typeCodes = self.indptr, self.indices, self.edgeKinds, self.typeCodes
+        visited = bytearray(self.getNodeCount())
+        visited[start] = 1
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            yield node, depth
+            if maxDepth is not None and depth >= maxDepth:
+                continue
+            for position in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[position]
+                if visited[neighbor]:
+                    continue
+                if kinds is not None and not kinds[edgeKindArray[position]]:
+                    continue
+                if allowed is not None and not allowed[typeCodes[neighbor]]:
+                    continue
+                visited[neighbor] = 1
+                queue.append((neighbor, depth + 1))
+
+    def getReachable(self, start, maxDepth=None, types=None, edgeKinds=None):
+        """
+        Get all nodes reachable from a node. See traverse for the parameters.
+
+        :returns: Numbers of the reachable nodes including the start node
+        :rtype: array.array
+        """
+        return array('l', (node for node, _ in self.traverse(start, maxDepth, types, edgeKinds)))
+
+    def getConnectedComponents(self):
+        """
+        Label the connected components of the graph.
+
+        :returns: Tuple of the number of components and an array with the component of every node
+        :rtype: tuple
+        """
+        count = self.getNodeCount()
+        indptr, indices = self.indptr, self.indices
+        labels = array('l', [-1]) * count
+        components = 0
+        for root in range(count):
+            if labels[root] != -1:
+                continue
+            labels[root] = components
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                for position in range(indptr[node], indptr[node + 1]):
+                    neighbor = indices[position]
+                    if labels[neighbor] == -1:
+                        labels[neighbor] = components
+                        stack.append(neighbor)
+            components += 1
+        return components, labels
+
+    def getComponentSizes(self):
+        """
+        Get the number of nodes of every connected component, largest first.
+
+        :rtype: list
+        """
+        components, labels = self.getConnectedComponents()
+        sizes = [0] * components
+        for label in labels:
+            sizes[label] += 1
+        return sorted(sizes, reverse=True)
@@ -1,11 +1,12 @@
 from xml.etree.ElementTree import SubElement
+from insalata.model.Node import mutation
 from insalata.model.Service import Service
 
 class DhcpService(Service):
     """
     This class represents a DHCP-Service in the data model.
     """
-    def __init__(self, collectorName=None, timeout=None, address=None):
+    def __init__(self, collectorName=None, timeout=None, address=None, scheduler=None, statistics=None):
         """
         Create a new DhcpService with the given parameters.
 
@@ -14,18 +15,25 @@ class DhcpService(Service):
 
         :param timeout: Timeout the scanner uses.
         :type timeout: int
+
+        :param scheduler: Scheduler of the verification leases of this service
+        :type scheduler: insalata.LeaseScheduler.LeaseScheduler
+
+        :param statistics: Accounting of the graph of this service
+        :type statistics: insalata.model.GraphStatistics.GraphStatistics
         """
-        Service.__init__(self, 67, "udp", "dhcp", collectorName=collectorName, timeout=timeout, address=address)
+        Service.__init__(self, 67, "udp", "dhcp", collectorName=collectorName, timeout=timeout, address=address, scheduler=scheduler, statistics=statistics)
 
         self.lease = None
         self.start = None
         self.end = None
         self.announcedGateway = None
 
+    @mutation
     def setLease(self, newLease, collectorName=None, timeout=None):
         if newLease and newLease != self.getLease():
             self.lease = newLease
-            self.getOnChangeEvent().trigger(self, { "type" : "set",  "member"  : "lease", "value" : newLease })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "lease", "value" : newLease } if self.wants("lease") else None)
 
         self.verify(collectorName, timeout)
 
@@ -38,13 +46,14 @@ class DhcpService(Service):
     def getEnd(self):
         return self.end
 
+    @mutation
     def setStartEnd(self, start, end, collectorName=None, timeout=None):
         if start and start != self.getStart():
             self.start = start
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "start", "value" : start })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "start", "value" : start } if self.wants("start") else None)
         if end and end != self.getEnd():
             self.end = end
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "end", "value" :  end})
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "end", "value" : end } if self.wants("end") else None)
 
         self.verify(collectorName, timeout)
 
@@ -71,10 +80,11 @@ class DhcpService(Service):
     def getAnnouncedGateway(self):
         return self.announcedGateway
 
+    @mutation
     def setAnnouncedGateway(self, gateway, collectorName=None, timeout=None):
         if gateway and gateway != self.getAnnouncedGateway():
             self.announcedGateway = gateway
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "announcedGateway", "value" :  gateway})
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "announcedGateway", "value" : gateway } if self.wants("announcedGateway") else None)
 
         self.verify(collectorName, timeout)
 
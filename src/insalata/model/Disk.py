@@ -1,10 +1,10 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 
 class Disk(Node):
 
-    def __init__(self, name, size=None, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, name, size=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.__id = name
         self.__size = size
 
@@ -16,16 +16,16 @@ class Disk(Node):
         return self.getID()
 
     def getHost(self):
-        hosts = self.getAllNeighbors(Host)
-        return list(hosts)[0] if len(hosts) > 0 else None
+        return self.getNeighbor(Host)
 
     def getSize(self):
         return self.__size
     
+    @mutation
     def setSize(self, size, collectorName=None, timeout=None):
         if size and size != self.getSize():
             self.__size = size
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "size", "value" : size })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "size", "value" : size } if self.wants("size") else None)
         self.verify(collectorName, timeout)
 
 
@@ -1,19 +1,21 @@
 from xml.etree.ElementTree import SubElement
 
 
+from insalata.model.Node import mutation
 from insalata.model.Service import Service
 
 
 #Represents a DNS server
 class DnsService(Service):
-    def __init__(self, collectorName=None, timeout=None, address=None):
-        Service.__init__(self, 53, "udp", "dns", collectorName=collectorName, timeout=timeout, address=address)
+    def __init__(self, collectorName=None, timeout=None, address=None, scheduler=None, statistics=None):
+        Service.__init__(self, 53, "udp", "dns", collectorName=collectorName, timeout=timeout, address=address, scheduler=scheduler, statistics=statistics)
         self.domain = None
 
+    @mutation
     def setDomain(self, newDomain, collectorName=None, timeout=None):
         if newDomain and newDomain != self.getDomain():
             self.domain = newDomain
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "domain", "value" : newDomain })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "domain", "value" : newDomain } if self.wants("domain") else None)
 
         self.verify(collectorName, timeout)
 
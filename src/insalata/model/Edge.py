@@ -1,7 +1,15 @@
-from insalata.Timer import Timer
-import datetime
+from insalata.LeaseScheduler import getDefaultScheduler
+import time
+import copy
+
+#Kinds of edges seen from one of their nodes
+EDGE = 0 #Plain edge
+PART_OF = 1 #PartOfEdge: The node is part of the neighbor
+CONTAINS = 2 #PartOfEdge: The neighbor is part of the node
 
 class Edge:
+    __slots__ = ("__nodes", "__scanners", "__lifetimeStart", "__lifetimeEnd", "__name", "__weakref__")
+
     def __init__(self, first, second, collectorName=None, timeout=None, association=None, changed=None, name=None):
         """
         Create a new edge between node 'first' and node 'second'.
@@ -25,23 +33,32 @@ class Edge:
         :param changed: Changed element (Used for OnChange)
         :type changed: insalata.model.Node.Node
         """
-        if first.getDeprecated() or second.getDeprecated():
-            raise BaseException("Node depricated.")
         self.__nodes = (first, second)
-        first.addEdge(self)
-        second.addEdge(self)
-
-        self.__scanners = dict() #List of Timers
-        self.__lifetimeStart = datetime.datetime.now()
+        self.__scanners = None #Collector name -> Lease. Allocated with the first verification
+        self.__lifetimeStart = time.time()
         self.__lifetimeEnd = None
+        self.__name = name if name else None
 
-        self.__name = None
-        if name:
-            self.__name = name
+        with self.writing():
+            if first.getDeprecated() or second.getDeprecated():
+                raise BaseException("Node depricated.")
+            first.addEdge(self)
+            second.addEdge(self)
 
-        self.verify(collectorName, timeout)
+            statistics = first.getStatistics() or second.getStatistics()
+            if statistics is not None:
+                statistics.edgeAdded(self)
 
-        self.callOnChange(first, second, "add", association, changed)
+            self.verify(collectorName, timeout)
+
+            self.callOnChange(first, second, "add", association, changed)
+
+    def writing(self):
+        """
+        Get a context manager holding the write lock of the graph of this edge (See insalata.model.Node.Node.writing).
+        """
+        first, second = self.__nodes
+        return (first if first.getScheduler() is not None else second).writing()
 
     def getName(self):
         return self.__name
@@ -66,23 +83,36 @@ class Edge:
         :param changed: Changed element (Used for OnChange)
         :type changed: insalata.model.Node.Node
         """
-        args = {
-            "type" : mode,
-        }
-        if association:
-            args["member"] = association
-
         if changed:
-            other = self.getOther(changed)
-            args["value"] = other.getGlobalID()
+            args = self.__changeArgs(changed, mode, association)
+            if args is not None:
+                args["value"] = self.getOther(changed).getGlobalID()
             changed.getOnChangeEvent().trigger(changed, args)
         else:
-            args["value"] = second.getGlobalID()
+            args = self.__changeArgs(first, mode, association)
+            if args is not None:
+                args["value"] = second.getGlobalID()
             first.getOnChangeEvent().trigger(first, args)
 
-            args["value"] = first.getGlobalID()
+            args = self.__changeArgs(second, mode, association)
+            if args is not None:
+                args["value"] = first.getGlobalID()
             second.getOnChangeEvent().trigger(second, args)
 
+    @staticmethod
+    def __changeArgs(node, mode, association):
+        """
+        Build the arguments of the onChangeEvent of a node. None if the change has no consumer (See insalata.model.Node.Node.wants).
+        """
+        if not node.wants(association):
+            return None
+        args = {
+            "type" : mode,
+        }
+        if association:
+            args["member"] = association
+        return args
+
 
     def delete(self, association=None, changed=None):
         """
@@ -95,18 +125,43 @@ class Edge:
         :param changed: Changed element (Used for OnChange)
         :type changed: insalata.model.Node.Node
         """
-        self.__lifetimeEnd = datetime.datetime.now()
-        self.callOnChange(self.__nodes[0], self.__nodes[1], "delete", association, changed)
-        for node in self.__nodes:
-            node.removeEdge(self)
-        for timer in list(self.getScanners().keys()):
-            self.getScanners()[timer].cancel()
+        with self.writing():
+            if self.__lifetimeEnd is None: #Edges may be deleted by both of their nodes
+                statistics = self.__nodes[0].getStatistics() or self.__nodes[1].getStatistics()
+                if statistics is not None:
+                    statistics.edgeRemoved(self)
+            self.__lifetimeEnd = time.time()
+            self.callOnChange(self.__nodes[0], self.__nodes[1], "delete", association, changed)
+            for node in self.__nodes:
+                node.removeEdge(self)
+            for timer in list(self.getScanners().keys()):
+                self.getScanners()[timer].cancel()
+
+    def detachedCopy(self, first, second):
+        """
+        Copy this edge between two other nodes without verification leases and without triggering OnChangeEvents.
+
+        :param first: Node replacing the first incident node
+        :type first: insalata.model.Node.Node
+
+        :param second: Node replacing the second incident node
+        :type second: insalata.model.Node.Node
+
+        :returns: The copy of this edge of the same class
+        :rtype: insalata.model.Edge.Edge
+        """
+        clone = copy.copy(self)
+        clone.__nodes = (first, second)
+        clone.__scanners = None
+        first.addEdge(clone)
+        second.addEdge(clone)
+        return clone
 
     def getScanners(self):
         """
-        Get all timers of this node.
+        Get all verification leases of this edge by collector name.
         """
-        return self.__scanners
+        return self.__scanners if self.__scanners is not None else dict()
 
     def getNodes(self):
         """
@@ -129,23 +184,44 @@ class Edge:
                 Method will return None if node does not match one of the incident nodes.
         """
         first, second = self.__nodes
-        return first if second == node else second
+        return first if second is node else second
+
+    def getKind(self, node):
+        """
+        Return the kind of this edge seen from one of its nodes.
 
+        :param node: One of the nodes that are incident to this edge
+        :type node: insalata.model.Node.Node
+
+        :returns: EDGE for plain edges
+        :rtype: int
+        """
+        return EDGE
+
+    def getScheduler(self):
+        """
+        Return the scheduler of the verification leases of this edge.
+        The scheduler of the first incident node that belongs to an environment is used.
+        """
+        first, second = self.__nodes
+        scheduler = first.getScheduler() or second.getScheduler()
+        return scheduler if scheduler is not None else getDefaultScheduler()
 
-        
     def verify(self, collectorName, timeout):
         """
-        Verify this edge and start the timer.
+        Verify this edge and renew the lease of the scanner.
 
         Keyword arguments:
             collectorName -- Name of the scanner that verifies this edge.
             timeout -- Timeout in seconds. After this timeout the scanner will be deleted from the list of verifying scanners.
         """
         if (collectorName is not None) and (timeout is not None):
-            if collectorName in self.__scanners:
-                self.getScanners()[collectorName].cancel()
-            self.getScanners()[collectorName] = Timer(timeout, self.removeVerification, [collectorName])
-            self.getScanners()[collectorName].start()
+            if self.__scanners is None:
+                self.__scanners = dict()
+            lease = self.__scanners.get(collectorName)
+            if (lease is None) or not lease.renew(timeout):
+                lease = self.__scanners[collectorName] = self.getScheduler().schedule(timeout, self.removeVerificationTimeout, [collectorName])
+            lease.scheduler.record(collectorName, lease)
 
 
     def removeVerification(self, collectorName):
@@ -156,14 +232,30 @@ class Edge:
         Keyword arguments:
             collectorName -- Scanner to remove.
         """
-        if collectorName in list(self.getScanners().keys()):
-            self.getScanners()[collectorName].cancel()
-            self.getScanners().pop(collectorName, None)
-        if len(self.getScanners()) == 0:
-            self.delete()
+        with self.writing():
+            lease = self.getScanners().pop(collectorName, None)
+            if lease is not None:
+                lease.cancel()
+            if len(self.getScanners()) == 0:
+                self.delete()
+
+    def removeVerificationTimeout(self, collectorName):
+        """
+        Called if the lease of a scanner expired.
+        The verification is kept if the scanner renewed it in the meantime.
+
+        Keyword arguments:
+            collectorName -- Scanner whose lease expired.
+        """
+        with self.writing():
+            lease = self.getScanners().get(collectorName)
+            if (lease is not None) and lease.getOver():
+                self.getScanners().pop(collectorName, None)
+            if len(self.getScanners()) == 0:
+                self.delete()
 
     def getTimers(self):
         """
-        Return all verification Timers of this edge.
+        Return all verification leases of this edge.
         """
-        return self.__scanners.values()
\ No newline at end of file
+        return self.__scanners.values() if self.__scanners is not None else ()
\ No newline at end of file
@@ -1,12 +1,27 @@
+import threading
+import weakref
+from functools import partial
+
+_lock = threading.Lock() #Serializes adding and removing handlers of all events
+
 class Event:
     """
     Implement Events in Python.
 
     Class allows to add a handler to the event.
     If the event is triggered, all handlers will be informed.
+
+    The handlers are stored in a tuple which is replaced on every change.
+    Triggering iterates the tuple without copying and is not affected by concurrent changes.
+
+    Handlers are either added directly or subscribed with a Subscription token. Cancelling a token only marks it,
+    the tuple is compacted once more than half of its entries are cancelled => Unsubscribing is amortized O(1).
     """
+    __slots__ = ("handlers", "cancelled")
+
     def __init__(self):
-        self.handlers = set()
+        self.handlers = ()
+        self.cancelled = 0 #Number of cancelled subscriptions still contained in handlers
 
     def add(self, fun):
         """
@@ -15,7 +30,9 @@ class Event:
         :param fun: Function that should be called, if the event is triggered
         :type fun: function reference
         """
-        self.handlers.add(fun)
+        with _lock:
+            if fun not in self.handlers:
+                self.handlers = self.handlers + (fun, )
 
     def remove(self, fun):
         """
@@ -24,8 +41,52 @@ class Event:
         :param fun: Function to remove
         :type fun: function reference
         """
-        if fun in self.handlers:
-            self.handlers.remove(fun)
+        with _lock:
+            if fun in self.handlers:
+                self.handlers = tuple(handler for handler in self.handlers if handler != fun)
+
+    def subscribe(self, fun, weak=False):
+        """
+        Subscribe a handler to this event.
+
+        :param fun: Function that should be called, if the event is triggered
+        :type fun: function reference
+
+        :param weak: Only hold a weak reference to the handler, the object of a bound method is not kept alive.
+                     The subscription is cancelled once the handler is garbage collected
+        :type weak: bool
+
+        :returns: Token to cancel the subscription with
+        :rtype: insalata.model.Event.Subscription
+        """
+        subscription = Subscription(self, fun, weak)
+        with _lock:
+            self.handlers = self.handlers + (subscription, )
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Cancel a subscription of this event. Cancelling a subscription twice has no effect.
+
+        :param subscription: Token returned by subscribe
+        :type subscription: insalata.model.Event.Subscription
+        """
+        with _lock:
+            if subscription.event is not self:
+                return
+            subscription.event = None
+            subscription.handler = None
+            subscription.reference = None
+            self.cancelled += 1
+            if 2 * self.cancelled > len(self.handlers):
+                self.handlers = tuple(handler for handler in self.handlers if not (isinstance(handler, Subscription) and handler.event is None))
+                self.cancelled = 0
+
+    def getHandlerCount(self):
+        """
+        Get the number of handlers that are not cancelled.
+        """
+        return len(self.handlers) - self.cancelled
 
     def trigger(self, sender, args):
         """
@@ -38,4 +99,63 @@ class Event:
         :type args: dict
         """
         for handler in self.handlers:
-            handler(sender, args)
\ No newline at end of file
+            handler(sender, args)
+
+
+def _expired(subscription, reference):
+    """
+    Cancel a weak subscription whose handler was garbage collected.
+    """
+    subscription = subscription()
+    if subscription is not None:
+        subscription.cancel()
+
+class Subscription:
+    """
+    Token of a handler subscribed to an Event.
+
+    The token is stored in the handlers of the event and calls its handler if the event is triggered.
+    A weak subscription holds its handler by a weak reference, bound methods by a weakref.WeakMethod.
+    """
+    __slots__ = ("event", "handler", "reference", "__weakref__")
+
+    def __init__(self, event, fun, weak=False):
+        self.event = event
+        if weak:
+            self.handler = None
+            callback = partial(_expired, weakref.ref(self)) #The reference does not keep the token alive
+            if hasattr(fun, "__self__") and hasattr(fun, "__func__"):
+                self.reference = weakref.WeakMethod(fun, callback)
+            else:
+                self.reference = weakref.ref(fun, callback)
+        else:
+            self.handler = fun
+            self.reference = None
+
+    def __call__(self, sender, args):
+        handler = self.handler
+        if handler is None:
+            reference = self.reference
+            handler = reference() if reference is not None else None
+            if handler is None: #Cancelled or collected
+                return
+        handler(sender, args)
+
+    def getHandler(self):
+        """
+        Get the subscribed handler. None if the subscription is cancelled or the handler was garbage collected.
+        """
+        if self.handler is not None:
+            return self.handler
+        return self.reference() if self.reference is not None else None
+
+    def isActive(self):
+        return self.event is not None
+
+    def cancel(self):
+        """
+        Unsubscribe the handler from the event.
+        """
+        event = self.event
+        if event is not None:
+            event.unsubscribe(self)
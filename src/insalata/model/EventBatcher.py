@@ -0,0 +1,241 @@
+import threading
+import traceback
+import time
+from collections import deque
+from functools import partial
+
+from insalata.model.Event import Event
+from insalata.model.EventDispatcher import BLOCK, DROP_OLDEST, COALESCE, POLICIES, DEFAULT_QUEUE_SIZE
+
+DEFAULT_BATCH_SIZE = 500 #Maximum number of events in one batch
+DEFAULT_WINDOW = 1 #Maximum time in seconds an event waits for its batch
+
+class EventBatcher:
+    """
+    Batched delivery of the object events of a graph.
+
+    The batcher collects the events of the objectNew-, objectChanged- and objectDeletedEvent in trigger order.
+    A batch is delivered by the thread of the batcher as soon as it contains maxSize events or its first event
+    waited window seconds.
+
+    At most queueSize events are pending. The overflow policies are those of insalata.model.EventDispatcher.EventDispatcher:
+    block, drop-oldest or coalesce.
+
+    Handlers of the batch event receive a dictionary:
+        - version   Version of the graph the consumer is up to after applying the batch
+        - events    List of tuples (kind, args) with kind being 'new', 'changed' or 'deleted'
+                    and args the arguments of the original event
+    """
+
+    def __init__(self, name, onNewEvent, onDeletedEvent, onChangedEvent, maxSize=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, logger=None,
+                 queueSize=DEFAULT_QUEUE_SIZE, policy=DROP_OLDEST, holdsLock=None):
+        """
+        Create a new batcher, subscribe to the events and start its thread.
+
+        :param name: Name of the subscriber. Used for the thread
+        :type name: str
+
+        :param onNewEvent: Event triggered for new objects
+        :type onNewEvent: insalata.model.Event.Event
+
+        :param onDeletedEvent: Event triggered for deleted objects
+        :type onDeletedEvent: insalata.model.Event.Event
+
+        :param onChangedEvent: Event triggered for changed objects
+        :type onChangedEvent: insalata.model.Event.Event
+
+        :param maxSize: Number of events flushing a batch
+        :type maxSize: int
+
+        :param window: Time in seconds after which a batch is flushed
+        :type window: float
+
+        :param logger: (optional) Logger for errors of the handlers
+        :type logger: logging:Logger
+
+        :param queueSize: Maximum number of pending events
+        :type queueSize: int
+
+        :param policy: Overflow policy: block, drop-oldest or coalesce
+        :type policy: str
+
+        :param holdsLock: (optional) Function testing if the triggering thread holds the graph lock.
+                          Such a thread is never blocked (See insalata.model.EventDispatcher.EventDispatcher)
+        :type holdsLock: function reference
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown overflow policy '{0}'. Use one of {1}.".format(policy, ", ".join(POLICIES)))
+        self.name = name
+        self.maxSize = max(1, int(maxSize))
+        self.window = float(window)
+        self.logger = logger
+        self.queueSize = max(1, int(queueSize))
+        self.policy = policy
+        self.holdsLock = holdsLock
+
+        self.__batchEvent = Event()
+        self.__buffer = deque() #Pending entries: [key, kind, args]
+        self.__pending = dict() #Coalescing key -> Pending entry
+        self.__firstTime = None #Time the first event of the current batch was added
+        self.__condition = threading.Condition()
+        self.__stopped = False
+
+        self.__delivered = 0
+        self.__dropped = 0
+        self.__coalesced = 0
+        self.__blocked = 0
+        self.__overflowed = 0 #Events buffered beyond queueSize as the triggering thread held the lock
+        self.__maxDepth = 0
+
+        self.__subscriptions = [
+            onNewEvent.subscribe(partial(self.__add, "new")),
+            onChangedEvent.subscribe(partial(self.__add, "changed")),
+            onDeletedEvent.subscribe(partial(self.__add, "deleted"))
+        ]
+
+        self.__thread = threading.Thread(target=self.__run, name="EventBatcher-{0}".format(name))
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def getBatchEvent(self):
+        """
+        Return the batch event of this batcher.
+
+        The batch event is triggered by the thread of the batcher for every flushed batch.
+        """
+        return self.__batchEvent
+
+    def getStatistics(self):
+        """
+        Get the counters of this batcher.
+
+        :returns: Dictionary with the same keys as insalata.model.EventDispatcher.EventDispatcher.getStatistics
+                  and the batch size. Delivered counts events, not batches
+        :rtype: dict
+        """
+        with self.__condition:
+            return {
+                "name" : self.name,
+                "policy" : self.policy,
+                "queueSize" : self.queueSize,
+                "batchSize" : self.maxSize,
+                "depth" : len(self.__buffer),
+                "maxDepth" : self.__maxDepth,
+                "delivered" : self.__delivered,
+                "dropped" : self.__dropped,
+                "coalesced" : self.__coalesced,
+                "blocked" : self.__blocked,
+                "overflowed" : self.__overflowed
+            }
+
+    def __add(self, kind, sender, args):
+        args = dict(args)
+        key = self.__coalescingKey(kind, args) if self.policy == COALESCE else None
+        locked = self.policy == BLOCK and self.holdsLock is not None and self.holdsLock()
+        with self.__condition:
+            if self.__stopped:
+                return
+            if key is not None and len(self.__buffer) >= self.queueSize: #Coalesce only on overflow
+                entry = self.__pending.get(key)
+                if entry is not None:
+                    entry[2] = args
+                    self.__coalesced += 1
+                    return
+
+            while len(self.__buffer) >= self.queueSize:
+                if locked:
+                    self.__overflowed += 1
+                    break
+                elif self.policy == BLOCK:
+                    self.__blocked += 1
+                    self.__condition.wait()
+                    if self.__stopped:
+                        return
+                else:
+                    self.__unlink(self.__buffer.popleft())
+                    self.__dropped += 1
+
+            entry = [key, kind, args]
+            self.__buffer.append(entry)
+            if key is not None:
+                self.__pending[key] = entry
+            if len(self.__buffer) > self.__maxDepth:
+                self.__maxDepth = len(self.__buffer)
+            if len(self.__buffer) == 1:
+                self.__firstTime = time.monotonic()
+                self.__condition.notify_all()
+            elif len(self.__buffer) >= self.maxSize:
+                self.__condition.notify_all()
+
+    def __coalescingKey(self, kind, args):
+        """
+        Get the key identifying events that can replace each other (See insalata.model.EventDispatcher.EventDispatcher).
+        """
+        if "object" not in args:
+            return None
+        key = (kind, args.get("objectType"), args["object"], args.get("type"), args.get("member"))
+        if args.get("type") in ("add", "delete"):
+            key += (args.get("value"), )
+        return key
+
+    def __unlink(self, entry):
+        if entry[0] is not None and self.__pending.get(entry[0]) is entry:
+            del self.__pending[entry[0]]
+
+    def stop(self, timeout=None):
+        """
+        Unsubscribe from the events, deliver the pending events and stop the thread.
+
+        :param timeout: (optional) Time in seconds to wait for the last batch
+        :type timeout: float
+        """
+        for subscription in self.__subscriptions:
+            subscription.cancel()
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        if self.__thread is not threading.current_thread():
+            self.__thread.join(timeout)
+
+    def __run(self):
+        """
+        Flush the buffer if the batch is full or its window elapsed.
+        """
+        while True:
+            with self.__condition:
+                while True:
+                    if len(self.__buffer) == 0:
+                        if self.__stopped:
+                            return
+                        self.__condition.wait()
+                        continue
+                    remaining = self.__firstTime + self.window - time.monotonic()
+                    if self.__stopped or len(self.__buffer) >= self.maxSize or remaining <= 0:
+                        break
+                    self.__condition.wait(remaining)
+
+                events = list()
+                while len(self.__buffer) > 0 and len(events) < self.maxSize:
+                    entry = self.__buffer.popleft()
+                    self.__unlink(entry)
+                    events.append((entry[1], entry[2]))
+                self.__firstTime = time.monotonic() if len(self.__buffer) > 0 else None
+                self.__condition.notify_all() #Wake up blocked producers
+
+            self.__deliver(events)
+            with self.__condition:
+                self.__delivered += len(events)
+
+    def __deliver(self, events):
+        versions = [args["version"] for _, args in events if "version" in args]
+        batch = {
+            "version" : max(versions) if len(versions) > 0 else None,
+            "events" : events
+        }
+        try:
+            self.__batchEvent.trigger(self, batch)
+        except Exception:
+            if self.logger:
+                self.logger.error("Error in batch handler of {0}: {1}".format(self.name, traceback.format_exc().replace("\n", "--")))
+            else:
+                traceback.print_exc()
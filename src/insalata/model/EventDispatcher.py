@@ -0,0 +1,271 @@
+import threading
+import traceback
+from collections import deque
+from functools import partial
+
+from insalata.model.Event import Subscription
+
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+COALESCE = "coalesce"
+POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+DEFAULT_QUEUE_SIZE = 1000
+
+class EventDispatcher:
+    """
+    Asynchronous delivery of events to one subscriber.
+
+    Events of all wrapped events are put into one bounded queue in the order they are triggered.
+    A dedicated thread delivers them to the handlers of the subscriber.
+    A slow subscriber therefore does not stall the thread triggering the event.
+
+    Overflow policies if the queue is full:
+        - block         The triggering thread waits for free space.
+                        A thread holding the lock of the graph (See holdsLock) does not wait, its event is queued
+                        beyond queueSize => A handler reading the graph does not deadlock with the triggering thread.
+                        Events are triggered under the graph lock by getOrCreate*, setters and expiring leases, so the
+                        queue exceeds its size by at most the events of one such call.
+        - drop-oldest   The oldest pending event is discarded
+        - coalesce      Pending events of the same object and member are replaced by the newer one.
+                        The oldest pending event is discarded if nothing can be coalesced.
+    """
+
+    def __init__(self, name, queueSize=DEFAULT_QUEUE_SIZE, policy=DROP_OLDEST, logger=None, holdsLock=None):
+        """
+        Create a new dispatcher and start its delivery thread.
+
+        :param name: Name of the subscriber. Used for the delivery thread
+        :type name: str
+
+        :param queueSize: Maximum number of pending events
+        :type queueSize: int
+
+        :param policy: Overflow policy: block, drop-oldest or coalesce
+        :type policy: str
+
+        :param logger: (optional) Logger for errors of the handlers
+        :type logger: logging:Logger
+
+        :param holdsLock: (optional) Function testing if the triggering thread holds a lock the handlers may wait for,
+                          e.g. insalata.model.Graph.Graph.holdsLock. Such a thread is never blocked
+        :type holdsLock: function reference
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown overflow policy '{0}'. Use one of {1}.".format(policy, ", ".join(POLICIES)))
+        self.name = name
+        self.queueSize = max(1, int(queueSize))
+        self.policy = policy
+        self.logger = logger
+        self.holdsLock = holdsLock
+
+        self.__queue = deque() #Pending entries: [key, handler, sender, args]
+        self.__pending = dict() #Coalescing key -> Pending entry
+        self.__condition = threading.Condition()
+        self.__stopped = False
+
+        self.__delivered = 0
+        self.__dropped = 0
+        self.__coalesced = 0
+        self.__blocked = 0
+        self.__overflowed = 0 #Events queued beyond queueSize as the triggering thread held the lock
+        self.__maxDepth = 0
+
+        self.__thread = threading.Thread(target=self.__run, name="EventDispatcher-{0}".format(name))
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def wrap(self, event):
+        """
+        Get a view on an event whose handlers are called by this dispatcher.
+
+        :param event: Event to wrap
+        :type event: insalata.model.Event.Event
+
+        :returns: Object supporting add and remove like the wrapped event
+        :rtype: insalata.model.EventDispatcher.DispatchedEvent
+        """
+        return DispatchedEvent(self, event)
+
+    def put(self, handler, sender, args):
+        """
+        Queue an event for the given handler.
+
+        :param handler: Handler of the subscriber
+        :type handler: function reference
+
+        :param sender: The trigger of the event
+        :type sender: object reference
+
+        :param args: Arguments of the triggered event
+        :type args: dict
+        """
+        args = dict(args) #Arguments are reused by some triggering methods
+        key = self.__coalescingKey(handler, args) if self.policy == COALESCE else None
+        locked = self.policy == BLOCK and self.holdsLock is not None and self.holdsLock()
+        with self.__condition:
+            if self.__stopped:
+                return
+            if key is not None and len(self.__queue) >= self.queueSize: #Coalesce only on overflow
+                entry = self.__pending.get(key)
+                if entry is not None:
+                    entry[2] = sender
+                    entry[3] = args
+                    self.__coalesced += 1
+                    return
+
+            while len(self.__queue) >= self.queueSize:
+                if locked:
+                    self.__overflowed += 1
+                    break
+                elif self.policy == BLOCK:
+                    self.__blocked += 1
+                    self.__condition.wait()
+                    if self.__stopped:
+                        return
+                else:
+                    self.__unlink(self.__queue.popleft())
+                    self.__dropped += 1
+
+            entry = [key, handler, sender, args]
+            self.__queue.append(entry)
+            if key is not None:
+                self.__pending[key] = entry
+            if len(self.__queue) > self.__maxDepth:
+                self.__maxDepth = len(self.__queue)
+            self.__condition.notify_all()
+
+    def __coalescingKey(self, handler, args):
+        """
+        Get the key identifying events that can replace each other.
+        Changes of associations include the associated object, as adding one object does not replace adding another one.
+        """
+        if "object" not in args:
+            return None
+        key = (handler, args.get("objectType"), args["object"], args.get("type"), args.get("member"))
+        if args.get("type") in ("add", "delete"):
+            key += (args.get("value"), )
+        return key
+
+    def __unlink(self, entry):
+        if entry[0] is not None and self.__pending.get(entry[0]) is entry:
+            del self.__pending[entry[0]]
+
+    def getStatistics(self):
+        """
+        Get the counters of this dispatcher.
+
+        :returns: Dictionary with the current and maximal queue depth and the number of delivered, dropped,
+                  coalesced and blocked events and of events queued beyond the size by a thread holding the lock
+        :rtype: dict
+        """
+        with self.__condition:
+            return {
+                "name" : self.name,
+                "policy" : self.policy,
+                "queueSize" : self.queueSize,
+                "depth" : len(self.__queue),
+                "maxDepth" : self.__maxDepth,
+                "delivered" : self.__delivered,
+                "dropped" : self.__dropped,
+                "coalesced" : self.__coalesced,
+                "blocked" : self.__blocked,
+                "overflowed" : self.__overflowed
+            }
+
+    def stop(self, timeout=None):
+        """
+        Stop the dispatcher after delivering all pending events.
+
+        :param timeout: (optional) Time in seconds to wait for the delivery of the pending events
+        :type timeout: float
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        if self.__thread is not threading.current_thread():
+            self.__thread.join(timeout)
+
+    def __run(self):
+        """
+        Deliver the queued events to the handlers.
+        """
+        while True:
+            with self.__condition:
+                while len(self.__queue) == 0:
+                    if self.__stopped:
+                        return
+                    self.__condition.wait()
+                entry = self.__queue.popleft()
+                self.__unlink(entry)
+                self.__condition.notify_all() #Wake up blocked producers
+
+            _, handler, sender, args = entry
+            try:
+                handler(sender, args)
+            except Exception:
+                if self.logger:
+                    self.logger.error("Error in event handler of {0}: {1}".format(self.name, traceback.format_exc().replace("\n", "--")))
+                else:
+                    traceback.print_exc()
+            with self.__condition:
+                self.__delivered += 1
+
+
+class DispatchedEvent:
+    """
+    View on an event that delivers to its handlers through an EventDispatcher.
+    """
+
+    def __init__(self, dispatcher, event):
+        self.dispatcher = dispatcher
+        self.event = event
+        self.__forwarders = dict() #Handler -> Function registered at the wrapped event
+
+    def add(self, fun):
+        """
+        Add a handler called by the delivery thread of the dispatcher.
+
+        :param fun: Function that should be called, if the event is triggered
+        :type fun: function reference
+        """
+        if fun not in self.__forwarders:
+            forwarder = lambda sender, args: self.dispatcher.put(fun, sender, args)
+            self.__forwarders[fun] = forwarder
+            self.event.add(forwarder)
+
+    def remove(self, fun):
+        """
+        Remove a handler.
+
+        :param fun: Function to remove
+        :type fun: function reference
+        """
+        forwarder = self.__forwarders.pop(fun, None)
+        if forwarder is not None:
+            self.event.remove(forwarder)
+
+    def subscribe(self, fun, weak=False):
+        """
+        Subscribe a handler called by the delivery thread of the dispatcher. See insalata.model.Event.Event.subscribe.
+
+        :returns: Token to cancel the subscription with
+        :rtype: insalata.model.Event.Subscription
+        """
+        subscription = Subscription(self, fun, weak)
+        self.__forwarders[subscription] = self.event.subscribe(partial(self.dispatcher.put, subscription))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Cancel a subscription of this view. Events already queued for the handler are dropped on delivery.
+
+        :param subscription: Token returned by subscribe
+        :type subscription: insalata.model.Event.Subscription
+        """
+        forwarder = self.__forwarders.pop(subscription, None)
+        if forwarder is not None:
+            subscription.event = None
+            subscription.handler = None
+            subscription.reference = None
+            forwarder.cancel()
@@ -1,11 +1,11 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Edge import Edge
 
 #Container for routes of a router
 class FirewallRaw(Node):
-    def __init__(self, firewall, data=None, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, firewall, data=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.firewall = firewall
 
         #remove left whitespaces on each line
@@ -16,6 +16,9 @@ class FirewallRaw(Node):
         return self.firewall
 
     def getGlobalID(self):
+        return self.getCachedGlobalID(self.__computeGlobalID)
+
+    def __computeGlobalID(self):
         return (self.getHost().getID() + "_" + self.getID()) if self.getHost() else self.getID()
 
     def getFirewall(self):
@@ -24,16 +27,16 @@ class FirewallRaw(Node):
     def getData(self):
         return self.data
 
+    @mutation
     def setData(self, data, collectorModule, timeout):
         if data != self.getData():
             self.data = data
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "data", "value" : str(data) })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "data", "value" : str(data) } if self.wants("data") else None)
 
         self.verify(collectorModule, timeout)
 
     def getHost(self):
-        hosts = self.getAllNeighbors(Host)
-        return list(hosts)[0] if len(hosts) > 0 else None
+        return self.getNeighbor(Host)
 
     def __attrs(self):
         return (self.firewall, self.data)
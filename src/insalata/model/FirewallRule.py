@@ -1,12 +1,12 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Edge import Edge
 from insalata.model.Host import Host
 
 #Container for routes of a router
 class FirewallRule(Node):
-    def __init__(self, chain, action, protocol, srcnet=None, destnet=None, srcports=None, destports=None, inInterface=None, outInterface=None, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, chain, action, protocol, srcnet=None, destnet=None, srcports=None, destports=None, inInterface=None, outInterface=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.chain = chain
         self.action = action
         self.protocol = protocol
@@ -25,11 +25,15 @@ class FirewallRule(Node):
         return str(self.__hash__())
 
     def getGlobalID(self):
-        hosts = list(self.getAllNeighbors(Host))
-        if len(hosts) == 0:
+        return self.getCachedGlobalID(self.__computeGlobalID)
+
+    def __computeGlobalID(self):
+        host = self.getNeighbor(Host)
+        if host is None:
             return self.getID()
-        return hosts[0].getID() + "_" + self.getID()
+        return host.getID() + "_" + self.getID()
 
+    @mutation
     def setInInterface(self, newInterface, collectorName=None, timeout=None):
         """
         Set the inInterface of this firewall rule.
@@ -52,6 +56,7 @@ class FirewallRule(Node):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
+    @mutation
     def setOutInterface(self, newInterface, collectorName=None, timeout=None):
         """
         Set the outInterface of this firewall rule.
@@ -4,59 +4,87 @@ from lxml import etree
 from insalata.builder.Builder import Builder
 from insalata.model.Node import Node
 from insalata.model.Event import Event
-from functools import partial
+from insalata.model.GraphStatistics import GraphStatistics
+from insalata.model.TopicRegistry import TopicRegistry
+from insalata.model.Transaction import Transaction
+from insalata.LeaseScheduler import LeaseScheduler
+from insalata.helper.ReadWriteLock import ReadWriteLock
+import contextvars
 import itertools
 import threading
+import weakref
 import traceback
+import pickle
+import tempfile
+import time
+import os
 
 import logging
 import sys
 import pkgutil
 import importlib
 
+CHECKPOINT_FORMAT = 1 #Increased with every incompatible change of the checkpoint layout
+
+#Name of the collector module running in the current thread or task => Changes are counted per collector
+currentCollector = contextvars.ContextVar("currentCollector", default=None)
+
 class Graph(Node):
     def __init__(self, id, allL2Networks=set(), allL3Networks=set(), locations=set(), allHosts=set()):
-        Node.__init__(self)
+        #One handler object registered at all nodes => No allocation per node, removable by identity
+        self.__changedHandler = self.objectChanged
+        self.__deletedHandler = self.objectDeleted
+
+        #Shared for exports, queries and planning, exclusive for the getOrCreate* methods, transactions and expired leases
+        self.__lock = ReadWriteLock()
+        self.__statistics = GraphStatistics(self) #Passed to every node like the scheduler => The edges of the graph are accounted
+        Node.__init__(self, scheduler=LeaseScheduler(id, lock=self.__writing), statistics=self.__statistics) #One expiry service for all verification leases of this graph
         self.id = id
-        for host in allHosts:
-            Edge(self, host)
-
-        for network in allL2Networks:
-            Edge(self, network)
-
-        for network in allL3Networks:
-            Edge(self, network)
-
-        for location in locations:
-            Edge(self, location)
-
-        self.__locks = {
-            Host : threading.Lock(),
-            DhcpService : threading.Lock(),
-            Disk : threading.Lock(),
-            DnsService : threading.Lock(),
-            Interface : threading.Lock(),
-            Layer2Network : threading.Lock(),
-            Layer3Address : threading.Lock(),
-            Layer3Network : threading.Lock(),
-            Location : threading.Lock(),
-            Route : threading.Lock(),
-            Service : threading.Lock(),
-            FirewallRule : threading.Lock(),
-            FirewallRaw : threading.Lock()
+
+        #Identity indexes used by the getOrCreate* methods => Upserts do not scan all neighbors
+        self.__index = {
+            Host : dict(),
+            Interface : dict(),
+            Layer2Network : dict(),
+            Layer3Address : dict(),
+            Layer3Network : dict(),
+            Location : dict()
         }
+        self.__interfaceIDs = dict() #Interface ID (enx...) -> Interface. Used by configurations referencing interfaces
+        self.__hostIndex = dict() #(Host ID, class, identifying values) -> Route or FirewallRule of the host
+        self.__hostIndexKeys = dict() #id() of an indexed route or rule -> Its key in the host index
+
+        for node in itertools.chain(allHosts, allL2Networks, allL3Networks, locations):
+            Edge(self, node)
+            self.__addToIndex(node)
+            self.__statistics.objectAdded(node)
+
+        self.__version = 0 #Number of changes published by this graph
+        self.__versionLock = threading.Lock()
+        self.__changeCounts = dict() #Collector name -> Number of changes published while it was running
+
+        self.__transactions = threading.local() #Stack of the open transactions of each thread
+        self.__publishLock = threading.Lock() #Keeps the change sets of concurrent transactions in commit order
+        self.__publisher = None #Thread identifier of the thread holding the publish lock
 
         self.__objectChangedEvent = Event()
         self.__objectNewEvent = Event()
         self.__objectDeletedEvent = Event()
+        self.__changeSetEvent = Event()
+        self.__mutationEvent = Event()
+        self.__objectEvents = { "new" : self.__objectNewEvent, "changed" : self.__objectChangedEvent, "deleted" : self.__objectDeletedEvent }
+        self.__topics = TopicRegistry() #Subscriptions filtered by type, kind and member
 
-        self.__out = open("output.txt", "w")
+        self.__readOnly = False #Snapshots can not be changed by the getOrCreate* methods and transactions
+        self.__snapshot = None #Weak reference to the latest snapshot => Reclaimed if no reader holds it anymore
 
     def getObjectChangedEvent(self):
         """
         Return the objectChangedEvent of the graph.
 
         The objectChangedEvent is triggered everytime a object in the graph changes.
+        Outside of transactions the handlers are called by the changing thread holding the write lock of the graph
+        (See insalata.model.Node.mutation) => They may read the graph but must not wait for other readers.
         """
         return self.__objectChangedEvent
 
@@ -76,44 +104,745 @@ class Graph(Node):
         """
         return self.__objectDeletedEvent
 
+    def getChangeSetEvent(self):
+        """
+        Return the changeSetEvent of this graph.
+
+        The changeSetEvent is triggered once for every committed transaction.
+        Its arguments are the coalesced changes of the transaction (See insalata.model.Transaction.Transaction.getChangeSet).
+        The objectNew-, objectChanged- and objectDeletedEvents are triggered for the coalesced changes afterwards.
+        """
+        return self.__changeSetEvent
+
+    def getMutationEvent(self):
+        """
+        Return the mutationEvent of this graph.
+
+        The mutationEvent is triggered synchronously by the thread changing an object, inside transactions as well.
+        The sender is the changed object, the arguments contain the 'kind' of the change: 'new', 'changed' or 'deleted'.
+        Used to track the changed objects, e.g. by insalata.model.WriteAheadLog.WriteAheadLog.
+        """
+        return self.__mutationEvent
+
+    def subscribe(self, fun, types=None, kinds=None, members=None, weak=False):
+        """
+        Subscribe to the object events of this graph filtered by object type, event kind and member,
+        e.g. subscribe(handler, types={Host}, members={"powerState"}).
+
+        The handler is called like the handlers of the objectNew-, objectChanged- and objectDeletedEvent, after them.
+        The arguments of an event are only built if the plain events or any matching subscription consume it.
+
+        :param fun: Function called with this graph and the arguments of the event
+        :type fun: function reference
+
+        :param types: (optional) Classes of the objects, subclasses match as well. All objects if None
+        :type types: set
+
+        :param kinds: (optional) Kinds of the events: 'new', 'changed' or 'deleted'. All kinds if None
+        :type kinds: set
+
+        :param members: (optional) Names of the members whose changes are delivered. Only restricts 'changed' events
+        :type members: set
+
+        :param weak: Only hold a weak reference to the handler (See insalata.model.Event.Event.subscribe)
+        :type weak: bool
+
+        :returns: Token to cancel the subscription with
+        :rtype: insalata.model.Event.Subscription
+        """
+        return self.__topics.subscribe(fun, types, kinds, members, weak)
+
+    def transaction(self, collectorName, timeout):
+        """
+        Create a new transaction for a collector.
+        The graph is locked for writing once for the whole with block and the events of all mutations are published
+        as one coalesced change set when the block is left.
+
+        :param collectorName: Name of the collector running the transaction
+        :type collectorName: str
+
+        :param timeout: Timeout of the collector
+        :type timeout: int
+
+        :returns: Transaction to use in a with statement
+        :rtype: insalata.model.Transaction.Transaction
+        """
+        return Transaction(self, collectorName, timeout)
+
+    def beginTransaction(self, transaction):
+        """
+        Begin a transaction on the calling thread. Nested transactions are part of the outermost one.
+
+        :param transaction: Transaction to begin
+        :type transaction: insalata.model.Transaction.Transaction
+        """
+        stack = getattr(self.__transactions, "stack", None)
+        if stack is None:
+            stack = self.__transactions.stack = list()
+        if len(stack) == 0:
+            self.__checkWritable()
+            self.__lock.acquireWrite()
+        stack.append(transaction)
+
+    def commitTransaction(self, transaction):
+        """
+        Commit a transaction of the calling thread. Unlock the graph and publish the change set of the outermost transaction.
+
+        :param transaction: Transaction to commit
+        :type transaction: insalata.model.Transaction.Transaction
+        """
+        stack = self.__transactions.stack
+        if len(stack) == 0 or stack[-1] is not transaction:
+            raise RuntimeError("Transaction of collector {0} is not the innermost transaction of this thread.".format(transaction.getCollectorName()))
+        stack.pop()
+        if len(stack) > 0:
+            return
+
+        outermost = transaction
+        self.__publishLock.acquire()
+        self.__publisher = threading.get_ident()
+        try:
+            self.__lock.releaseWrite()
+            if outermost.isEmpty():
+                return
+
+            changeSet = outermost.getChangeSet()
+            for args in itertools.chain(changeSet["new"], changeSet["changed"], changeSet["deleted"]):
+                args["version"] = self.__nextVersion()
+            changeSet["version"] = self.getVersion()
+            self.getChangeSetEvent().trigger(self, changeSet)
+            for kind in ["new", "changed", "deleted"]:
+                for args in changeSet[kind]:
+                    self.__objectEvents[kind].trigger(self, args)
+                    self.__topics.publish(kind, OBJECT_TYPES[args["objectType"]], self, args)
+        finally:
+            self.__publisher = None
+            self.__publishLock.release()
+
+    def holdsLock(self):
+        """
+        Test if the calling thread holds the graph lock for writing or publishes a committed transaction.
+        Readers and writers of the graph may wait for such a thread => It must not wait for them.
+        """
+        return self.__lock.isWriting() or self.__publisher == threading.get_ident()
+
+    def reading(self):
+        """
+        Get a context manager holding the graph lock for reading.
+        Any number of readers may walk the graph concurrently, writers wait until all readers are finished.
+
+        Usage:
+            with graph.reading():
+                hosts = graph.getHosts()
+        """
+        return self.__lock.reading()
+
+    def writing(self):
+        """
+        Get a context manager holding the graph lock exclusively.
+        """
+        return self.__lock.writing()
+
+    def __checkWritable(self):
+        if self.__readOnly:
+            raise RuntimeError("Snapshot {0} of version {1} can not be changed.".format(self.getID(), self.getVersion()))
+
+    def __writing(self):
+        """
+        Get a context manager holding the graph lock exclusively for the getOrCreate* methods, expiring leases and
+        the setters of the objects (See insalata.model.Node.Node.writing). Raises a RuntimeError on snapshots.
+        """
+        self.__checkWritable()
+        return self.__lock.writing()
+
+    def getStats(self):
+        """
+        Get the accounting of this graph. All counters are maintained incrementally, no object is visited.
+
+        :returns: Dictionary with the number of objects and edges and their approximate bytes by class name
+                  (See insalata.model.GraphStatistics.GraphStatistics), the number of running leases of verifications
+                  and collector timers, the number of handlers of each event of the graph and the version of the graph
+        :rtype: dict
+        """
+        stats = self.__statistics.getStatistics()
+        stats["leases"] = self.getScheduler().getLeaseCount()
+        stats["handlers"] = {
+            "objectNew" : self.__objectNewEvent.getHandlerCount(),
+            "objectChanged" : self.__objectChangedEvent.getHandlerCount(),
+            "objectDeleted" : self.__objectDeletedEvent.getHandlerCount(),
+            "changeSet" : self.__changeSetEvent.getHandlerCount(),
+            "mutation" : self.__mutationEvent.getHandlerCount(),
+            "topics" : self.__topics.getSubscriptionCount(),
+            "objects" : stats.pop("objectHandlers")
+        }
+        stats["version"] = self.getVersion()
+        return stats
+
+    def getLockStatistics(self):
+        """
+        Get the contention counters of the graph lock.
+        See insalata.helper.ReadWriteLock.ReadWriteLock.getStatistics.
+        """
+        return self.__lock.getStatistics()
+
+    def getVersion(self):
+        """
+        Get the version of this graph.
+
+        The version is increased with every published change. The arguments of each objectNew-, objectChanged- and
+        objectDeletedEvent contain the version of the graph including this change as 'version'.
+        """
+        return self.__version
+
+    def __nextVersion(self):
+        collector = currentCollector.get()
+        with self.__versionLock:
+            self.__version += 1
+            if collector is not None:
+                self.__changeCounts[collector] = self.__changeCounts.get(collector, 0) + 1
+            return self.__version
+
+    def getChangeCount(self, collectorName):
+        """
+        Get the number of changes published while a collector was running (See currentCollector).
+
+        :param collectorName: Name of the collector
+        :type collectorName: str
+        """
+        return self.__changeCounts.get(collectorName, 0)
+
+    def recordVerifications(self, collectorName):
+        """
+        Start recording the verifications renewed by a collector for extendVerifications.
+        Nothing happens if they are already recorded.
+
+        :param collectorName: Name of the collector
+        :type collectorName: str
+        """
+        self.getScheduler().keepJournal(collectorName)
+
+    def extendVerifications(self, collectorName, duration, since):
+        """
+        Postpone the expiry of the verifications of a collector renewed since a point in time.
+        Verifications the collector did not renew since then expire as before.
+
+        Only the verifications recorded for the collector since the last call are visited (See recordVerifications)
+        => The cost does not depend on the size of the graph. Every call starts a new record, a duration of 0 only
+        drops the current one.
+
+        :param collectorName: Name of the collector
+        :type collectorName: str
+
+        :param duration: Additional time in seconds
+        :type duration: float
+
+        :param since: Time on the clock of the lease scheduler (See insalata.LeaseScheduler.LeaseScheduler.now)
+        :type since: float
+
+        :returns: Number of extended verifications
+        :rtype: int
+        """
+        extended = 0
+        leases = self.getScheduler().takeJournal(collectorName)
+        if duration <= 0:
+            return extended
+        for lease in leases:
+            deadline = lease.deadline
+            if deadline is not None and deadline - lease.duration >= since and lease.extend(duration):
+                extended += 1
+        return extended
+
+    def __currentTransaction(self):
+        stack = getattr(self.__transactions, "stack", None)
+        return stack[0] if stack else None
+
+    def stop(self):
+        """
+        Stop the expiry service of this graph. Verification leases will not expire anymore.
+        """
+        self.getScheduler().stop()
+
     def freeze(self):
         """
-        Freeze the graph => Pause every Timer of every Node
+        Freeze the graph => Pause the clock of the lease scheduler.
+        No verification of a node or edge expires while the graph is frozen.
         """
-        for node in self.getAllNeighbors(type=None):
-            for timer in node.getTimers():
-                timer.pause()
-            for edge in node.getEdges():
-                for timer in edge.getTimers():
-                    timer.pause()
+        self.getScheduler().pauseClock()
 
     def melt(self): # ;)
         """
-        Unfreeze the graph => Resume every timer of the nodes
+        Unfreeze the graph => Resume the clock of the lease scheduler.
+        Every verification keeps the remaining time it had when the graph was frozen.
         """
-        for node in self.getAllNeighbors(type=None):
-            for timer in node.getTimers():
-                timer.resume()
-            for edge in node.getEdges():
-                for timer in edge.getTimers():
-                    timer.resume()
+        self.getScheduler().resumeClock()
 
     def copy(self, configuration=None):
         """
         Copy the graph containing all hosts and networks that are in a given configuration.
         If configuration is None a full copy will be returned.
 
+        The copy is detached from this graph: It consists of copies of the nodes and edges and is not changed
+        by the collectors of this graph. Objects belonging to the selected hosts and networks like locations,
+        templates, services, routes and firewall rules are copied as well.
+
         :param configuration: All hosts and networks must be contained in this configuration
         :type configuration: str
         """
-        hosts = [h for h in self.getAllNeighbors(type=Host) if not configuration or configuration in h.getConfigNames()]
-        l2networks = [n for n in self.getAllNeighbors(type=Layer2Network) if not configuration or configuration in n.getConfigNames()]
-        interfaces = list(itertools.chain(*[h.getInterfaces() for h in hosts])) # Get all interfaces of hosts in this configuration
-        l3addresses = list(itertools.chain(*[i.getAddresses() for i in interfaces])) # Get all l3addresses of those interfaces
-        l3networks = [a.getNetwork() for a in l3addresses] # Get the network of all addresses
-        name = configuration if configuration else self.getID()
+        with self.reading():
+            return self.__materialize(configuration)
+
+    def snapshot(self):
+        """
+        Get an immutable snapshot of this graph at its current version.
+
+        The snapshot is a detached copy taken under the read lock. Readers may hold it as long as they need
+        while collectors keep changing this graph. All readers requesting a snapshot at the same version share one
+        copy, which is reclaimed as soon as no reader references it anymore.
+        Taking a snapshot at a new version copies every object => It costs O(n) time and memory under the read lock.
+        The snapshot must not be changed: Its getOrCreate* methods, transactions and the setters of its objects
+        raise a RuntimeError.
+
+        :returns: Snapshot of this graph. getVersion returns the version of this graph the snapshot represents
+        :rtype: insalata.model.Graph.Graph
+        """
+        with self.reading():
+            snapshot = self.__snapshot() if self.__snapshot is not None else None
+            if snapshot is not None and snapshot.getVersion() == self.getVersion():
+                return snapshot
+            snapshot = self.__materialize(None, True)
+            self.__snapshot = weakref.ref(snapshot)
+            return snapshot
+
+    def isReadOnly(self):
+        return self.__readOnly
+
+    def compact(self):
+        """
+        Freeze this graph into integer node numbers and compressed sparse row adjacency arrays.
+
+        The arrays are built under the read lock and are not changed afterwards. Analytics like reachability
+        and connected components run on them without touching the model objects.
+
+        :returns: Array based copy of this graph at its current version
+        :rtype: insalata.model.CompactGraph.CompactGraph
+        """
+        return CompactGraph(self)
+
+    def query(self, expression, limit=None, cursor=None):
+        """
+        Run a declarative query on the objects of this graph, e.g. 'Host where interface.address.service.port = 22'.
+        See insalata.model.Query.Query for the syntax.
+
+        :param expression: Query
+        :type expression: str
+
+        :param limit: (optional) Maximal number of objects returned
+        :type limit: int
+
+        :param cursor: (optional) Cursor returned with the previous page
+        :type cursor: str
+
+        :returns: Dictionary with the list of 'results' and the 'cursor' of the next page
+        :rtype: dict
+        """
+        return parse(expression).execute(self, limit, cursor)
+
+    def getCheckpoint(self, nodes=None):
+        """
+        Get the state of this graph as plain data: Objects with their attributes and the remaining time of their
+        verification leases, edges and the version of the graph. Taken under the read lock.
+
+        Objects are numbered, edges and attributes referencing other objects store their numbers.
+        Edges to the root of the graph use the number -1.
+
+        :param nodes: (optional) List the objects are appended to in the order of their numbers
+        :type nodes: list
+
+        :returns: Dictionary with the keys 'format', 'id', 'version', 'time', 'nodes' and 'edges'
+        :rtype: dict
+        """
+        with self.reading():
+            objects = [node for node, _ in self.traverse()]
+            numbers = dict((id(node), i) for i, node in enumerate(objects))
+            numbers[id(self)] = -1
+
+            edgeStates = list()
+            copiedEdges = set()
+            for node in objects:
+                for edge in node.getEdges():
+                    if id(edge) not in copiedEdges:
+                        copiedEdges.add(id(edge))
+                        edgeState = self.getEdgeState(edge, numbers)
+                        if edgeState is not None:
+                            edgeStates.append(edgeState)
+            if nodes is not None:
+                nodes.extend(objects)
+
+            return {
+                "format" : CHECKPOINT_FORMAT,
+                "id" : self.getID(),
+                "version" : self.getVersion(),
+                "time" : time.time(),
+                "nodes" : [self.getObjectState(node, numbers) for node in objects],
+                "edges" : edgeStates
+            }
+
+    def getObjectState(self, node, numbers):
+        """
+        Get the attributes and the remaining lease times of an object as plain data. The caller has to hold the lock.
+
+        :param node: Object to get the state of
+        :type node: insalata.model.Node.Node
 
-        return Graph(name, allHosts=set(hosts), allL2Networks=set(l2networks), allL3Networks=set(l3networks))
+        :param numbers: id() of the numbered objects -> Their number. References to other objects are dropped
+        :type numbers: dict
+
+        :returns: Tuple (class name, attributes, {attribute -> number of the referenced object}, {collector -> remaining lease time})
+        :rtype: tuple
+        """
+        values = dict()
+        references = dict() #E.g. the default template of a location
+        for key, value in node.__dict__.items():
+            if isinstance(value, Node):
+                if id(value) in numbers:
+                    references[key] = numbers[id(value)]
+            else:
+                values[key] = value
+        return (node.__class__.__name__, values, references, self.__getRemaining(node))
+
+    def getEdgeState(self, edge, numbers):
+        """
+        Get an edge as plain data. The caller has to hold the lock.
+
+        :param edge: Edge to get the state of
+        :type edge: insalata.model.Edge.Edge
+
+        :param numbers: id() of the numbered objects -> Their number. The root of the graph has the number -1
+        :type numbers: dict
+
+        :returns: Tuple (class name, number of the first object, number of the second object, name, {collector -> remaining lease time})
+                  or None if one of the objects has no number
+        :rtype: tuple
+        """
+        first, second = edge.getNodes()
+        first, second = numbers.get(id(first)), numbers.get(id(second))
+        if first is None or second is None:
+            return None
+        return (edge.__class__.__name__, first, second, edge.getName(), self.__getRemaining(edge))
+
+    @staticmethod
+    def __getRemaining(element):
+        """
+        Get the remaining time of the verification leases of a node or edge by collector name. -1 if a lease never expires.
+        """
+        leases = dict()
+        for collectorName, lease in element.getScanners().items():
+            remaining = lease.getRemaining()
+            leases[collectorName] = remaining if remaining is not None else lease.duration
+        return leases
+
+    def __createObject(self, objectState):
+        """
+        Create an object from its state without edges. The constructor is not called as it creates edges and reads configurations.
+        """
+        typeName, values = objectState[0], objectState[1]
+        node = OBJECT_TYPES[typeName].__new__(OBJECT_TYPES[typeName])
+        Node.__init__(node, scheduler=self.getScheduler(), statistics=self.__statistics)
+        node.__dict__.update(values)
+        return node
+
+    def __createEdge(self, typeName, first, second, name, leases):
+        edge = PartOfEdge(first, second) if typeName == "PartOfEdge" else Edge(first, second, name=name)
+        for collectorName, remaining in leases.items():
+            edge.verify(collectorName, remaining)
+        return edge
+
+    def __attach(self, node):
+        """
+        Subscribe to the events of an object connected to the root and add it to the indexes.
+        """
+        node.getOnChangeEvent().add(self.__changedHandler)
+        node.getOnDeleteEvent().add(self.__deletedHandler)
+        self.__addToIndex(node)
+        self.__statistics.objectAdded(node)
+
+    def restoreCheckpoint(self, state, nodes=None):
+        """
+        Rebuild the objects of a checkpoint in this graph. The graph has to be empty.
+
+        No events are triggered: Consumers subscribing afterwards start with the restored state and collectors
+        confirming an object just renew its leases. Every lease continues with the remaining time it had when the
+        checkpoint was taken, the time the service was not running is not counted.
+
+        :param state: Checkpoint as returned by getCheckpoint
+        :type state: dict
+
+        :param nodes: (optional) List the restored objects are appended to in the order of their numbers
+        :type nodes: list
+
+        :returns: Version of the restored graph
+        :rtype: int
+        """
+        if state.get("format") != CHECKPOINT_FORMAT:
+            raise ValueError("Unsupported checkpoint format {0}.".format(state.get("format")))
+        with self.__writing():
+            if len(self.getEdges()) > 0:
+                raise RuntimeError("Checkpoints can only be restored into an empty graph.")
+
+            objects = [self.__createObject(objectState) for objectState in state["nodes"]]
+            for node, (_, _, references, leases) in zip(objects, state["nodes"]):
+                for key, number in references.items():
+                    node.__dict__[key] = objects[number]
+                for collectorName, remaining in leases.items():
+                    node.verify(collectorName, remaining)
+
+            attached = list()
+            for typeName, first, second, name, leases in state["edges"]:
+                first = self if first == -1 else objects[first]
+                second = self if second == -1 else objects[second]
+                self.__createEdge(typeName, first, second, name, leases)
+                if first is self:
+                    attached.append(second)
+
+            #Subscribe after all edges exist => Creating the edges does not trigger objectChangedEvents
+            for node in attached:
+                self.__attach(node)
+
+            with self.__versionLock:
+                self.__version = state["version"]
+            if nodes is not None:
+                nodes.extend(objects)
+        return self.__version
+
+    def applyObjectStates(self, states, deleted, version, nodes, numbers):
+        """
+        Apply logged object states to this graph, e.g. to replay a write-ahead log on top of a restored checkpoint.
+
+        Every object is created or updated to its state. Edges of the object missing in its state are removed,
+        missing edges are created if the object at the other end exists. Deleted objects are deleted with their edges.
+
+        :param states: List of tuples (number, object state, edge states). See getObjectState and getEdgeState
+        :type states: list
+
+        :param deleted: Numbers of the deleted objects
+        :type deleted: list
+
+        :param version: Version of the graph after the states are applied
+        :type version: int
+
+        :param nodes: Number -> Object. Updated with the created and deleted objects
+        :type nodes: dict
+
+        :param numbers: id() of each object -> Its number, the root has the number -1. Updated like nodes
+        :type numbers: dict
+        """
+        with self.__writing():
+            for number, objectState, _ in states:
+                node = nodes.get(number)
+                if node is None or node.getDeprecated():
+                    node = nodes[number] = self.__createObject(objectState)
+                    numbers[id(node)] = number
+                else:
+                    self.__removeFromIndex(node) #Keys of the indexes may change with the values
+                    node.__dict__.clear()
+                    node.__dict__.update(objectState[1])
+                    self.__statistics.objectChanged(node)
+
+            #Edges after all objects exist => Edges between two new objects can be created
+            attached = list()
+            for number, _, edgeStates in states:
+                node = nodes[number]
+                existing = dict()
+                for edge in node.getEdges():
+                    first, second = edge.getNodes()
+                    existing[(edge.__class__.__name__, numbers.get(id(first)), numbers.get(id(second)), edge.getName())] = edge
+                for typeName, first, second, name, leases in edgeStates:
+                    edge = existing.pop((typeName, first, second, name), None)
+                    if edge is not None:
+                        for collectorName, remaining in leases.items():
+                            edge.verify(collectorName, remaining)
+                        continue
+                    firstNode = self if first == -1 else nodes.get(first)
+                    secondNode = self if second == -1 else nodes.get(second)
+                    if firstNode is None or secondNode is None or firstNode.getDeprecated() or secondNode.getDeprecated():
+                        continue
+                    self.__createEdge(typeName, firstNode, secondNode, name, leases)
+                for edge in existing.values():
+                    edge.delete()
+                if any(first == -1 for _, first, _, _, _ in edgeStates):
+                    attached.append(node)
+
+            for number, (_, _, references, leases), _ in states:
+                node = nodes[number]
+                for key, reference in references.items():
+                    if reference in nodes:
+                        node.__dict__[key] = nodes[reference]
+                for collectorName, remaining in leases.items():
+                    node.verify(collectorName, remaining)
+            for node in attached:
+                self.__attach(node)
+
+            for number in deleted:
+                node = nodes.pop(number, None)
+                if node is not None:
+                    numbers.pop(id(node), None)
+                    if not node.getDeprecated():
+                        node.delete()
+
+            with self.__versionLock:
+                self.__version = version
+
+    def saveCheckpoint(self, path, state=None):
+        """
+        Write a binary checkpoint of this graph to a file (See getCheckpoint).
+
+        The file is replaced atomically: The checkpoint is written to a temporary file in the same directory,
+        synced to disk and renamed => A crash leaves either the previous or the new checkpoint.
+
+        :param path: Path of the checkpoint file
+        :type path: str
+
+        :param state: (optional) Checkpoint to write. A new one is taken if None
+        :type state: dict
+
+        :returns: Version of the graph contained in the checkpoint
+        :rtype: int
+        """
+        if state is None:
+            state = self.getCheckpoint()
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temporary = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as fileHandler:
+                pickle.dump(state, fileHandler, pickle.HIGHEST_PROTOCOL)
+                fileHandler.flush()
+                os.fsync(fileHandler.fileno())
+            os.replace(temporary, path)
+        except:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        try: #Persist the rename
+            directoryHandle = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(directoryHandle)
+            finally:
+                os.close(directoryHandle)
+        except OSError:
+            pass
+        return state["version"]
+
+    def loadCheckpoint(self, path):
+        """
+        Restore the objects of a checkpoint file written by saveCheckpoint into this empty graph.
+        Checkpoints are unpickled => Only load files written by this service.
+
+        :param path: Path of the checkpoint file
+        :type path: str
+
+        :returns: Version of the restored graph
+        :rtype: int
+        """
+        with open(path, "rb") as fileHandler:
+            state = pickle.load(fileHandler)
+        return self.restoreCheckpoint(state)
+
+    def traverse(self, start=None, types=None, edgeKinds=None, maxDepth=None):
+        """
+        Breadth first traversal of the objects of this graph. The root of the graph is never entered.
+        See insalata.model.Node.Node.iterateBFS for the filters.
+
+        Example: All objects that are part of a host
+            graph.traverse(host, edgeKinds=[CONTAINS])
+
+        :param start: (optional) Start object or iterable of start objects. All objects of the graph if None
+        :type start: insalata.model.Node.Node
+
+        :param types: (optional) Only enter objects of these types
+        :type types: list
+
+        :param edgeKinds: (optional) Only follow edges of these kinds (EDGE, PART_OF, CONTAINS of insalata.model.Edge)
+        :type edgeKinds: list
+
+        :param maxDepth: (optional) Maximal distance to the start objects
+        :type maxDepth: int
+
+        :returns: Generator of tuples (object, depth)
+        :rtype: generator
+        """
+        if start is None:
+            start = self.getAllNeighbors()
+        return Node.iterateBFS(start, types=types, edgeKinds=edgeKinds, maxDepth=maxDepth, exclude=self)
+
+    def toGraphViz(self, start=None, maxDepth=None):
+        """
+        Print the objects of this graph and their edges in the GraphViz dot format.
+
+        :param start: (optional) Only print objects reachable from this object or these objects
+        :type start: insalata.model.Node.Node
+
+        :param maxDepth: (optional) Maximal distance to the start objects
+        :type maxDepth: int
+        """
+        print("digraph " + self.getBfsID() + " {")
+        for node, _ in self.traverse(start, maxDepth=maxDepth):
+            node.toGraphViz()
+        print("}")
+
+    def __materialize(self, configuration, readOnly=False):
+        """
+        Create a detached copy of the objects in the given configuration. The caller has to hold the read lock.
+
+        :param configuration: All hosts and networks must be contained in this configuration. All objects are copied if None
+        :type configuration: str
+
+        :param readOnly: Create a snapshot => The copies of the objects use the lock of the copied graph,
+                         which refuses any change
+        :type readOnly: bool
+        """
+        if configuration is None:
+            selected = self.getAllNeighbors()
+        else:
+            hosts = [h for h in self.getAllNeighbors(type=Host) if configuration in h.getConfigNames()]
+            l2networks = [n for n in self.getAllNeighbors(type=Layer2Network) if configuration in n.getConfigNames()]
+            interfaces = list(itertools.chain(*[h.getInterfaces() for h in hosts])) # Get all interfaces of hosts in this configuration
+            l3addresses = list(itertools.chain(*[i.getAddresses() for i in interfaces])) # Get all l3addresses of those interfaces
+            l3networks = [a.getNetwork() for a in l3addresses if a.getNetwork() is not None] # Get the network of all addresses
+            selected = itertools.chain(hosts, l2networks, interfaces, l3addresses, l3networks)
+
+        #Nodes by id() as some model classes define equality by value
+        nodes = dict((id(node), node) for node in selected)
+
+        #Add the objects belonging to the selected ones: Locations, templates, services, routes, disks, firewall rules...
+        independent = (Host, Interface, Layer2Network, Layer3Address, Layer3Network)
+        workingSet = list(nodes.values())
+        while len(workingSet) > 0:
+            node = workingSet.pop()
+            for edge in node.getEdges():
+                other = edge.getOther(node)
+                if other is not self and id(other) not in nodes and not isinstance(other, independent):
+                    nodes[id(other)] = other
+                    workingSet.append(other)
+
+        detached = Graph(configuration if configuration else self.getID())
+        detached.__version = self.getVersion()
+        scheduler = detached.getScheduler() if readOnly else None
+        clones = dict((key, node.detachedCopy(scheduler)) for key, node in nodes.items())
+        copiedEdges = set()
+        for key, node in nodes.items():
+            for edge in node.getEdges():
+                if id(edge) in copiedEdges:
+                    continue
+                first, second = edge.getNodes()
+                first = detached if first is self else clones.get(id(first))
+                second = detached if second is self else clones.get(id(second))
+                if first is not None and second is not None: #Edges leaving the copied objects are dropped
+                    edge.detachedCopy(first, second)
+                    copiedEdges.add(id(edge))
+            detached.__addToIndex(clones[key])
+        detached.__readOnly = readOnly
+        return detached
 
     #Getter/Setter
     def getID(self):
@@ -123,16 +852,255 @@ class Graph(Node):
         return self.getID()
 
     def getHosts(self):
-        return frozenset(self.getAllNeighbors(Host))
+        return self.getAllNeighbors(Host)
 
     def getL2Networks(self):
-        return frozenset(self.getAllNeighbors(Layer2Network))
+        return self.getAllNeighbors(Layer2Network)
 
     def getL3Networks(self):
-        return frozenset(self.getAllNeighbors(Layer3Network))
+        return self.getAllNeighbors(Layer3Network)
 
     def getLocations(self):
-        return frozenset(self.getAllNeighbors(Location))
+        return self.getAllNeighbors(Location)
+
+    def getHost(self, id):
+        """
+        Get the host with the given identifier.
+
+        :param id: Identifier of the host
+        :type id: str
+
+        :returns: The host or None if it does not exist
+        :rtype: insalata.model.Host.Host
+        """
+        return self.__lookup(Host, id)
+
+    def getLayer2Network(self, id):
+        """
+        Get the Layer2Network with the given identifier.
+
+        :param id: Identifier of the network
+        :type id: str
+
+        :returns: The network or None if it does not exist
+        :rtype: insalata.model.Layer2Network.Layer2Network
+        """
+        return self.__lookup(Layer2Network, id)
+
+    def getLayer3Network(self, id):
+        """
+        Get the Layer3Network with the given identifier.
+
+        :param id: Identifier of the network
+        :type id: str
+
+        :returns: The network or None if it does not exist
+        :rtype: insalata.model.Layer3Network.Layer3Network
+        """
+        return self.__lookup(Layer3Network, id)
+
+    def getInterfaceByMac(self, mac):
+        """
+        Get the interface with the given MAC address.
+
+        :param mac: MAC address of the interface
+        :type mac: str
+
+        :returns: The interface or None if it does not exist
+        :rtype: insalata.model.Interface.Interface
+        """
+        return self.__lookup(Interface, mac)
+
+    def getInterfaceByID(self, id):
+        """
+        Get the interface with the given identifier, e.g. 'enx00163e000001'.
+
+        :param id: Identifier of the interface
+        :type id: str
+
+        :returns: The interface or None if it does not exist
+        :rtype: insalata.model.Interface.Interface
+        """
+        interface = self.__interfaceIDs.get(id)
+        if (interface is None) or interface.getDeprecated():
+            return None
+        return interface
+
+    def getLayer3Address(self, address):
+        """
+        Get the Layer3Address with the given address.
+
+        :param address: The address, e.g. '192.168.0.1'
+        :type address: str
+
+        :returns: The Layer3Address or None if it does not exist
+        :rtype: insalata.model.Layer3Address.Layer3Address
+        """
+        return self.__lookup(Layer3Address, address)
+
+    def getRoute(self, host, dest, genmask, gateway):
+        """
+        Get the route of a host with the given destination, genmask and gateway.
+
+        :param host: Host the route is added to
+        :type host: insalata.model.Host.Host
+
+        :returns: The route or None if the host has no such route
+        :rtype: insalata.model.Route.Route
+        """
+        return self.__hostLookup(host, self.__hostKey(host, Route, dest, genmask, gateway))
+
+    def getFirewallRule(self, host, chain, action, protocol, srcnet=None, destnet=None, srcports=None, destports=None, inInterface=None, outInterface=None):
+        """
+        Get the firewall rule of a host with the given values. See getOrCreateFirewallRule for the parameters.
+
+        :returns: The rule or None if the host has no such rule
+        :rtype: insalata.model.FirewallRule.FirewallRule
+        """
+        key = self.__hostKey(host, FirewallRule, chain, action, protocol, srcnet, destnet, srcports, destports, inInterface, outInterface)
+        return self.__hostLookup(host, key)
+
+    def getNetworkMembers(self, network):
+        """
+        Get the members of a network: The addresses of a Layer3Network or the interfaces of a Layer2Network.
+        Members are read from the adjacency of the network, which is updated with every added or removed edge.
+
+        :param network: Network to get the members of
+        :type network: insalata.model.Layer3Network.Layer3Network
+
+        :returns: Set of the member addresses or interfaces
+        :rtype: frozenset
+        """
+        if isinstance(network, Layer3Network):
+            return network.getAllNeighbors(Layer3Address)
+        return network.getAllNeighbors(Interface)
+
+    def __indexKey(self, node):
+        """
+        Return the natural identity a node of an indexed type is looked up with.
+
+        :param node: Node to get the identity of
+        :type node: insalata.model.Node.Node
+        """
+        if isinstance(node, Interface):
+            return node.getMAC()
+        if isinstance(node, Layer3Address):
+            return node.getID()
+        if isinstance(node, Location):
+            return node.getGlobalID().lower()
+        return node.getGlobalID()
+
+    def __addToIndex(self, node):
+        """
+        Add a node to the identity index of its type.
+        Nodes of types without index are ignored.
+
+        :param node: Node to add
+        :type node: insalata.model.Node.Node
+        """
+        if node.__class__ in self.__index:
+            self.__index[node.__class__][self.__indexKey(node)] = node
+        if node.__class__ is Interface:
+            self.__interfaceIDs[node.getID()] = node
+        elif node.__class__ in (Route, FirewallRule):
+            hosts = node.getAllNeighbors(Host)
+            if len(hosts) > 0:
+                self.__addToHostIndex(node, self.__hostKey(list(hosts)[0], node))
+
+    def __removeFromIndex(self, node):
+        """
+        Remove a node from the identity index of its type.
+        The entry is only removed if it still references the given node.
+
+        :param node: Node to remove
+        :type node: insalata.model.Node.Node
+        """
+        if node.__class__ is Interface and self.__interfaceIDs.get(node.getID()) is node:
+            del self.__interfaceIDs[node.getID()]
+        key = self.__hostIndexKeys.pop(id(node), None)
+        if key is not None and self.__hostIndex.get(key) is node:
+            del self.__hostIndex[key]
+        index = self.__index.get(node.__class__)
+        if index is None:
+            return
+        key = self.__indexKey(node)
+        if index.get(key) is node:
+            del index[key]
+
+    def __hostKey(self, host, node, *values):
+        """
+        Return the key of a route or firewall rule in the host index.
+        The identifying values are read from the node if none are given.
+
+        :param host: Host the node belongs to
+        :type host: insalata.model.Host.Host
+
+        :param node: Route or FirewallRule or its class
+        :type node: insalata.model.Node.Node
+
+        :param values: Identifying values: Destination, genmask and gateway of a route.
+                       Chain, action, protocol, source and destination net and ports, in- and outInterface of a rule
+        :type values: tuple
+        """
+        if isinstance(node, Node):
+            if isinstance(node, Route):
+                values = (node.destination, node.genmask, node.gateway)
+            else:
+                interfaces = dict((e.getName(), e.getOther(node)) for e in node.getEdges(Interface) if e.getName())
+                values = (node.chain, node.action, node.protocol, node.srcnet, node.destnet, node.srcports, node.destports,
+                          interfaces.get("inInterface"), interfaces.get("outInterface"))
+            type = node.__class__
+        else:
+            type = node
+        if type is FirewallRule:
+            values = values[:7] + tuple(i.getID() if i else None for i in values[7:]) #Interfaces by ID as they compare by value
+        return (host.getID(), type) + tuple(values)
+
+    def __addToHostIndex(self, node, key):
+        """
+        Add a route or firewall rule to the host index.
+
+        :param node: Route or FirewallRule
+        :type node: insalata.model.Node.Node
+
+        :param key: Key of the node (See __hostKey)
+        :type key: tuple
+        """
+        previous = self.__hostIndex.get(key)
+        if previous is not None:
+            self.__hostIndexKeys.pop(id(previous), None)
+        self.__hostIndex[key] = node
+        self.__hostIndexKeys[id(node)] = key
+
+    def __hostLookup(self, host, key):
+        """
+        Get the indexed route or firewall rule of a host.
+
+        :returns: The node or None if it does not exist or is not added to the host
+        :rtype: insalata.model.Node.Node
+        """
+        node = self.__hostIndex.get(key)
+        if (node is None) or node.getDeprecated() or not any(h is host for h in node.getAllNeighbors(Host)):
+            return None
+        return node
+
+    def __lookup(self, type, key):
+        """
+        Get the indexed node of the given type with the given identity.
+
+        :param type: Type of the node
+        :type type: type
+
+        :param key: Identity of the node (Global ID, MAC, address or lower-cased location ID)
+        :type key: str
+
+        :returns: The node or None if no valid node with this identity exists
+        :rtype: insalata.model.Node.Node
+        """
+        node = self.__index[type].get(key)
+        if (node is None) or node.getDeprecated():
+            return None
+        return node
 
     def getEdge(self, first, second):
         """
@@ -145,7 +1113,7 @@ class Graph(Node):
         Return:
             Edge if existing or None
         """
-        edges = [e for e in first.getEdges() if e.getOther(first) is second]
+        edges = [e for e in first.getEdges(second.__class__) if e.getOther(first) is second]
         if len(edges) == 0:
             return None
         return edges[0]
@@ -170,30 +1138,32 @@ class Graph(Node):
         :param template: Template the host is build on
         :type template: str
         """
-        self.__locks[Host].acquire()
-        hosts = [h for h in self.getAllNeighbors(Host) if h.getGlobalID() == id]
+        with self.__writing():
+            host = self.__lookup(Host, id)
+
+            if host is not None:
+                host.setLocation(location, collectorName, timeout)
+                host.setTemplate(template, collectorName, timeout)
+                host.verify(collectorName, timeout)
+            else:
+                host = Host(id, collectorName=collectorName, timeout=timeout, location=location, template=template, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, host)
+                self.__addToIndex(host)
+
+                host.getOnChangeEvent().add(self.__changedHandler)
+                host.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Host):
+                    valuesDict = {
+                        "id" : id
+                    }
+                    if location:
+                        valuesDict["location"] = location.getID()
+                    if template:
+                        valuesDict["template"] = template.getID()
+                    self.__objectNew(host, { "objectType" : "Host", "values" : valuesDict })
+                else:
+                    self.__objectNew(host)
 
-        if len(hosts) > 0:
-            host = list(hosts)[0]
-            host.setLocation(location, collectorName, timeout)
-            host.setTemplate(template, collectorName, timeout)
-            host.verify(collectorName, timeout)
-        else:
-            host = Host(id, collectorName=collectorName, timeout=timeout, location=location, template=template)
-            Edge(self, host)
-
-            host.getOnChangeEvent().add(partial(self.objectChanged))
-            host.getOnDeleteEvent().add(partial(self.objectDeleted))
-            valuesDict = {
-                "id" : id
-            }
-            if location:
-                valuesDict["location"] = location.getID()
-            if template:
-                valuesDict["template"] = template.getID()
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Host", "values" : valuesDict })
-
-        self.__locks[Host].release()
         return host
 
     def getOrCreateLayer2Network(self, id, collectorName, timeout, location=None):
@@ -212,27 +1182,29 @@ class Graph(Node):
         :param location: The locatin containing this network
         :type location: insalata.model.Location.Location
         """
-        self.__locks[Layer2Network].acquire()
-        networks = [n for n in self.getAllNeighbors(Layer2Network) if n.getGlobalID() == id]
-
-        if len(networks) > 0:
-            network = list(networks)[0]
-            network.setLocation(location, collectorName, timeout)
-            network.verify(collectorName, timeout)
-        else:
-            network = Layer2Network(id, collectorName=collectorName, timeout=timeout, location=location)
-            Edge(self, network)
+        with self.__writing():
+            network = self.__lookup(Layer2Network, id)
+
+            if network is not None:
+                network.setLocation(location, collectorName, timeout)
+                network.verify(collectorName, timeout)
+            else:
+                network = Layer2Network(id, collectorName=collectorName, timeout=timeout, location=location, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, network)
+                self.__addToIndex(network)
+
+                network.getOnChangeEvent().add(self.__changedHandler)
+                network.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Layer2Network):
+                    valuesDict = {
+                        "id" : id
+                    }
+                    if location:
+                        valuesDict["location"] = location.getID()
+                    self.__objectNew(network, { "objectType" : "Layer2Network", "values" : valuesDict })
+                else:
+                    self.__objectNew(network)
 
-            network.getOnChangeEvent().add(partial(self.objectChanged))
-            network.getOnDeleteEvent().add(partial(self.objectDeleted))
-            valuesDict = {
-                "id" : id
-            }
-            if location:
-                valuesDict["location"] = location.getID()
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Layer2Network", "values" : valuesDict })
-
-        self.__locks[Layer2Network].release()
         return network
 
     def getOrCreateInterface(self, mac, collectorName, timeout, network=None):
@@ -251,27 +1223,29 @@ class Graph(Node):
         :param network: Network this interface is conntected to
         :type network: insalata.model.Layer2Network.Layer2Network
         """
-        self.__locks[Interface].acquire()
-        interfaces = [i for i in self.getAllNeighbors(Interface) if i.getMAC() == mac]
+        with self.__writing():
+            interface = self.__lookup(Interface, mac)
+
+            if interface is not None:
+                interface.setNetwork(network, collectorName, timeout)
+                interface.verify(collectorName, timeout)
+            else:
+                interface = Interface(mac, collectorName=collectorName, timeout=timeout, network=network, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, interface)
+                self.__addToIndex(interface)
+
+                interface.getOnChangeEvent().add(self.__changedHandler)
+                interface.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Interface):
+                    valuesDict = {
+                        "mac" : mac
+                    }
+                    if network:
+                        valuesDict["network"] = network.getID()
+                    self.__objectNew(interface, { "objectType" : "Interface" , "values" : valuesDict })
+                else:
+                    self.__objectNew(interface)
 
-        if len(interfaces) > 0:
-            interface = list(interfaces)[0]
-            interface.setNetwork(network, collectorName, timeout)
-            interface.verify(collectorName, timeout)
-        else:
-            interface = Interface(mac, collectorName=collectorName, timeout=timeout, network=network)
-            Edge(self, interface)
-
-            interface.getOnChangeEvent().add(self.objectChanged)
-            interface.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "mac" : mac
-            }
-            if network:
-                valuesDict["network"] = network.getID()
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Interface" , "values" : valuesDict })
-
-        self.__locks[Interface].release()
         return interface
 
     def getOrCreateLayer3Network(self, id, collectorName, timeout, address, netmask):
@@ -293,28 +1267,30 @@ class Graph(Node):
         :param netmask: Netmask of the network
         :type netmask: str
         """
-        self.__locks[Layer3Network].acquire()
-        networks = [n for n in self.getAllNeighbors(Layer3Network) if n.getGlobalID() == id]
+        with self.__writing():
+            network = self.__lookup(Layer3Network, id)
+
+            if network is not None:
+                network.setAddress(address, collectorName, timeout)
+                network.setNetmask(netmask, collectorName, timeout)
+                network.verify(collectorName, timeout)
+            else:
+                network = Layer3Network(id, address, netmask, collectorName=collectorName, timeout=timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, network)
+                self.__addToIndex(network)
+
+                network.getOnChangeEvent().add(self.__changedHandler)
+                network.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Layer3Network):
+                    valuesDict = {
+                        "id" : id,
+                        "address" : address,
+                        "netmask" : netmask
+                    }
+                    self.__objectNew(network, { "objectType" : "Layer3Network", "values" : valuesDict })
+                else:
+                    self.__objectNew(network)
 
-        if len(networks) > 0:
-            network = list(networks)[0]
-            network.setAddress(address, collectorName, timeout)
-            network.setNetmask(netmask, collectorName, timeout)
-            network.verify(collectorName, timeout)
-        else:
-            network = Layer3Network(id, address, netmask, collectorName=collectorName, timeout=timeout)
-            Edge(self, network)
-
-            network.getOnChangeEvent().add(self.objectChanged)
-            network.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "id" : id,
-                "address" : address,
-                "netmask" : netmask
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Layer3Network", "values" : valuesDict })
-
-        self.__locks[Layer3Network].release()
         return network
 
     def getOrCreateLayer3Address(self, address, collectorName, timeout, netmask=None, gateway=None):
@@ -336,28 +1312,30 @@ class Graph(Node):
         :param gateway: Gateway of this addess
         :type gateway: str
         """
-        self.__locks[Layer3Address].acquire()
-        addresses = [a for a in self.getAllNeighbors(Layer3Address) if a.getID() == address]
-
-        if len(addresses) > 0:
-            addressEl = list(addresses)[0]
-            addressEl.setGateway(gateway, collectorName, timeout)
-            addressEl.setNetmask(netmask, collectorName, timeout)
-            addressEl.verify(collectorName, timeout)
-        else:
-            addressEl = Layer3Address(address, netmask=netmask, gateway=gateway, collectorName=collectorName, timeout=timeout)
-            Edge(self, addressEl)
-
-            addressEl.getOnChangeEvent().add(self.objectChanged)
-            addressEl.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "address" : address,
-                "gateway" : gateway,
-                "netmask" : netmask
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Layer3Address", "values" : valuesDict })
+        with self.__writing():
+            addressEl = self.__lookup(Layer3Address, address)
+
+            if addressEl is not None:
+                addressEl.setGateway(gateway, collectorName, timeout)
+                addressEl.setNetmask(netmask, collectorName, timeout)
+                addressEl.verify(collectorName, timeout)
+            else:
+                addressEl = Layer3Address(address, netmask=netmask, gateway=gateway, collectorName=collectorName, timeout=timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, addressEl)
+                self.__addToIndex(addressEl)
+
+                addressEl.getOnChangeEvent().add(self.__changedHandler)
+                addressEl.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Layer3Address):
+                    valuesDict = {
+                        "address" : address,
+                        "gateway" : gateway,
+                        "netmask" : netmask
+                    }
+                    self.__objectNew(addressEl, { "objectType" : "Layer3Address", "values" : valuesDict })
+                else:
+                    self.__objectNew(addressEl)
 
-        self.__locks[Layer3Address].release()
         return addressEl
 
     def getOrCreateService(self, port, protocol, collectorName, timeout, type, address):
@@ -382,28 +1360,30 @@ class Graph(Node):
         :param address: Address this service is deployed on
         :type gateway: insalata.model.Layer3Address.Layer3Address
         """
-        self.__locks[Service].acquire()
-        services = [s for s in address.getAllNeighbors(Service) if s.getPort() == port and s.getProtocol() == protocol]
-
-        if len(services) > 0:
-            service = list(services)[0]
-            service.setType(type, collectorName, timeout)
-            service.verify(collectorName, timeout)
-        else:
-            service = Service(port, protocol,  type, collectorName=collectorName, timeout=timeout, address=address)
-            Edge(self, service)
-
-            service.getOnChangeEvent().add(self.objectChanged)
-            service.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "port" : port,
-                "protocol" : protocol,
-                "type" : type,
-                "address" : address.getID()
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Service", "values" : valuesDict })
+        with self.__writing():
+            services = [s for s in address.getAllNeighbors(Service) if s.getPort() == port and s.getProtocol() == protocol]
+
+            if len(services) > 0:
+                service = list(services)[0]
+                service.setType(type, collectorName, timeout)
+                service.verify(collectorName, timeout)
+            else:
+                service = Service(port, protocol,  type, collectorName=collectorName, timeout=timeout, address=address, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, service)
+
+                service.getOnChangeEvent().add(self.__changedHandler)
+                service.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Service):
+                    valuesDict = {
+                        "port" : port,
+                        "protocol" : protocol,
+                        "type" : type,
+                        "address" : address.getID()
+                    }
+                    self.__objectNew(service, { "objectType" : "Service", "values" : valuesDict })
+                else:
+                    self.__objectNew(service)
 
-        self.__locks[Service].release()
         return service
 
     def getOrCreateDhcpService(self, collectorName, timeout, address):
@@ -419,25 +1399,27 @@ class Graph(Node):
         :param address: Address this service is deployed on
         :type gateway: insalata.model.Layer3Address.Layer3Address
         """
-        self.__locks[DhcpService].acquire()
-        services = [s for s in address.getAllNeighbors(DhcpService) if s.getType() == "dhcp"]
+        with self.__writing():
+            services = [s for s in address.getAllNeighbors(DhcpService) if s.getType() == "dhcp"]
+
+            if len(services) > 0:
+                service = list(services)[0]
+                service.setAddress(address, collectorName, timeout)
+                service.verify(collectorName, timeout)
+            else:
+                service = DhcpService(collectorName=collectorName, timeout=timeout, address=address, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, service)
+
+                service.getOnChangeEvent().add(self.__changedHandler)
+                service.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", DhcpService):
+                    valuesDict = {
+                        "address" : address.getID()
+                    }
+                    self.__objectNew(service, { "objectType" : "DhcpService", "values" : valuesDict })
+                else:
+                    self.__objectNew(service)
 
-        if len(services) > 0:
-            service = list(services)[0]
-            service.setAddress(address, collectorName, timeout)
-            service.verify(collectorName, timeout)
-        else:
-            service = DhcpService(collectorName=collectorName, timeout=timeout, address=address)
-            Edge(self, service)
-
-            service.getOnChangeEvent().add(self.objectChanged)
-            service.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "address" : address.getID()
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "DhcpService", "values" : valuesDict })
-
-        self.__locks[DhcpService].release()
         return service
 
     def getOrCreateDnsService(self, collectorName, timeout, address):
@@ -453,25 +1435,27 @@ class Graph(Node):
         :param address: Address this service is deployed on
         :type gateway: insalata.model.Layer3Address.Layer3Address
         """
-        self.__locks[DnsService].acquire()
-        services = [s for s in address.getAllNeighbors(DnsService) if s.getType() == "dns"]
-
-        if len(services) > 0:
-            service = list(services)[0]
-            service.setAddress(address, collectorName, timeout)
-            service.verify(collectorName, timeout)
-        else:
-            service = DnsService(collectorName=collectorName, timeout=timeout, address=address)
-            Edge(self, service)
+        with self.__writing():
+            services = [s for s in address.getAllNeighbors(DnsService) if s.getType() == "dns"]
+
+            if len(services) > 0:
+                service = list(services)[0]
+                service.setAddress(address, collectorName, timeout)
+                service.verify(collectorName, timeout)
+            else:
+                service = DnsService(collectorName=collectorName, timeout=timeout, address=address, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, service)
+
+                service.getOnChangeEvent().add(self.__changedHandler)
+                service.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", DnsService):
+                    valuesDict = {
+                        "address" : address.getID()
+                    }
+                    self.__objectNew(service, { "objectType" : "DnsService", "values" : valuesDict })
+                else:
+                    self.__objectNew(service)
 
-            service.getOnChangeEvent().add(self.objectChanged)
-            service.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "address" : address.getID()
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "DnsService", "values" : valuesDict })
-
-        self.__locks[DnsService].release()
         return service
 
 
@@ -494,27 +1478,29 @@ class Graph(Node):
         :param size: Size of the disk
         :type size: int
         """
-        self.__locks[Disk].acquire()
-        disk = [d for d in host.getAllNeighbors(Disk) if d.getGlobalID() == name]
-
-        if len(disk) > 0:
-            disk = list(disk)[0]
-            disk.setSize(size, collectorName, timeout)
-            disk.verify(collectorName, timeout)
-        else:
-            disk = Disk(name, size=None, collectorName=collectorName, timeout=timeout)
-            Edge(self, disk)
-
-            disk.getOnChangeEvent().add(self.objectChanged)
-            disk.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "name" : name,
-                "host" : host.getID(),
-                "size" : size
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Disk", "values" : valuesDict })
+        with self.__writing():
+            disk = [d for d in host.getAllNeighbors(Disk) if d.getGlobalID() == name]
+
+            if len(disk) > 0:
+                disk = list(disk)[0]
+                disk.setSize(size, collectorName, timeout)
+                disk.verify(collectorName, timeout)
+            else:
+                disk = Disk(name, size=None, collectorName=collectorName, timeout=timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, disk)
+
+                disk.getOnChangeEvent().add(self.__changedHandler)
+                disk.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Disk):
+                    valuesDict = {
+                        "name" : name,
+                        "host" : host.getID(),
+                        "size" : size
+                    }
+                    self.__objectNew(disk, { "objectType" : "Disk", "values" : valuesDict })
+                else:
+                    self.__objectNew(disk)
 
-        self.__locks[Disk].release()
         return disk
 
     def getOrCreateLocation(self, id, collectorName, timeout):
@@ -530,24 +1516,26 @@ class Graph(Node):
         :param timeout: Timeout of the collector
         :type timeout: int
         """
-        self.__locks[Location].acquire()
-        location = [l for l in self.getAllNeighbors(Location) if l.getGlobalID().lower() == id.lower()]
+        with self.__writing():
+            location = self.__lookup(Location, id.lower())
+
+            if location is not None:
+                location.verify(collectorName, timeout)
+            else:
+                location = Location(id, collectorName=collectorName, timeout=timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, location)
+                self.__addToIndex(location)
+
+                location.getOnChangeEvent().add(self.__changedHandler)
+                location.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Location):
+                    valuesDict = {
+                        "id" : id
+                    }
+                    self.__objectNew(location, { "objectType" : "Location", "values" : valuesDict })
+                else:
+                    self.__objectNew(location)
 
-        if len(location) > 0:
-            location = list(location)[0]
-            location.verify(collectorName, timeout)
-        else:
-            location = Location(id, collectorName=collectorName, timeout=timeout)
-            Edge(self, location)
-
-            location.getOnChangeEvent().add(self.objectChanged)
-            location.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "id" : id
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Location", "values" : valuesDict })
-
-        self.__locks[Location].release()
         return location
 
 
@@ -576,31 +1564,32 @@ class Graph(Node):
         :param interface: Interface this route uses for forwarding
         :type interface: insalata.model.Interface.Interface
         """
-        self.__locks[Route].acquire()
-        routes = [r for r in host.getAllNeighbors(Route) if r.getGateway() == gateway 
-            and r.getDestination() == dest
-            and r.getGenmask() == genmask]
-        if len(routes) > 0:
-            route = routes[0]
-            route.setInterface(interface, collectorName, timeout)
-            route.verify(collectorName, timeout)
-        else:
-            route = Route(dest, genmask, gateway, interface=interface, collectorName=collectorName, timeout=timeout)
-            Edge(self, route)
-
-            route.getOnChangeEvent().add(self.objectChanged)
-            route.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "host" : host.getID(),
-                "dest" : dest,
-                "genmask" : genmask,
-                "gateway" : gateway
-            }
-            if interface:
-                valuesDict["interface"] = interface.getID()
-            self.getObjectNewEvent().trigger(self, { "objectType" : "Route", "values" : valuesDict })
+        with self.__writing():
+            key = self.__hostKey(host, Route, dest, genmask, gateway)
+            route = self.__hostLookup(host, key)
+            if route is not None:
+                route.setInterface(interface, collectorName, timeout)
+                route.verify(collectorName, timeout)
+            else:
+                route = Route(dest, genmask, gateway, interface=interface, collectorName=collectorName, timeout=timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, route)
+                self.__addToHostIndex(route, key)
+
+                route.getOnChangeEvent().add(self.__changedHandler)
+                route.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", Route):
+                    valuesDict = {
+                        "host" : host.getID(),
+                        "dest" : dest,
+                        "genmask" : genmask,
+                        "gateway" : gateway
+                    }
+                    if interface:
+                        valuesDict["interface"] = interface.getID()
+                    self.__objectNew(route, { "objectType" : "Route", "values" : valuesDict })
+                else:
+                    self.__objectNew(route)
 
-        self.__locks[Route].release()
         return route
 
     def getOrCreateFirewallRule(self, collectorName, timeout, host, chain, action, protocol, srcnet=None, destnet=None, srcports=None, destports=None, inInterface=None, outInterface=None):
@@ -643,46 +1632,41 @@ class Graph(Node):
         :param outInterface: Interface the packet leafes from
         :type outInterface: insalata.model.Interface.Interface
         """
-        self.__locks[FirewallRule].acquire()
-        rules = [r for r in host.getAllNeighbors(FirewallRule) if r.getChain() == chain
-            and r.getAction() == action 
-            and r.getProtocol() == protocol 
-            and r.getSrcNet() == srcnet
-            and r.getDestNet() == destnet
-            and r.getSrcPorts() == srcports
-            and r.getDestPorts() == destports
-            and r.getInInterface() == inInterface
-            and r.getOutInterface() == outInterface]
-        if len(rules) > 0:
-            rule = rules[0]
-            rule.verify(collectorName, timeout)
-        else:
-            rule = FirewallRule(chain, action, protocol, srcnet, destnet, srcports, destports, inInterface, outInterface, collectorName, timeout)
-            Edge(self, rule)
-
-            rule.getOnChangeEvent().add(self.objectChanged)
-            rule.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "host" : host.getID(),
-                "chain" : chain,
-                "action" : action,
-                "protocol" : protocol
-            }
-            if srcnet:
-                valuesDict["srcNetwork"] = srcnet
-            if destnet:
-                valuesDict["destNetwork"] = destnet
-            if srcports and len(srcports) > 0:
-                valuesDict["srcPorts"] = str(srcports[0]) if len(srcports) == 1 else str(srcports[0]) + ":" + str(srcports[-1])
-            if srcports and len(destports) > 0:
-                valuesDict["destPorts"] = str(destports[0]) if len(destports) == 1 else str(destports[0]) + ":" + str(destports[-1])
-            if inInterface:
-                valuesDict["inInterface"] = inInterface.getID()
-            if outInterface:
-                valuesDict["outInterface"] = outInterface.getID()
-            self.getObjectNewEvent().trigger(self, { "objectType" : "FirewallRule", "values" : valuesDict })
-
-        self.__locks[FirewallRule].release()
+        with self.__writing():
+            key = self.__hostKey(host, FirewallRule, chain, action, protocol, srcnet, destnet, srcports, destports, inInterface, outInterface)
+            rule = self.__hostLookup(host, key)
+            if rule is not None:
+                rule.verify(collectorName, timeout)
+            else:
+                rule = FirewallRule(chain, action, protocol, srcnet, destnet, srcports, destports, inInterface, outInterface, collectorName, timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, rule)
+                self.__addToHostIndex(rule, key)
+
+                rule.getOnChangeEvent().add(self.__changedHandler)
+                rule.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", FirewallRule):
+                    valuesDict = {
+                        "host" : host.getID(),
+                        "chain" : chain,
+                        "action" : action,
+                        "protocol" : protocol
+                    }
+                    if srcnet:
+                        valuesDict["srcNetwork"] = srcnet
+                    if destnet:
+                        valuesDict["destNetwork"] = destnet
+                    if srcports and len(srcports) > 0:
+                        valuesDict["srcPorts"] = str(srcports[0]) if len(srcports) == 1 else str(srcports[0]) + ":" + str(srcports[-1])
+                    if srcports and len(destports) > 0:
+                        valuesDict["destPorts"] = str(destports[0]) if len(destports) == 1 else str(destports[0]) + ":" + str(destports[-1])
+                    if inInterface:
+                        valuesDict["inInterface"] = inInterface.getID()
+                    if outInterface:
+                        valuesDict["outInterface"] = outInterface.getID()
+                    self.__objectNew(rule, { "objectType" : "FirewallRule", "values" : valuesDict })
+                else:
+                    self.__objectNew(rule)
+
         return rule
 
     def getOrCreateFirewallRaw(self, collectorName, timeout, host, firewall, data=None):
@@ -707,40 +1691,115 @@ class Graph(Node):
         :param data: Raw firewall data of the given firewall type
         :type data: str
         """
-        self.__locks[FirewallRaw].acquire()
-        raws = [r for r in host.getAllNeighbors(FirewallRaw) if r.getFirewall() == firewall]
+        with self.__writing():
+            raws = [r for r in host.getAllNeighbors(FirewallRaw) if r.getFirewall() == firewall]
+
+            if len(raws) == 0:
+                raw = FirewallRaw(firewall, data, collectorName, timeout, scheduler=self.getScheduler(), statistics=self.__statistics)
+                Edge(self, raw)
+
+                raw.getOnChangeEvent().add(self.__changedHandler)
+                raw.getOnDeleteEvent().add(self.__deletedHandler)
+                if self.__publishes("new", FirewallRaw):
+                    valuesDict = {
+                        "host" : host.getID(),
+                        "firewall" : firewall,
+                        "data" : data
+                    }
+                    self.__objectNew(raw, { "objectType" : "FirewallRaw", "values" : valuesDict })
+                else:
+                    self.__objectNew(raw)
+
+            else:
+                raw = raws[0]
+                raw.verify(collectorName, timeout)
 
-        if len(raws) == 0:
-            raw = FirewallRaw(firewall, data, collectorName, timeout)
-            Edge(self, raw)
+        return raw
 
-            raw.getOnChangeEvent().add(self.objectChanged)
-            raw.getOnDeleteEvent().add(self.objectDeleted)
-            valuesDict = {
-                "host" : host.getID(),
-                "firewall" : firewall,
-                "data" : data
-            }
-            self.getObjectNewEvent().trigger(self, { "objectType" : "FirewallRaw", "values" : valuesDict })
+    def __publishes(self, kind, type, member=None):
+        """
+        Test if the event of a change has any consumer => Its arguments have to be built.
 
-        else:
-            raw = raws[0]
-            raw.verify(collectorName, timeout)
+        :param kind: Kind of the change: 'new', 'changed' or 'deleted'
+        :type kind: str
 
-        self.__locks[FirewallRaw].release()
-        return raw
+        :param type: Class of the changed object
+        :type type: class
+
+        :param member: (optional) Changed member
+        :type member: str
+        """
+        if self.__objectEvents[kind].getHandlerCount() > 0 or self.__topics.wants(kind, type, member):
+            return True
+        return self.__changeSetEvent.getHandlerCount() > 0 and self.__currentTransaction() is not None
+
+    def wantsChange(self, node, member):
+        """
+        Test if the change of a member of an object has any consumer (See insalata.model.Node.Node.wants).
+        """
+        return self.__publishes("changed", node.__class__, member)
+
+    def __objectNew(self, obj, args=None):
+        """
+        Publish a new object.
+
+        :param args: Arguments of the objectNewEvent. None if the event has no consumer (See __publishes)
+        :type args: dict
+        """
+        self.__statistics.objectAdded(obj)
+        self.__mutationEvent.trigger(obj, { "kind" : "new" })
+        if args is None:
+            self.__nextVersion()
+            return
+        args["object"] = obj.getID()
+        transaction = self.__currentTransaction()
+        if transaction is not None:
+            transaction.addNew(obj, args)
+        else:
+            args["version"] = self.__nextVersion()
+            self.getObjectNewEvent().trigger(self, args)
+            self.__topics.publish("new", obj.__class__, self, args)
 
     def objectChanged(self, sender, args):
+        """
+        Publish a changed object.
+
+        :param args: Arguments of the objectChangedEvent. None if the change has no consumer (See wantsChange)
+        :type args: dict
+        """
+        self.__statistics.objectChanged(sender)
+        self.__mutationEvent.trigger(sender, { "kind" : "changed" })
+        if args is None or not self.__publishes("changed", sender.__class__, args.get("member")):
+            self.__nextVersion()
+            return
         args["object"] = sender.getID()
         args["objectType"] = sender.__class__.__name__
-        self.getObjectChangedEvent().trigger(self, args)
+        transaction = self.__currentTransaction()
+        if transaction is not None:
+            transaction.addChanged(sender, args)
+        else:
+            args["version"] = self.__nextVersion()
+            self.getObjectChangedEvent().trigger(self, args)
+            self.__topics.publish("changed", sender.__class__, self, args)
 
     def objectDeleted(self, sender, args):
-        sender.getOnChangeEvent().remove(partial(self.objectChanged))
-        sender.getOnDeleteEvent().remove(partial(self.objectDeleted))
+        self.__removeFromIndex(sender)
+        sender.getOnChangeEvent().remove(self.__changedHandler)
+        sender.getOnDeleteEvent().remove(self.__deletedHandler)
+        self.__statistics.objectRemoved(sender)
+        self.__mutationEvent.trigger(sender, { "kind" : "deleted" })
+        if not self.__publishes("deleted", sender.__class__):
+            self.__nextVersion()
+            return
         args["objectType"] = sender.__class__.__name__
         args["object"] = sender.getID()
-        self.getObjectDeletedEvent().trigger(self, args)
+        transaction = self.__currentTransaction()
+        if transaction is not None:
+            transaction.addDeleted(sender, args)
+        else:
+            args["version"] = self.__nextVersion()
+            self.getObjectDeletedEvent().trigger(self, args)
+            self.__topics.publish("deleted", sender.__class__, self, args)
 
 
 from insalata.model.Host import Host
@@ -756,7 +1815,14 @@ from insalata.model.DnsService import DnsService
 from insalata.model.Service import Service
 from insalata.model.Layer3Address import Layer3Address
 from insalata.model.Location import Location
+from insalata.model.Template import Template
 from insalata.model.Edge import Edge
+from insalata.model.PartOfEdge import PartOfEdge
+
+OBJECT_TYPES = dict((t.__name__, t) for t in (Host, Route, FirewallRule, FirewallRaw, Layer3Network, Layer2Network, Disk, Interface,
+                                               DhcpService, DnsService, Service, Layer3Address, Location, Template)) #Class name -> Model class. Used to restore objects
+from insalata.model.CompactGraph import CompactGraph
+from insalata.model.Query import parse
 
 from insalata.planning import planner
 from insalata.helper import diff
@@ -0,0 +1,128 @@
+import sys
+import threading
+import weakref
+
+class GraphStatistics:
+    """
+    Incrementally maintained cardinalities and approximate memory of one graph.
+
+    The graph reports every object it attaches, changes and deletes. The graph passes the accounting to the nodes it
+    creates, like its lease scheduler, and the edges of these nodes report their creation and deletion.
+    Counts are updated immediately. Attached and changed objects are only marked, their size is estimated with
+    sys.getsizeof of the object, its attributes and its edge containers, together with the number of handlers of
+    its events, when the statistics are read => The cost of a change is one dictionary update.
+    Objects are accounted while they are attached to the root of the graph.
+    """
+
+    def __init__(self, graph):
+        """
+        Create the accounting of a graph.
+
+        :param graph: Graph to account
+        :type graph: insalata.model.Graph.Graph
+        """
+        self.graph = weakref.proxy(graph)
+        self.__lock = threading.Lock()
+        self.__objects = dict() #Class name -> Number of attached objects
+        self.__objectBytes = dict() #Class name -> Approximate bytes of the attached objects
+        self.__sizes = dict() #id() of an attached object -> (Class name, approximate bytes, number of event handlers)
+        self.__handlers = 0 #Number of handlers of the events of the attached objects
+        self.__dirty = dict() #id() of an object attached or changed since the statistics were read -> Object
+        self.__edges = dict() #Class name -> Number of edges
+        self.__edgeBytes = dict() #Class name -> Approximate bytes of the edges
+        self.__edgeSizes = dict() #Edge class -> Approximate bytes of one edge
+
+    @staticmethod
+    def __sizeOf(node):
+        size = sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+        for value in node.__dict__.values():
+            if not hasattr(value, "getEdges"): #Referenced objects are accounted on their own
+                size += sys.getsizeof(value)
+        edges = node.getEdges()
+        return size + sys.getsizeof(edges) + 2 * sys.getsizeof(None) * len(edges) #Edge set and adjacency buckets
+
+    def objectAdded(self, node):
+        """
+        Account an object attached to the graph. Objects already accounted are updated.
+        """
+        with self.__lock:
+            if id(node) not in self.__sizes:
+                typeName = node.__class__.__name__
+                self.__objects[typeName] = self.__objects.get(typeName, 0) + 1
+                self.__sizes[id(node)] = (typeName, 0, 0)
+            self.__dirty[id(node)] = node
+
+    def objectChanged(self, node):
+        """
+        Mark an accounted object for updating its size. Objects not attached to the graph are ignored.
+        """
+        with self.__lock:
+            if id(node) in self.__sizes:
+                self.__dirty[id(node)] = node
+
+    def __update(self):
+        """
+        Estimate the size of the objects attached or changed since the last update.
+        The objects are read under the read lock of the graph => Their attributes and edges do not change meanwhile.
+        """
+        with self.__lock:
+            dirty, self.__dirty = self.__dirty, dict()
+        with self.graph.reading():
+            sizes = [(node, self.__sizeOf(node), node.getOnChangeEvent().getHandlerCount() + node.getOnDeleteEvent().getHandlerCount())
+                     for node in dirty.values()]
+        with self.__lock:
+            for node, size, handlers in sizes:
+                previous = self.__sizes.get(id(node))
+                if previous is None: #Removed in the meantime
+                    continue
+                self.__objectBytes[previous[0]] = self.__objectBytes.get(previous[0], 0) - previous[1] + size
+                self.__handlers += handlers - previous[2]
+                self.__sizes[id(node)] = (previous[0], size, handlers)
+
+    def objectRemoved(self, node):
+        """
+        Remove a deleted object from the accounting.
+        """
+        with self.__lock:
+            self.__dirty.pop(id(node), None)
+            previous = self.__sizes.pop(id(node), None)
+            if previous is not None:
+                self.__objects[previous[0]] -= 1
+                self.__objectBytes[previous[0]] = self.__objectBytes.get(previous[0], 0) - previous[1]
+                self.__handlers -= previous[2]
+
+    def edgeAdded(self, edge, count=1):
+        """
+        Account a new edge.
+
+        :param count: 1 for a new edge, -1 for a deleted edge
+        :type count: int
+        """
+        size = self.__edgeSizes.get(edge.__class__)
+        if size is None:
+            size = self.__edgeSizes[edge.__class__] = sys.getsizeof(edge) + sys.getsizeof(edge.getNodes())
+        typeName = edge.__class__.__name__
+        with self.__lock:
+            self.__edges[typeName] = self.__edges.get(typeName, 0) + count
+            self.__edgeBytes[typeName] = self.__edgeBytes.get(typeName, 0) + count * size
+
+    def edgeRemoved(self, edge):
+        self.edgeAdded(edge, -1)
+
+    def getStatistics(self):
+        """
+        Get the current counters.
+
+        :returns: Dictionary with the number of objects and edges and their approximate bytes by class name
+                  and the number of handlers of the object events
+        :rtype: dict
+        """
+        self.__update()
+        with self.__lock:
+            return {
+                "objects" : dict((k, v) for k, v in self.__objects.items() if v != 0),
+                "objectBytes" : dict((k, v) for k, v in self.__objectBytes.items() if self.__objects.get(k)),
+                "edges" : dict((k, v) for k, v in self.__edges.items() if v != 0),
+                "edgeBytes" : dict((k, v) for k, v in self.__edgeBytes.items() if self.__edges.get(k)),
+                "objectHandlers" : self.__handlers
+            }
@@ -0,0 +1,352 @@
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from functools import partial
+
+NEW = 0
+SET = 1
+ADD = 2
+REMOVE = 3
+DELETED = 4
+KINDS = { "set" : SET, "add" : ADD, "delete" : REMOVE }
+
+DEFAULT_KEYFRAME_INTERVAL = 5000 #Number of records between two keyframes
+DEFAULT_RETENTION = 86400 #Time in seconds the history is kept
+
+class HistoryStore:
+    """
+    Append-only history of the objects of a graph.
+
+    Every event of the graph is appended as one record to columnar arrays: Time, kind, object type, object,
+    member and value. Strings and values are interned in one table, the arrays only store their codes.
+    New objects are stored as one NEW record followed by a SET record for each initial value.
+    Objects are identified by their type and the ID the graph events carry.
+
+    Every keyframeInterval records a keyframe with the full state is taken. The state at a point in time is
+    reconstructed from the last keyframe before it and the records following the keyframe.
+    Keyframes are built by a thread of the store from the previous keyframe and the following records => The graph
+    events, which are triggered while the graph is locked, only append records.
+    Records and keyframes older than the retention are dropped when a keyframe is taken. Strings and values no longer
+    used by a retained record or keyframe are removed from the table and their codes are reused.
+    """
+
+    def __init__(self, graph, keyframeInterval=DEFAULT_KEYFRAME_INTERVAL, retention=DEFAULT_RETENTION):
+        """
+        Create a new history store and subscribe to the events of the graph.
+
+        :param graph: Graph to record
+        :type graph: insalata.model.Graph.Graph
+
+        :param keyframeInterval: Number of records between two keyframes
+        :type keyframeInterval: int
+
+        :param retention: Time in seconds records are kept
+        :type retention: float
+        """
+        self.graph = graph
+        self.keyframeInterval = max(1, int(keyframeInterval))
+        self.retention = float(retention)
+
+        self.__lock = threading.Lock()
+
+        #Columns of the records. The record at absolute position p is stored at index p - offset
+        self.__times = array('d')
+        self.__kinds = array('B')
+        self.__types = array('l')
+        self.__objects = array('l')
+        self.__members = array('l') #-1 if the record has no member
+        self.__values = array('l') #-1 if the record has no value
+        self.__offset = 0 #Number of records dropped by the retention
+
+        self.__table = list() #Code -> Interned string or value, None if the code is free
+        self.__codes = dict() #(Type, value) -> Code
+        self.__free = list() #Codes of removed strings and values
+        self.__collected = 0 #Number of codes used after the last removal of unused codes
+
+        #State: (Type code, object code) -> [Start time, {Member code -> Value code or set of value codes}]
+        now = time.time()
+        self.__keyframes = [(0, now, dict())] #(Absolute position, time, state) in order of the positions
+        self.__keyframeTimes = [now]
+        self.__lastTime = now
+        self.__stopped = False
+        self.__wake = threading.Event()
+
+        self.__subscriptions = [
+            graph.getObjectNewEvent().subscribe(partial(self.__record, NEW)),
+            graph.getObjectChangedEvent().subscribe(partial(self.__record, SET)),
+            graph.getObjectDeletedEvent().subscribe(partial(self.__record, DELETED))
+        ]
+
+        self.__thread = threading.Thread(target=self.__run, name="HistoryStore-{0}".format(graph.getID()))
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Unsubscribe from the events of the graph and stop taking keyframes. The recorded history stays available.
+        """
+        for subscription in self.__subscriptions:
+            subscription.cancel()
+        self.__stopped = True
+        self.__wake.set()
+
+    def __intern(self, value):
+        """
+        Get the code of a string or value. Lists and sets are stored as sorted tuples.
+        """
+        if isinstance(value, (list, set, frozenset)):
+            value = tuple(sorted(value, key=str))
+        key = (value.__class__, value) #True and 1 are equal, but different values
+        code = self.__codes.get(key)
+        if code is None:
+            if self.__free:
+                code = self.__free.pop()
+                self.__table[code] = value
+            else:
+                code = len(self.__table)
+                self.__table.append(value)
+            self.__codes[key] = code
+        return code
+
+    def __record(self, kind, sender, args):
+        """
+        Append the records of a graph event.
+        """
+        if "objectType" not in args or "object" not in args:
+            return
+        with self.__lock:
+            now = max(time.time(), self.__lastTime) #Times are kept sorted for the binary search
+            self.__lastTime = now
+            typeCode = self.__intern(args["objectType"])
+            objectCode = self.__intern(args["object"])
+
+            if kind == NEW:
+                self.__append(now, NEW, typeCode, objectCode, -1, -1)
+                for member, value in args.get("values", {}).items():
+                    if value is not None:
+                        self.__append(now, SET, typeCode, objectCode, self.__intern(member), self.__intern(value))
+            elif kind == SET:
+                kind = KINDS.get(args.get("type"), SET)
+                member = self.__intern(args["member"]) if "member" in args else -1
+                value = self.__intern(args["value"]) if args.get("value") is not None else -1
+                self.__append(now, kind, typeCode, objectCode, member, value)
+            else:
+                self.__append(now, DELETED, typeCode, objectCode, -1, -1)
+
+            if (self.__offset + len(self.__times)) - self.__keyframes[-1][0] >= self.keyframeInterval:
+                self.__wake.set()
+
+    def __append(self, now, kind, typeCode, objectCode, member, value):
+        self.__times.append(now)
+        self.__kinds.append(kind)
+        self.__types.append(typeCode)
+        self.__objects.append(objectCode)
+        self.__members.append(member)
+        self.__values.append(value)
+
+    @staticmethod
+    def __apply(state, now, kind, typeCode, objectCode, member, value):
+        """
+        Apply one record to a state.
+        """
+        key = (typeCode, objectCode)
+        if kind == NEW:
+            if key not in state:
+                state[key] = [now, dict()]
+            return
+        if kind == DELETED:
+            state.pop(key, None)
+            return
+        entry = state.get(key)
+        if entry is None or member == -1: #Changes of objects created before the history was started
+            if entry is None:
+                entry = state[key] = [None, dict()]
+            if member == -1:
+                return
+        values = entry[1]
+        if kind == SET:
+            if value == -1:
+                values.pop(member, None)
+            else:
+                values[member] = value
+        else:
+            members = values.get(member)
+            if not isinstance(members, set):
+                members = values[member] = set()
+            if kind == ADD:
+                members.add(value)
+            else:
+                members.discard(value)
+
+    @staticmethod
+    def __copyState(state):
+        return dict((key, [start, dict((m, set(v) if isinstance(v, set) else v) for m, v in values.items())])
+                    for key, (start, values) in state.items())
+
+    def __run(self):
+        while True:
+            self.__wake.wait()
+            self.__wake.clear()
+            if self.__stopped:
+                return
+            self.__takeKeyframe()
+            self.__collect()
+
+    def __takeKeyframe(self):
+        """
+        Store the state after the last record as keyframe and drop the records and keyframes older than the retention.
+        Only called by the thread of the store => Records are not dropped while the state is built without the lock.
+        """
+        with self.__lock:
+            end = self.__offset + len(self.__times)
+            position, _, previous = self.__keyframes[-1]
+            if end == position:
+                return
+            now = self.__times[-1]
+
+        #Records are only appended meanwhile => The records up to end keep their index
+        state = self.__copyState(previous)
+        times, kinds, types, objects, members, values = self.__times, self.__kinds, self.__types, self.__objects, self.__members, self.__values
+        for i in range(position - self.__offset, end - self.__offset):
+            self.__apply(state, times[i], kinds[i], types[i], objects[i], members[i], values[i])
+
+        with self.__lock:
+            self.__keyframes.append((end, now, state))
+            self.__keyframeTimes.append(now)
+
+            #Keep the last keyframe before the cutoff => The state at the cutoff can still be reconstructed
+            first = bisect_right(self.__keyframeTimes, now - self.retention) - 1
+            if first > 0:
+                del self.__keyframes[:first]
+                del self.__keyframeTimes[:first]
+                dropped = self.__keyframes[0][0] - self.__offset
+                for column in (self.__times, self.__kinds, self.__types, self.__objects, self.__members, self.__values):
+                    del column[:dropped]
+                self.__offset += dropped
+
+    def __collect(self):
+        """
+        Remove the strings and values not used by a retained record or keyframe from the table.
+        Only done once the number of codes doubled since the last time => The cost is spread over the interned values.
+        Only called by the thread of the store.
+        """
+        with self.__lock:
+            if len(self.__codes) < 2 * self.__collected:
+                return
+            end = len(self.__times)
+            size = len(self.__table)
+            keyframes = [state for _, _, state in self.__keyframes]
+
+        used = set()
+        for column in (self.__types, self.__objects, self.__members, self.__values):
+            used.update(column[:end])
+        for state in keyframes:
+            for key, (_, values) in state.items():
+                used.update(key)
+                for member, value in values.items():
+                    used.add(member)
+                    if isinstance(value, set):
+                        used.update(value)
+                    else:
+                        used.add(value)
+
+        with self.__lock:
+            for i in range(end, len(self.__times)): #Appended meanwhile, may use codes that were unused before
+                used.update((self.__types[i], self.__objects[i], self.__members[i], self.__values[i]))
+            for key, code in list(self.__codes.items()):
+                if code < size and code not in used:
+                    del self.__codes[key]
+                    self.__table[code] = None
+                    self.__free.append(code)
+            self.__collected = len(self.__codes)
+
+    def getRecordCount(self):
+        return len(self.__times)
+
+    def getCodeCount(self):
+        """
+        Get the number of strings and values in the table.
+        """
+        return len(self.__codes)
+
+    def getOldestTime(self):
+        """
+        Get the earliest point in time that can be reconstructed.
+        """
+        with self.__lock:
+            return self.__keyframeTimes[0]
+
+    def getStateAt(self, timestamp):
+        """
+        Reconstruct the objects that existed at a point in time.
+
+        :param timestamp: Point in time as seconds since the epoch
+        :type timestamp: float
+
+        :returns: Dictionary (object type, object ID) -> (start time, {member -> value or set of values})
+                  or None if the point in time is before the retained history
+        :rtype: dict
+        """
+        with self.__lock:
+            index = bisect_right(self.__keyframeTimes, timestamp) - 1
+            if index < 0:
+                return None
+            position, _, keyframe = self.__keyframes[index] #Keyframes are not changed once stored
+            start = position - self.__offset
+            end = bisect_right(self.__times, timestamp, start)
+            #The keyframe thread drops records and frees codes meanwhile => The range and the table are sliced,
+            #which copies references only. The state is copied and replayed without the lock
+            columns = [column[start:end] for column in (self.__times, self.__kinds, self.__types, self.__objects, self.__members, self.__values)]
+            table = self.__table[:]
+
+        state = self.__copyState(keyframe)
+        for record in zip(*columns):
+            self.__apply(state, *record)
+
+        result = dict()
+        for (typeCode, objectCode), (created, attributes) in state.items():
+            resolved = dict()
+            for member, value in attributes.items():
+                resolved[table[member]] = set(table[v] for v in value) if isinstance(value, set) else table[value]
+            result[(table[typeCode], table[objectCode])] = (created, resolved)
+        return result
+
+    @staticmethod
+    def __marshal(value):
+        """
+        Convert a value to a type XML-RPC can send. Integers are limited to 32 bit.
+        """
+        if isinstance(value, (bool, float, str)) or (isinstance(value, int) and -2**31 <= value < 2**31):
+            return value
+        return str(value)
+
+    def getGraphAt(self, timestamp):
+        """
+        Reconstruct the objects that existed at a point in time in a form that can be sent via XML-RPC.
+
+        :param timestamp: Point in time as seconds since the epoch
+        :type timestamp: float
+
+        :returns: Dictionary with the timestamp and a list of objects, each with its type, ID, creation time and values.
+                  None if the point in time is before the retained history
+        :rtype: dict
+        """
+        state = self.getStateAt(timestamp)
+        if state is None:
+            return None
+        objects = list()
+        for (objectType, objectID), (created, values) in sorted(state.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            entry = {
+                "objectType" : objectType,
+                "object" : str(objectID),
+                "values" : dict((member, sorted(str(v) for v in value) if isinstance(value, set) else self.__marshal(value))
+                                for member, value in values.items())
+            }
+            if created is not None:
+                entry["start"] = created
+            objects.append(entry)
+        return {
+            "timestamp" : timestamp,
+            "objects" : objects
+        }
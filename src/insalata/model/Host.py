@@ -2,7 +2,7 @@ from xml.etree.ElementTree import SubElement
 import sys
 import time
 import json
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Edge import Edge
 from insalata.model.Location import Location
 from insalata.model.Template import Template
@@ -11,7 +11,7 @@ from insalata.model.PartOfEdge import PartOfEdge
 DEFAULT_TEMPLATE = "host_base"
 
 class Host(Node):
-    def __init__(self, id, location = None, template = None, collectorName=None, timeout=None):
+    def __init__(self, id, location = None, template = None, collectorName=None, timeout=None, scheduler=None, statistics=None):
         """
         Create a new host object.
 
@@ -21,8 +21,10 @@ class Host(Node):
             template -- Template used to clone this host.
             collectorName -- Scanner that verifies the new host.
             timeout -- Timeout to delete the new host without new verify
+            scheduler -- Scheduler of the verification leases of the new host.
+            statistics -- Accounting of the graph of the new host.
         """
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
 
         self.__id = id
         self.cpus = None
@@ -46,9 +48,10 @@ class Host(Node):
         return self.getID()
 
     def getTemplate(self):
-        templates = self.getAllNeighbors(type=Template)
-        return list(templates)[0] if len(templates) > 0 else (self.getLocation().getDefaultTemplate() if self.getLocation() else None) 
+        template = self.getNeighbor(Template)
+        return template if template is not None else (self.getLocation().getDefaultTemplate() if self.getLocation() else None)
 
+    @mutation
     def setTemplate(self, newTemplate, collectorName=None, timeout=None):
         """
         Set the template this host is build on.
@@ -63,19 +66,18 @@ class Host(Node):
         :type timeout: int
         """
         if newTemplate and (len(self.getAllNeighbors(type=Template)) == 0 or newTemplate != self.getTemplate()):
-            for edge in self.getEdges():
-                if isinstance(edge.getOther(self), Template):
-                    edge.delete()
+            for edge in self.getEdges(Template):
+                edge.delete()
             PartOfEdge(newTemplate, self, collectorName=collectorName, timeout=timeout, association="template", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newTemplate]:
+            for edge in self.getEdgesTo(newTemplate):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
     def getLocation(self):
-        locations = self.getAllNeighbors(type=Location)
-        return list(locations)[0] if len(locations) > 0 else None
+        return self.getNeighbor(Location)
 
+    @mutation
     def setLocation(self, newLocation, collectorName=None, timeout=None):
         """
         Set the location this host is build on.
@@ -90,17 +92,17 @@ class Host(Node):
         :type timeout: int
         """
         if newLocation and newLocation != self.getLocation():
-            for edge in self.getEdges():
-                if isinstance(edge.getOther(self), Location):
-                    edge.delete()
+            for edge in self.getEdges(Location):
+                edge.delete()
             Edge(self, newLocation, collectorName=collectorName, timeout=timeout, association="location", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newLocation]:
+            for edge in self.getEdgesTo(newLocation):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
     def getCPUs(self):
         return int(self.cpus) if self.cpus else None
+    @mutation
     def setCPUs(self, newCPUs, collectorName=None, timeout=None):
         """
         Set the number of cpus of this host.
@@ -116,13 +118,14 @@ class Host(Node):
         """
         newCPUs = int(newCPUs) 
         if newCPUs and newCPUs != self.getCPUs():
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "cpu", "value" :  newCPUs})
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "cpu", "value" : newCPUs } if self.wants("cpu") else None)
             self.cpus = newCPUs
         self.verify(collectorName, timeout)
 
     def getMemory(self):
         return (int(self.memoryMin) if self.memoryMin else None, int(self.memoryMax) if self.memoryMax else None)
 
+    @mutation
     def setMemory(self, newMin, newMax, collectorName=None, timeout=None):
         """
         Set the memory of this host.
@@ -142,15 +145,16 @@ class Host(Node):
         newMax = int(newMax)
         newMin = int(newMin)
         if newMin and newMin != self.getMemory()[0]:
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "memoryMin", "value" :  newMin})
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "memoryMin", "value" : newMin } if self.wants("memoryMin") else None)
             self.memoryMin = int(newMin)
 
         if newMax and newMax != self.getMemory()[1]:
             self.memoryMax = int(newMax)
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "memoryMax", "value" : str(newMax) })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "memoryMax", "value" : str(newMax) } if self.wants("memoryMax") else None)
 
         self.verify(collectorName, timeout)
 
+    @mutation
     def addInterface(self, newInterface, collectorName=None, timeout=None):
         """
         Add an interface to this host.
@@ -164,7 +168,7 @@ class Host(Node):
         :param timeout: Timeout the collector uses
         :type timeout: int
         """
-        edges = [e for e in self.getEdges() if e.getOther(self) == newInterface]
+        edges = self.getEdgesTo(newInterface)
         if len(edges) == 0:
             PartOfEdge(newInterface, self, collectorName=collectorName, timeout=timeout, association="interface", changed=self)
         else:
@@ -175,6 +179,7 @@ class Host(Node):
     def getInterfaces(self):
         return self.getAllNeighbors(Interface)
 
+    @mutation
     def addRoute(self, newRoute, collectorName=None, timeout=None):
         """
         Add a route to this host.
@@ -191,7 +196,7 @@ class Host(Node):
         if newRoute not in self.getAllNeighbors(Route):
             PartOfEdge(newRoute, self, collectorName=collectorName, timeout=timeout, association="route", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newRoute]:
+            for edge in self.getEdgesTo(newRoute):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
@@ -202,9 +207,9 @@ class Host(Node):
         return self.getAllNeighbors(FirewallRule)
 
     def getFirewallRaw(self):
-        raw = self.getAllNeighbors(type=FirewallRaw)
-        return list(raw)[0] if len(raw) > 0 else None
+        return self.getNeighbor(FirewallRaw)
 
+    @mutation
     def addFirewallRule(self, newRule, collectorName=None, timeout=None):
         """
         Add a firewall rule to this host.
@@ -221,10 +226,11 @@ class Host(Node):
         if newRule not in self.getAllNeighbors(FirewallRule):
             PartOfEdge(newRule, self, collectorName=collectorName, timeout=timeout, association="firewallRule", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newRule]:
+            for edge in self.getEdgesTo(newRule):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
+    @mutation
     def setFirewallRaw(self, raw, collectorName=None, timeout=None):
         """
         Set the raw firewall dump for this host.
@@ -239,14 +245,15 @@ class Host(Node):
         :type timeout: int
         """
         if raw not in self.getAllNeighbors(FirewallRaw):
-            for edge in [e for e in self.getEdges() if isinstance(e, FirewallRaw)]:
+            for edge in self.getEdges(FirewallRaw):
                 edge.delete(association="firewallRaw", changed=self)
             PartOfEdge(raw, self, collectorName=collectorName, timeout=timeout, association="firewallRaw", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == raw]:
+            for edge in self.getEdgesTo(raw):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
+    @mutation
     def addDisk(self, disk, collectorName=None, timeout=None):
         """
         Add a disk to this host.
@@ -263,7 +270,7 @@ class Host(Node):
         if disk not in self.getAllNeighbors(Disk):
             PartOfEdge(disk, self, collectorName=collectorName, timeout=timeout, association="disk", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == disk]:
+            for edge in self.getEdgesTo(disk):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
@@ -273,6 +280,7 @@ class Host(Node):
     def getConfigNames(self):
         return frozenset(self.__configNames)
 
+    @mutation
     def setConfigNames(self, configs, collectorName=None, timeout=None):
         """
         Set the configurations
@@ -287,10 +295,11 @@ class Host(Node):
         :type timeout: int
         """
         if configs != list(self.getConfigNames()):
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "configurations", "value" : str(configs) })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "configurations", "value" : str(configs) } if self.wants("configurations") else None)
             self.__configNames = configs
         self.verify(collectorName, timeout)
 
+    @mutation
     def setPowerState(self, powerState, collectorName=None, timeout=None):
         """
         Change the power state of this host.
@@ -306,7 +315,7 @@ class Host(Node):
         """
         if self.getPowerState() != powerState:
             self.powerState = powerState
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "powerState", "value" : powerState })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "powerState", "value" : powerState } if self.wants("powerState") else None)
         self.verify(collectorName, timeout)
 
     def getPowerState(self):
@@ -319,6 +328,7 @@ class Host(Node):
     #new machines after cloning have 'false' here, the first reboot after naming them sets it to 'true'
     def getNameApplied(self):
         return self.__nameApplied
+    @mutation
     def setNameApplied(self, value):
         self.__nameApplied = value
 
@@ -1,12 +1,12 @@
 from xml.etree.ElementTree import SubElement
 from insalata.model.Layer2Network import Layer2Network
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Edge import Edge
 from insalata.model.PartOfEdge import PartOfEdge
 
 class Interface(Node):
 
-    def __init__(self, mac, network=None, collectorName=None, timeout=None):
+    def __init__(self, mac, network=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
         """
         Method creating new interface opject.
 
@@ -15,8 +15,14 @@ class Interface(Node):
 
         :param network: 'Network' object this interface is connected to
         :type network: insalata.model.Layer2Network
+
+        :param scheduler: Scheduler of the verification leases of this interface
+        :type scheduler: insalata.LeaseScheduler.LeaseScheduler
+
+        :param statistics: Accounting of the graph of this interface
+        :type statistics: insalata.model.GraphStatistics.GraphStatistics
         """
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.__mac = mac
         self.networkId = None
         self.rate = None # In kbps
@@ -33,9 +39,9 @@ class Interface(Node):
         return self.getID()
 
     def getNetwork(self):
-        networks = self.getAllNeighbors(type=Layer2Network)
-        return list(networks)[0] if len(networks) > 0 else None
+        return self.getNeighbor(Layer2Network)
 
+    @mutation
     def setNetwork(self, newNetwork, collectorName=None, timeout=None):
         """
         Set the network of this interface.
@@ -52,14 +58,13 @@ class Interface(Node):
         if not newNetwork:
             return
         if newNetwork != self.getNetwork():
-            for edge in self.getEdges(): #Delete old edges
-                if isinstance(edge.getOther(self), Layer2Network):
-                    edge.delete(association="network", changed=self)
+            for edge in self.getEdges(Layer2Network): #Delete old edges
+                edge.delete(association="network", changed=self)
             Edge(self, newNetwork, collectorName=collectorName, timeout=timeout, association="network", changed=self)
             self.networkId = newNetwork.getID()
 
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newNetwork]:
+            for edge in self.getEdgesTo(newNetwork):
                 edge.verify(collectorName, timeout)
 
         self.verify(collectorName, timeout)
@@ -69,6 +74,7 @@ class Interface(Node):
         
     def getRate(self):
         return int(self.rate) if self.rate else None
+    @mutation
     def setRate(self, newRate, collectorName=None, timeout=None):
         newRate = int(newRate)
         """
@@ -85,12 +91,13 @@ class Interface(Node):
         """
         if self.getRate() != newRate:
             self.rate=newRate
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "rate", "value" : newRate })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "rate", "value" : newRate } if self.wants("rate") else None)
         self.verify(collectorName, timeout)
 
     def getAddresses(self):
         return self.getAllNeighbors(type = Layer3Address)
 
+    @mutation
     def addAddress(self, address, collectorName=None, timeout=None):
         """
         Add a Layer3Address object to this interface.
@@ -107,12 +114,13 @@ class Interface(Node):
         if address not in self.getAllNeighbors(Layer3Address):
             PartOfEdge(address, self, collectorName=collectorName, timeout=timeout, association="address", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == address]:
+            for edge in self.getEdgesTo(address):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
     def getMtu(self):
         return int(self.mtu) if self.mtu else None
+    @mutation
     def setMtu(self, mtu, collectorName=None, timeout=None):
         """
         Set the MTU of this interface.
@@ -129,7 +137,7 @@ class Interface(Node):
         mtu = int(mtu)
         if self.getMtu() != mtu:
             self.mtu = mtu
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "mtu", "value" : mtu })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "mtu", "value" : mtu } if self.wants("mtu") else None)
         self.verify(collectorName, timeout)
 
 
@@ -140,9 +148,9 @@ class Interface(Node):
             return True
 
     def getHost(self):
-        hosts = self.getAllNeighbors(Host)
-        return list(hosts)[0] if len(hosts) > 0 else None
+        return self.getNeighbor(Host)
 
+    @mutation
     def setHost(self, newHost, collectorName=None, timeout=None):
         """
         Set the host containing this interface.
@@ -159,12 +167,11 @@ class Interface(Node):
         if not newHost:
             return
         if newHost not in self.getAllNeighbors(Host):
-            for edge in self.getEdges():
-                if isinstance(edge.getOther(self), Host):
-                    edge.delete(association="host", changed=self)
+            for edge in self.getEdges(Host):
+                edge.delete(association="host", changed=self)
             Edge(self, newHost, collectorName=collectorName, timeout=timeout, association="host", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newHost]:
+            for edge in self.getEdgesTo(newHost):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
@@ -1,11 +1,11 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Edge import Edge
 from insalata.model.Location import Location
 
 class Layer2Network(Node):
-    def __init__(self, id, location=None, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, id, location=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.__id = id
         self.__configNames = set()
 
@@ -20,6 +20,7 @@ class Layer2Network(Node):
     def getConfigNames(self):
         return frozenset(self.__configNames)
 
+    @mutation
     def setConfigNames(self, configs, collectorName=None, timeout=None):
         """
         Set the configurations
@@ -34,14 +35,14 @@ class Layer2Network(Node):
         :type timeout: int
         """
         if list(configs) != list(self.getConfigNames()):
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "configurations", "value" : str(configs) })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "configurations", "value" : str(configs) } if self.wants("configurations") else None)
             self.__configNames = configs
         self.verify(collectorName, timeout)
 
     def getLocation(self):
-        locations = self.getAllNeighbors(type=Location)
-        return list(locations)[0] if len(locations) > 0 else None
+        return self.getNeighbor(Location)
 
+    @mutation
     def setLocation(self, newLocation, collectorName=None, timeout=None):
         """
         Set the location containing the layer 2 network.
@@ -56,13 +57,12 @@ class Layer2Network(Node):
         :type timeout: int
         """
         if newLocation not in self.getAllNeighbors(Location):
-            for edge in self.getEdges():
-                if isinstance(edge.getOther(self), Location):
-                    edge.delete(association="location", changed=self)
+            for edge in self.getEdges(Location):
+                edge.delete(association="location", changed=self)
             Edge(self, newLocation, collectorName=collectorName, timeout=timeout, association="location", changed=self)
 
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newLocation]:
+            for edge in self.getEdgesTo(newLocation):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
@@ -1,4 +1,4 @@
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Interface import Interface
 from xml.etree.ElementTree import SubElement
 from insalata.model.Edge import Edge
@@ -8,8 +8,8 @@ from insalata.model.Layer3Network import Layer3Network
 
 
 class Layer3Address(Node):
-    def __init__(self, address, netmask=None, gateway=None, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, address, netmask=None, gateway=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.address = address
         self.netmask = netmask
         self.gateway = gateway
@@ -18,10 +18,14 @@ class Layer3Address(Node):
     def getID(self):
         return self.address
     def getGlobalID(self):
+        return self.getCachedGlobalID(self.__computeGlobalID)
+
+    def __computeGlobalID(self):
         return self.getInterface().getGlobalID() + "_" + self.getID() if self.getInterface() else self.getID()
 
     def getGateway(self):
         return self.gateway
+    @mutation
     def setGateway(self, value, collectorName=None, timeout=None):
         """
         Set the gateway of this address.
@@ -37,11 +41,12 @@ class Layer3Address(Node):
         """
         if value != self.getGateway():
             self.gateway = value
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "gateway", "value" : value })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "gateway", "value" : value } if self.wants("gateway") else None)
         self.verify(collectorName, timeout)
 
     def getNetmask(self):
         return self.netmask
+    @mutation
     def setNetmask(self, value, collectorName=None, timeout=None):
         """
         Set the netmask of this address.
@@ -57,12 +62,13 @@ class Layer3Address(Node):
         """
         if value and value != self.getNetmask():
             self.netmask = value
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "netmask", "value" : value })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "netmask", "value" : value } if self.wants("netmask") else None)
         self.verify(collectorName, timeout)
 
     def getPrefix(self): #generate prefix from decimal dotted netmask string
         return sum([bin(int(x)).count('1') for x in self.netmask.split('.')])
 
+    @mutation
     def addService(self, service, collectorName=None, timeout=None):
         """
         Add a service to this layer 3 address.
@@ -81,7 +87,7 @@ class Layer3Address(Node):
         if service not in self.getAllNeighbors(Service):
             PartOfEdge(service, self, collectorName=collectorName, timeout=timeout, association="service", changed=self)
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == service]:
+            for edge in self.getEdgesTo(service):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
@@ -89,11 +95,11 @@ class Layer3Address(Node):
         return self.getAllNeighbors(Service)
 
     def getInterface(self):
-        interfaces = self.getAllNeighbors(Interface)
-        return list(interfaces)[0] if len(interfaces) > 0 else None
+        return self.getNeighbor(Interface)
 
     def getStatic(self):
         return self.static
+    @mutation
     def setStatic(self, value, collectorName=None, timeout=None):
         """
         Define if this address is configured statically on the host.
@@ -109,13 +115,13 @@ class Layer3Address(Node):
         """
         if self.getStatic() != value:
             self.static = value
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "static", "value" : value })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "static", "value" : value } if self.wants("static") else None)
         self.verify(collectorName, timeout)
 
     def getNetwork(self):
-        networks = self.getAllNeighbors(type=Layer3Network)
-        return list(networks)[0] if len(networks) > 0 else None
+        return self.getNeighbor(Layer3Network)
 
+    @mutation
     def setNetwork(self, newNetwork, collectorName=None, timeout=None):
         """
         Set the new Layer3Network of this address.
@@ -134,14 +140,13 @@ class Layer3Address(Node):
         if not newNetwork:
             return
         if newNetwork != self.getNetwork():
-            for edge in self.getEdges(): #Delete old edges
-                if isinstance(edge.getOther(self), Layer3Network):
-                    edge.delete(association="network", changed=self)
+            for edge in self.getEdges(Layer3Network): #Delete old edges
+                edge.delete(association="network", changed=self)
             Edge(self, newNetwork, collectorName=collectorName, timeout=timeout, association="network", changed=self)
             self.networkId = newNetwork.getID()
 
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == newNetwork]:
+            for edge in self.getEdgesTo(newNetwork):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
 
@@ -1,10 +1,10 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.helper import ipAddressHelper
 
 class Layer3Network(Node):
-    def __init__(self, id, address, netmask, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, id, address, netmask, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.__id = id
         self.netmask = netmask
         self.address = address
@@ -17,14 +17,16 @@ class Layer3Network(Node):
     def getAddress(self):
         return self.address
 
+    @mutation
     def setAddress(self, address, collectorName=None, timeout=None):
         if self.getAddress() != address:
             self.address = address
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member"  : "address", "value" : address })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "address", "value" : address } if self.wants("address") else None)
         self.verify(collectorName, timeout)
 
     def getNetmask(self):
         return self.netmask
+    @mutation
     def setNetmask(self, value, collectorName=None, timeout=None):
         """
         Change the netmask of this network.
@@ -40,13 +42,14 @@ class Layer3Network(Node):
         """
         if (value is not None) and (self.getNetmask() != value):
             self.netmask = value
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "netmask", "value" : value })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "netmask", "value" : value } if self.wants("netmask") else None)
         self.verify(collectorName, timeout)
 
     def getPrefix(self): #generate prefix from decimal dotted netmask string
         return ipAddressHelper.getPrefix(self.getNetmask())
 
     #Delete stored environments due to new scan
+    @mutation
     def delConfigurations(self, collectorName=None, timeout=None):
         self.__configNames = set()
         self.verify(collectorName, timeout)
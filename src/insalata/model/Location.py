@@ -1,5 +1,5 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from configobj import ConfigObj
 import os
 from insalata.model.PartOfEdge import PartOfEdge
@@ -8,8 +8,8 @@ LOCATIONS_CONF = "/etc/insalata/locations.conf"
 
 
 class Location(Node):
-    def __init__(self, id, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, id, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
 
         self.__id = id.lower()
         self.__type = None
@@ -42,6 +42,7 @@ class Location(Node):
         """
         return self.__defaultTemplate
 
+    @mutation
     def delete(self):
         """
         Delete this node.
@@ -52,6 +53,7 @@ class Location(Node):
             template.delete()
         super().delete()
 
+    @mutation
     def addTemplate(self, template):
         """
         Add a template to this location.
@@ -59,7 +61,7 @@ class Location(Node):
         :param template: Template to add
         :type template: insalata.model.Template.Template
         """
-        edges = [e for e in self.getEdges() if e.getOther(self) == template]
+        edges = self.getEdgesTo(template)
         if len(edges) == 0:
             PartOfEdge(template, self)
 
@@ -1,12 +1,35 @@
-import datetime
+import time
+import copy
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
 from random import randint
 
 from insalata.model.Event import Event
-from insalata.Timer import Timer
-
+from insalata.model.Edge import CONTAINS
+from insalata.LeaseScheduler import getDefaultScheduler
+
+GLOBAL_ID = "globalID" #Key of the global ID in the cache of a node
+
+def mutation(method):
+    """
+    Decorator of the methods changing a node, e.g. setters.
+    The method is executed holding the write lock of the graph of the node (See Node.writing)
+    => Readers of the graph never see a half-applied change.
+    """
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.writing():
+            return method(self, *args, **kwargs)
+    return locked
 
 class Node:
-    def __init__(self, collectorName=None, timeout=None):
+    #The bookkeeping of every node is stored in slots, events and leases are allocated on first use.
+    #Model classes keep their __dict__ for their public attributes, which are compared by insalata.helper.diff.
+    __slots__ = ("__edges", "__adjacency", "__cache", "__scheduler", "__statistics", "__scanners", "__lifetimeStart", "__lifetimeEnd", "__bfsRand",
+                 "__deprecated", "__onChangeEvent", "__onDeleteEvent", "__dict__", "__weakref__")
+
+    def __init__(self, collectorName=None, timeout=None, scheduler=None, statistics=None):
         """
         Create anew node in the graph.
 
@@ -15,24 +38,60 @@ class Node:
 
         :param timeout: (optional) Timeout of verifycation
         :type timeout: int
+
+        :param scheduler: (optional) Scheduler of the verification leases of this node.
+                          The default scheduler is used if None
+        :type scheduler: insalata.LeaseScheduler.LeaseScheduler
+
+        :param statistics: (optional) Accounting of the graph of this node. Accounts the edges of this node
+        :type statistics: insalata.model.GraphStatistics.GraphStatistics
         """
         self.__edges = set()
-        self.__scanners = dict() #List of Timers
-        self.__lifetimeStart = datetime.datetime.now()
+        self.__adjacency = dict() #Class of the neighbor -> Set of edges leading to neighbors of this class
+        self.__cache = None #Neighbors of single-valued associations by type and the global ID. Dropped on every edge change
+        self.__scheduler = scheduler
+        self.__statistics = statistics
+        self.__scanners = None #Collector name -> Lease. Allocated with the first verification
+        self.__lifetimeStart = time.time()
         self.__lifetimeEnd = None
         self.__bfsRand = None
         self.__deprecated = False #Flag that shows if this Node is valid -> If True: It is not allowed to create a Edge to this Node
 
-        self.__onChangeEvent = Event()
-        self.__onDeleteEvent = Event()
+        self.__onChangeEvent = None #Allocated on first use
+        self.__onDeleteEvent = None
 
         self.verify(collectorName, timeout)
 
     def getTimers(self):
         """
-        Return all verification Timers of this node.
+        Return all verification leases of this node.
+        """
+        return self.__scanners.values() if self.__scanners is not None else ()
+
+    def getScheduler(self):
+        """
+        Return the scheduler of the verification leases of this node.
+        None if this node does not belong to an environment.
         """
-        return self.__scanners.values()
+        return self.__scheduler
+
+    def getStatistics(self):
+        """
+        Return the accounting of the graph of this node.
+        None if this node does not belong to an environment.
+        """
+        return self.__statistics
+
+    def writing(self):
+        """
+        Get a context manager holding the write lock of the graph of this node.
+        The scheduler of a graph executes expiring leases under this lock, so it is taken from the scheduler.
+        Nodes not belonging to a graph are not locked.
+        """
+        scheduler = self.__scheduler
+        if scheduler is None or scheduler.lock is None:
+            return nullcontext()
+        return scheduler.lock()
 
     def getOnChangeEvent(self):
         """
@@ -40,16 +99,40 @@ class Node:
 
         The onChangeEvent is triggered everytime a value is changed.
         """
+        if self.__onChangeEvent is None:
+            self.__onChangeEvent = Event()
         return self.__onChangeEvent
 
+    def wants(self, member):
+        """
+        Test if the arguments of a change of a member have any consumer. Setters only build the arguments
+        if so and trigger the onChangeEvent with None otherwise.
+        Handlers bound to an object with a method wantsChange ask this method (See
+        insalata.model.Graph.Graph.wantsChange), all other handlers consume every change.
+
+        :param member: Changed member
+        :type member: str
+        """
+        event = self.__onChangeEvent
+        if event is None:
+            return False
+        for handler in event.handlers:
+            wantsChange = getattr(getattr(handler, "__self__", None), "wantsChange", None)
+            if wantsChange is None or wantsChange(self, member):
+                return True
+        return False
+
     def getOnDeleteEvent(self):
         """
         Return the onDeleteEvent of this node.
 
         The objectDeletedEvent is triggered when the object is deleted.
         """
+        if self.__onDeleteEvent is None:
+            self.__onDeleteEvent = Event()
         return self.__onDeleteEvent
 
+    @mutation
     def delete(self):
         """
         Delete this node and all edges pointing to it.
@@ -57,13 +140,14 @@ class Node:
         Triggers the onDeleteEvent.
         """
         self.__deprecated = True
-        self.__lifetimeEnd = datetime.datetime.now()
+        self.__lifetimeEnd = time.time()
         for edge in self.getEdges():
             edge.delete()
         for timer in list(self.getScanners().keys()):
             self.getScanners()[timer].cancel()
 
-        self.getOnDeleteEvent().trigger(self, {})
+        if self.__onDeleteEvent is not None: #Nobody subscribed if the event was never allocated
+            self.__onDeleteEvent.trigger(self, {})
 
     def getDeprecated(self):
         return self.__deprecated
@@ -71,18 +155,24 @@ class Node:
 
     def getScanners(self):
         """
-        Get all timers of this node.
+        Get all verification leases of this node by collector name.
         """
-        return self.__scanners
+        return self.__scanners if self.__scanners is not None else dict()
         
     def addEdge(self, edge):
         """
         Add an edge to the set of edges of this node object.
+        The edge is additionally stored in the bucket of the neighbor's class.
 
         :param edge: Edge which should be added to the set of edges
         :type edge: insalata.model.Edge.Edge
         """
         self.__edges.add(edge)
+        neighborClass = edge.getOther(self).__class__
+        if neighborClass not in self.__adjacency:
+            self.__adjacency[neighborClass] = set()
+        self.__adjacency[neighborClass].add(edge)
+        self.__invalidate()
 
     def removeEdge(self, edge):
         """
@@ -94,23 +184,112 @@ class Node:
         try:
             self.__edges.remove(edge)
         except: #Ignore if edge is not part of the edges set
-            pass
+            return
+        neighborClass = edge.getOther(self).__class__
+        bucket = self.__adjacency.get(neighborClass)
+        if bucket is not None:
+            bucket.discard(edge)
+            if len(bucket) == 0:
+                self.__adjacency.pop(neighborClass, None)
+        self.__invalidate()
+
+    def __invalidate(self):
+        """
+        Drop the cached neighbors and global ID after an edge changed.
+        The global IDs of the parts of this node are dropped as well, as they are prefixed with the global ID of this node.
+        The cache is replaced and not cleared => A reader filling the old cache concurrently does not leave stale entries.
+        """
+        cache = self.__cache
+        self.__cache = None
+        if cache is not None and GLOBAL_ID in cache:
+            for edge in tuple(self.__edges):
+                if edge.getKind(self) == CONTAINS:
+                    part = edge.getOther(self)
+                    if part.__cache is not None and GLOBAL_ID in part.__cache:
+                        part.__invalidate()
+
+    def getNeighbor(self, type):
+        """
+        Get the neighbor of a single-valued association, e.g. the location of a host.
+        The neighbor is cached until an edge of this node is added or removed.
+
+        :param type: Type of the neighbor
+        :type type: type
+
+        :returns: A neighbor of this type or None if there is none
+        :rtype: insalata.model.Node.Node
+        """
+        cache = self.__cache
+        if cache is None:
+            cache = self.__cache = dict()
+        elif type in cache:
+            return cache[type]
+        neighbor = None
+        for neighborClass, bucket in tuple(self.__adjacency.items()):
+            if issubclass(neighborClass, type):
+                edges = tuple(bucket)
+                if len(edges) > 0:
+                    neighbor = edges[0].getOther(self)
+                    break
+        cache[type] = neighbor
+        return neighbor
+
+    def getCachedGlobalID(self, compute):
+        """
+        Get the global ID of this node from the cache. The cache is dropped if an edge of this node is added or removed.
+        Used by model classes whose global ID depends on the node they are part of.
+
+        :param compute: Function computing the global ID if it is not cached
+        :type compute: function reference
+
+        :returns: Global ID of this node
+        :rtype: str
+        """
+        cache = self.__cache
+        if cache is None:
+            cache = self.__cache = dict()
+        globalID = cache.get(GLOBAL_ID)
+        if globalID is None:
+            globalID = cache[GLOBAL_ID] = compute()
+        return globalID
 
    
-    def getEdges(self):
+    def getEdges(self, type=None):
         """
         Return the set of all edges of this node object.
 
+        :param type: (optional) Only return edges leading to neighbors of this type
+        :type type: type
+
         Returns:
             set of all edges.
         """
-        return frozenset(self.__edges)
+        if type is None:
+            return frozenset(self.__edges)
+        buckets = [b for neighborClass, b in tuple(self.__adjacency.items()) if issubclass(neighborClass, type)]
+        if len(buckets) == 1:
+            return frozenset(buckets[0])
+        return frozenset().union(*buckets)
+
+    def getEdgesTo(self, node):
+        """
+        Return all edges of this node leading to a neighbor equal to the given node.
 
+        :param node: Neighbor the edges shall lead to
+        :type node: insalata.model.Node.Node
+
+        Returns:
+            list of edges.
+        """
+        if node is None:
+            return []
+        return [e for e in self.getEdges(node.__class__) if e.getOther(self) == node]
 
-    
     def getAllNeighbors(self, type=None):
         """
         Get all neighbors of this node of a special type.
+        Only the buckets of matching neighbor classes are visited, so the cost
+        depends on the size of the result and not on the degree of this node.
 
         Keyword arguments:
             type -- Type of the returned objects. If None all neighbors will be returned.
@@ -118,18 +297,13 @@ class Node:
         Returns:
             set of all neighbors of the type.
         """
-        neighbors = set()
-        for e in self.getEdges():
-            neighbor = e.getOther(self)
-            if (type is None) or isinstance(neighbor, type):
-                neighbors.add(neighbor)
+        return frozenset([e.getOther(self) for e in self.getEdges(type)])
 
-        return frozenset(neighbors)
 
-        
+    @mutation
     def verify(self, collectorName, timeout):
         """
-        Verify this node and start the timer.
+        Verify this node and renew the lease of the scanner.
 
         :param collectorName: Name of the scanner that verifies this node
         :type collectorName: str
@@ -138,11 +312,15 @@ class Node:
         :type timeout: int
         """
         if (collectorName is not None) and (timeout is not None):
-            if collectorName in list(self.getScanners().keys()):
-                self.getScanners()[collectorName].cancel()
-            self.getScanners()[collectorName] = Timer(timeout, self.removeVerificationTimeout, [collectorName])
-            self.getScanners()[collectorName].start()
-
+            if self.__scanners is None:
+                self.__scanners = dict()
+            lease = self.__scanners.get(collectorName)
+            if (lease is None) or not lease.renew(timeout):
+                scheduler = self.__scheduler if self.__scheduler is not None else getDefaultScheduler()
+                lease = self.__scanners[collectorName] = scheduler.schedule(timeout, self.removeVerificationTimeout, [collectorName])
+            lease.scheduler.record(collectorName, lease)
+
+    @mutation
     def removeVerification(self, collectorName):
         """
         Remove a scanner from the list of scanners that verify this object.
@@ -151,18 +329,53 @@ class Node:
         :param collecorName: Scanner to remove
         :type collectorName: str
         """
-        if collectorName in list(self.getScanners()):
-            self.getScanners().pop(collectorName, None)
-            self.getScanners()[collectorName].cancel()
+        lease = self.getScanners().pop(collectorName, None)
+        if lease is not None:
+            lease.cancel()
         if len(self.getScanners()) == 0:
             self.delete()
 
+    @mutation
     def removeVerificationTimeout(self, collectorName):
-        if collectorName in list(self.getScanners()):
+        """
+        Called if the lease of a scanner expired.
+        The verification is kept if the scanner renewed it in the meantime.
+
+        :param collecorName: Scanner whose lease expired
+        :type collectorName: str
+        """
+        lease = self.getScanners().get(collectorName)
+        if (lease is not None) and lease.getOver():
             self.getScanners().pop(collectorName, None)
         if len(self.getScanners()) == 0:
             self.delete()
 
+    def detachedCopy(self, scheduler=None):
+        """
+        Copy the values of this node without its edges, verification leases and event handlers.
+        Containers of the copied attributes are copied as well => Changing the copy does not change this node.
+
+        :param scheduler: (optional) Scheduler of the graph the copy belongs to. Changes of the copy take the lock
+                          of this scheduler (See writing) => A read-only graph refuses them
+        :type scheduler: insalata.LeaseScheduler.LeaseScheduler
+
+        :returns: Copy of this node not belonging to any graph
+        :rtype: insalata.model.Node.Node
+        """
+        clone = copy.copy(self)
+        for key, value in clone.__dict__.items():
+            if isinstance(value, (set, list, dict)):
+                clone.__dict__[key] = type(value)(value)
+        clone.__edges = set()
+        clone.__adjacency = dict()
+        clone.__cache = None
+        clone.__scheduler = scheduler
+        clone.__statistics = None
+        clone.__scanners = None
+        clone.__onChangeEvent = None
+        clone.__onDeleteEvent = None
+        return clone
+
     def bfs(self, action):
         action(self)
         return self.getAllNeighbors()
@@ -188,8 +401,8 @@ class Node:
             return
         print(self.getBfsID() + " [style=filled, fillcolor={0}];".format(colors[self.__class__.__name__]))
         for edge in self.getEdges():
-            #if not (edge.getOther(self).__class__.__name__ == "Graph"):
-            print(self.getBfsID() + ' -> ' + edge.getOther(self).getBfsID() + ";")
+            if not (edge.getOther(self).__class__.__name__ == "Graph"): #Edges to the root connect every object
+                print(self.getBfsID() + ' -> ' + edge.getOther(self).getBfsID() + ";")
 
         
     def getBfsID(self):
@@ -203,13 +416,59 @@ class Node:
 
     @staticmethod
     def doBFS(action, start):
-        workingSet = set([start])
-        visited = set()
-
-        while len(workingSet) != 0:
-            newWorkingSet = set()
-            for node in workingSet:
-                newWorkingSet = newWorkingSet.union(node.bfs(action))
-            visited = visited.union(workingSet)
-            workingSet = newWorkingSet
-            workingSet = workingSet.difference(visited)
+        for node, _ in Node.iterateBFS(start):
+            action(node)
+
+    @staticmethod
+    def iterateBFS(start, types=None, edgeKinds=None, maxDepth=None, exclude=None):
+        """
+        Breadth first traversal starting at one or more nodes.
+        Every node is visited once. Stop iterating the generator to terminate the traversal early.
+
+        :param start: Start node or iterable of start nodes. Start nodes are visited at depth 0
+        :type start: insalata.model.Node.Node
+
+        :param types: (optional) Only enter neighbors of these types. Start nodes are always visited
+        :type types: list
+
+        :param edgeKinds: (optional) Only follow edges of these kinds seen from the visited node.
+                          Kinds are defined in insalata.model.Edge: EDGE, PART_OF and CONTAINS
+        :type edgeKinds: list
+
+        :param maxDepth: (optional) Maximal distance to the start nodes
+        :type maxDepth: int
+
+        :param exclude: (optional) Node that is never entered, e.g. the root of a graph
+        :type exclude: insalata.model.Node.Node
+
+        :returns: Generator of tuples (node, depth) in breadth first order
+        :rtype: generator
+        """
+        starts = [start] if isinstance(start, Node) else list(start)
+        types = tuple(types) if types is not None else None
+        visited = set(id(node) for node in starts) #Identities => No user defined __hash__ is called
+        if exclude is not None:
+            visited.add(id(exclude))
+        matches = dict() #Neighbor class -> Bool if it matches the types
+        frontier = deque((node, 0) for node in starts)
+
+        while frontier:
+            node, depth = frontier.popleft()
+            yield node, depth
+            if maxDepth is not None and depth >= maxDepth:
+                continue
+            #Buckets are copied as tuples => Collectors may change the node while the caller handles it
+            for neighborClass, bucket in tuple(node.__adjacency.items()):
+                if types is not None:
+                    match = matches.get(neighborClass)
+                    if match is None:
+                        match = matches[neighborClass] = issubclass(neighborClass, types)
+                    if not match:
+                        continue
+                for edge in tuple(bucket):
+                    if edgeKinds is not None and edge.getKind(node) not in edgeKinds:
+                        continue
+                    other = edge.getOther(node)
+                    if id(other) not in visited:
+                        visited.add(id(other))
+                        frontier.append((other, depth + 1))
@@ -1,10 +1,24 @@
-from insalata.model.Edge import Edge
+from insalata.model.Edge import Edge, PART_OF, CONTAINS
 
 class PartOfEdge(Edge):
+    __slots__ = ()
+
     def __init__(self, start, end, collectorName=None, timeout=None, association=None, changed=None):
         """
         Create a new part of relationships between two nodes.
         Sematics: "start is part of end"
 
         """
-        Edge.__init__(self, start, end, collectorName=collectorName, timeout=timeout, association=association, changed=changed)
\ No newline at end of file
+        Edge.__init__(self, start, end, collectorName=collectorName, timeout=timeout, association=association, changed=changed)
+
+    def getKind(self, node):
+        """
+        Return the kind of this edge seen from one of its nodes.
+
+        :param node: One of the nodes that are incident to this edge
+        :type node: insalata.model.Node.Node
+
+        :returns: PART_OF if the node is part of the other node, CONTAINS otherwise
+        :rtype: int
+        """
+        return PART_OF if self.getNodes()[0] is node else CONTAINS
@@ -0,0 +1,430 @@
+import re
+import json
+import heapq
+from functools import lru_cache
+
+from insalata.model.Node import Node
+from insalata.model.Host import Host
+from insalata.model.Interface import Interface
+from insalata.model.Layer2Network import Layer2Network
+from insalata.model.Layer3Network import Layer3Network
+from insalata.model.Layer3Address import Layer3Address
+from insalata.model.Location import Location
+from insalata.model.Template import Template
+from insalata.model.Route import Route
+from insalata.model.FirewallRule import FirewallRule
+from insalata.model.FirewallRaw import FirewallRaw
+from insalata.model.Disk import Disk
+from insalata.model.Service import Service
+from insalata.model.DhcpService import DhcpService
+from insalata.model.DnsService import DnsService
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+
+#Names of the object types in queries (lower case) -> Class. Singular and plural names navigate to neighbors
+TYPES = dict()
+for _type, _names in [(Host, ["host"]), (Interface, ["interface"]), (Layer2Network, ["layer2network", "l2network"]),
+                      (Layer3Network, ["layer3network", "l3network"]), (Layer3Address, ["layer3address", "address"]),
+                      (Location, ["location"]), (Template, ["template"]), (Route, ["route"]),
+                      (FirewallRule, ["firewallrule", "rule"]), (FirewallRaw, ["firewallraw"]), (Disk, ["disk"]),
+                      (Service, ["service"]), (DhcpService, ["dhcpservice"]), (DnsService, ["dnsservice"])]:
+    for _name in _names:
+        TYPES[_name] = _type
+        TYPES[_name + ("es" if _name.endswith("s") else "s")] = _type
+
+TOKENS = re.compile(r"""\s*(?:(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(?P<number>-?\d+(?:\.\d+)?(?![\w.]))|"""
+                    r"""(?P<op>!=|<=|>=|=|<|>|~|\(|\)|,)|(?P<name>[A-Za-z_][\w]*(?:\.[A-Za-z_][\w]*)*))""")
+KEYWORDS = ["where", "and", "or", "not", "in", "true", "false", "null"]
+COMPARISONS = ["=", "!=", "<", "<=", ">", ">=", "~", "in"]
+
+class Query:
+    """
+    Declarative query on the objects of a graph.
+
+    Syntax:
+        <type> [where <condition>]
+
+        condition   <path> <operator> <value> | <path> in (<value>, ...) | <path>
+                    not <condition> | <condition> and <condition> | <condition> or <condition> | (<condition>)
+        path        Dotted names. All names but the last navigate from an object to its neighbors of a type
+                    (e.g. interface, address, service, l2network, l3network, route, ...) or to the objects returned
+                    by the getter of this name. The last name is an attribute read by its getter or, if the object
+                    has no such attribute, a type whose neighbors are compared by their ID.
+                    A path without operator tests that it has any value.
+        operator    =, !=, <, <=, >, >=, ~ (regular expression search)
+        value       "string", 'string', number, true, false or null
+
+    A condition on a path holds if any object reached by the path fulfills it.
+    Numbers are compared numerically with numeric strings, e.g. memory values.
+
+    Examples:
+        Host where interface.address.service.port = 22 and interface.address.l3network.id = "net1"
+        Route where interface.id = "enx00163e000001"
+        Interface where mtu >= 9000 or not address
+
+    Equality conditions on the ID of an indexed object (host, interface, networks, addresses) are answered with
+    the indexes of the graph instead of scanning all objects of the type. A path of type names ending in such a
+    condition is followed backwards from the indexed object, e.g. from the network to its hosts above.
+    Results are ordered by global ID. A cursor returned with a page continues after its last object.
+    """
+
+    def __init__(self, expression):
+        """
+        Parse a query.
+
+        :param expression: Query in the syntax above
+        :type expression: str
+        """
+        self.expression = expression
+        self.__tokens = self.__tokenize(expression)
+        self.__position = 0
+
+        typeName = self.__expect("name").lower()
+        if typeName not in TYPES:
+            raise ValueError("Unknown type '{0}'.".format(typeName))
+        self.type = TYPES[typeName]
+        self.condition = None
+        if self.__peek() == ("keyword", "where"):
+            self.__position += 1
+            self.condition = self.__parseOr()
+        if self.__position < len(self.__tokens):
+            raise ValueError("Unexpected '{0}' in query.".format(self.__tokens[self.__position][1]))
+
+    @staticmethod
+    def __tokenize(expression):
+        tokens = list()
+        position = 0
+        expression = expression.strip()
+        while position < len(expression):
+            match = TOKENS.match(expression, position)
+            if match is None or match.end() == position:
+                raise ValueError("Invalid query at '{0}'.".format(expression[position:]))
+            position = match.end()
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == "string":
+                tokens.append(("value", re.sub(r"\\(.)", r"\1", text[1:-1])))
+            elif kind == "number":
+                tokens.append(("value", float(text) if "." in text else int(text)))
+            elif kind == "name" and text.lower() in KEYWORDS:
+                keyword = text.lower()
+                if keyword in ["true", "false", "null"]:
+                    tokens.append(("value", { "true" : True, "false" : False, "null" : None }[keyword]))
+                else:
+                    tokens.append(("keyword", keyword))
+            else:
+                tokens.append((kind, text))
+        return tokens
+
+    def __peek(self):
+        return self.__tokens[self.__position] if self.__position < len(self.__tokens) else (None, None)
+
+    def __expect(self, kind, text=None):
+        token = self.__peek()
+        if token[0] != kind or (text is not None and token[1] != text):
+            raise ValueError("Expected {0} but found '{1}' in query.".format(text if text else kind, token[1]))
+        self.__position += 1
+        return token[1]
+
+    #Conditions are tuples: ("or", [conditions]), ("and", [conditions]), ("not", condition), ("compare", path, operator, value)
+    def __parseOr(self):
+        conditions = [self.__parseAnd()]
+        while self.__peek() == ("keyword", "or"):
+            self.__position += 1
+            conditions.append(self.__parseAnd())
+        return conditions[0] if len(conditions) == 1 else ("or", conditions)
+
+    def __parseAnd(self):
+        conditions = [self.__parseNot()]
+        while self.__peek() == ("keyword", "and"):
+            self.__position += 1
+            conditions.append(self.__parseNot())
+        return conditions[0] if len(conditions) == 1 else ("and", conditions)
+
+    def __parseNot(self):
+        token = self.__peek()
+        if token == ("keyword", "not"):
+            self.__position += 1
+            return ("not", self.__parseNot())
+        if token == ("op", "("):
+            self.__position += 1
+            condition = self.__parseOr()
+            self.__expect("op", ")")
+            return condition
+
+        path = self.__expect("name").split(".")
+        token = self.__peek()
+        if token == ("keyword", "in"):
+            self.__position += 1
+            self.__expect("op", "(")
+            values = [self.__expect("value")]
+            while self.__peek() == ("op", ","):
+                self.__position += 1
+                values.append(self.__expect("value"))
+            self.__expect("op", ")")
+            return ("compare", path, "in", values)
+        if token[0] == "op" and token[1] in COMPARISONS:
+            self.__position += 1
+            value = self.__expect("value")
+            if token[1] == "~":
+                value = re.compile(str(value))
+            return ("compare", path, token[1], value)
+        return ("compare", path, None, None)
+
+    @staticmethod
+    def __getters(node):
+        """
+        Get the getters of the class of a node by lower case name, e.g. 'cpus' -> Host.getCPUs.
+        """
+        return _getters(node.__class__)
+
+    @staticmethod
+    def __step(nodes, name):
+        """
+        Navigate from objects to their neighbors of a type or to the objects returned by a getter.
+        """
+        result = dict()
+        type = TYPES.get(name.lower())
+        for node in nodes:
+            if type is not None:
+                neighbors = node.getAllNeighbors(type)
+            else:
+                getter = Query.__getters(node).get(name.lower())
+                neighbors = getter(node) if getter is not None else None
+                if isinstance(neighbors, Node):
+                    neighbors = [neighbors]
+                elif not isinstance(neighbors, (list, set, frozenset, tuple)):
+                    neighbors = []
+            for neighbor in neighbors:
+                if isinstance(neighbor, Node) and not neighbor.getDeprecated():
+                    result[id(neighbor)] = neighbor
+        return list(result.values())
+
+    @staticmethod
+    def __values(node, path):
+        """
+        Get all values of a path starting at an object.
+        """
+        nodes = [node]
+        for name in path[:-1]:
+            nodes = Query.__step(nodes, name)
+            if len(nodes) == 0:
+                return []
+        #The last name is an attribute or, if the object has no attribute of this name, a type of neighbors
+        name = path[-1].lower()
+        values = list()
+        for node in nodes:
+            getter = Query.__getters(node).get(name)
+            if getter is not None:
+                value = getter(node)
+            else:
+                attributes = dict((key.lower(), value) for key, value in node.__dict__.items())
+                if name in attributes:
+                    value = attributes[name]
+                elif name in TYPES:
+                    value = Query.__step([node], name)
+                else:
+                    value = None
+            if isinstance(value, Node):
+                value = value.getID()
+            if isinstance(value, (list, set, frozenset, tuple)):
+                values.extend(v.getID() if isinstance(v, Node) else v for v in value)
+            elif value is not None:
+                values.append(value)
+        return values
+
+    @staticmethod
+    def __compare(value, operator, expected):
+        if operator == "~":
+            return expected.search(str(value)) is not None
+        if operator == "in":
+            return any(Query.__compare(value, "=", e) for e in expected)
+        if operator in ["=", "!="]:
+            equal = value == expected or str(value) == str(expected) or Query.__number(value) == Query.__number(expected) != None
+            return equal if operator == "=" else not equal
+        left, right = Query.__number(value), Query.__number(expected)
+        if left is None or right is None:
+            left, right = str(value), str(expected)
+        if operator == "<":
+            return left < right
+        if operator == "<=":
+            return left <= right
+        if operator == ">":
+            return left > right
+        return left >= right
+
+    @staticmethod
+    def __number(value):
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def matches(self, node, condition=None):
+        """
+        Test if an object fulfills the condition of this query.
+
+        :param node: Object to test
+        :type node: insalata.model.Node.Node
+        """
+        condition = self.condition if condition is None else condition
+        if condition is None:
+            return True
+        kind = condition[0]
+        if kind == "and":
+            return all(self.matches(node, c) for c in condition[1])
+        if kind == "or":
+            return any(self.matches(node, c) for c in condition[1])
+        if kind == "not":
+            return not self.matches(node, condition[1])
+
+        _, path, operator, expected = condition
+        values = self.__values(node, path)
+        if operator is None:
+            return len(values) > 0
+        if expected is None: #Comparison with null
+            return (len(values) == 0) if operator == "=" else (len(values) > 0)
+        if operator == "!=":
+            return not any(self.__compare(v, "=", expected) for v in values)
+        return any(self.__compare(v, operator, expected) for v in values)
+
+    def __seed(self, graph):
+        """
+        Get the candidate objects from the indexes of the graph.
+
+        :returns: Candidates or None if no condition can be answered by an index
+        :rtype: list
+        """
+        conditions = [self.condition] if self.condition is None or self.condition[0] != "and" else self.condition[1]
+        for condition in conditions:
+            if condition is None or condition[0] != "compare" or condition[2] != "=" or condition[3] is None:
+                continue
+            path, expected = condition[1], str(condition[3])
+            types = [TYPES.get(name.lower()) for name in path[:-1]]
+            if None in types:
+                continue
+            indexed = types[-1] if len(types) > 0 else self.type
+            seed = _lookup(graph, indexed, path[-1].lower(), expected)
+            if seed is False: #No index for this condition
+                continue
+            if seed is None:
+                return []
+            if len(types) == 0:
+                return [seed]
+
+            #Follow the path backwards from the indexed object to the queried type
+            nodes = [seed]
+            for type in reversed([self.type] + types[:-1]):
+                nodes = dict((id(n), n) for node in nodes for n in node.getAllNeighbors(type) if not n.getDeprecated()).values()
+            return list(nodes)
+        return None
+
+    def execute(self, graph, limit=None, cursor=None):
+        """
+        Run this query on a graph. The graph is locked for reading.
+
+        :param graph: Graph to query
+        :type graph: insalata.model.Graph.Graph
+
+        :param limit: (optional) Maximal number of objects returned, DEFAULT_LIMIT if not given
+        :type limit: int
+
+        :param cursor: (optional) Cursor returned with the previous page
+        :type cursor: str
+
+        :returns: Dictionary with the 'results', each with its 'type', global 'id' and public 'values', and the
+                  'cursor' of the next page, an empty string if there are no more results
+        :rtype: dict
+        """
+        limit = DEFAULT_LIMIT if limit is None else max(1, min(int(limit), MAX_LIMIT))
+        try:
+            after = tuple(json.loads(cursor)) if cursor else None
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor '{0}'.".format(cursor))
+        with graph.reading():
+            candidates = self.__seed(graph)
+            if candidates is None:
+                candidates = graph.getAllNeighbors(self.type)
+
+            keyed = list()
+            for node in candidates:
+                if node.getDeprecated():
+                    continue
+                key = (node.getGlobalID(), node.__class__.__name__)
+                if (after is None or key > after) and self.matches(node):
+                    keyed.append((key, node))
+            page = heapq.nsmallest(limit + 1, keyed, key=lambda item: item[0])
+
+            results = [{
+                "type" : key[1],
+                "id" : key[0],
+                "values" : dict((k, _marshal(v)) for k, v in node.__dict__.items() if not k.startswith("_") and v is not None)
+            } for key, node in page[:limit]]
+        return {
+            "results" : results,
+            "cursor" : json.dumps(list(page[limit - 1][0])) if len(page) > limit else ""
+        }
+
+
+@lru_cache(maxsize=None)
+def _getters(type):
+    """
+    Getters without parameters of a class by lower case name without the prefix 'get'.
+    """
+    getters = dict()
+    for name in dir(type):
+        if name.startswith("get") and len(name) > 3 and callable(getattr(type, name)):
+            code = getattr(getattr(type, name), "__code__", None)
+            if code is not None and code.co_argcount - len(getattr(type, name).__defaults__ or ()) == 1:
+                getters[name[3:].lower()] = getattr(type, name)
+    getters["id"] = type.getID
+    return getters
+
+def _lookup(graph, type, attribute, value):
+    """
+    Look up an object by an indexed attribute.
+
+    :returns: The object, None if it does not exist or False if there is no index for the attribute
+    """
+    if attribute == "id":
+        lookups = {
+            Host : graph.getHost,
+            Layer2Network : graph.getLayer2Network,
+            Layer3Network : graph.getLayer3Network,
+            Interface : graph.getInterfaceByID,
+            Layer3Address : graph.getLayer3Address
+        }
+    elif attribute == "mac":
+        lookups = { Interface : graph.getInterfaceByMac }
+    elif attribute == "address":
+        lookups = { Layer3Address : graph.getLayer3Address }
+    else:
+        return False
+    return lookups[type](value) if type in lookups else False
+
+def _marshal(value):
+    """
+    Convert a value to a type XML-RPC can send. Integers are limited to 32 bit.
+    """
+    if isinstance(value, (bool, float, str)) or (isinstance(value, int) and -2**31 <= value < 2**31):
+        return value
+    if isinstance(value, (list, set, frozenset, tuple)):
+        return sorted(str(v) for v in value)
+    return str(value)
+
+@lru_cache(maxsize=256)
+def parse(expression):
+    """
+    Parse a query. Parsed queries are cached.
+
+    :param expression: Query (See Query)
+    :type expression: str
+
+    :rtype: insalata.model.Query.Query
+    """
+    return Query(expression)
@@ -1,11 +1,11 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.Edge import Edge
 from insalata.model.Host import Host
 
 class Route(Node):
-    def __init__(self, dest, gen, gateway, interface=None, collectorName=None, timeout=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, dest, gen, gateway, interface=None, collectorName=None, timeout=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.destination = dest
         self.genmask = gen
         self.gateway = gateway
@@ -17,10 +17,13 @@ class Route(Node):
         return str(self.__hash__())
 
     def getGlobalID(self):
-        hosts = list(self.getAllNeighbors(Host))
-        if len(hosts) == 0:
+        return self.getCachedGlobalID(self.__computeGlobalID)
+
+    def __computeGlobalID(self):
+        host = self.getNeighbor(Host)
+        if host is None:
             return self.getID()
-        return hosts[0].getID() + "_" + self.getID()
+        return host.getID() + "_" + self.getID()
 
     def getDestination(self):
         return self.destination
@@ -29,13 +32,13 @@ class Route(Node):
         return self.genmask
 
     def getInterface(self):
-        interfaces = self.getAllNeighbors(type = Interface)
-        return list(interfaces)[0] if len(interfaces) > 0 else None
+        return self.getNeighbor(Interface)
 
+    @mutation
     def setInterface(self, newInterface, collectorName=None, timeout=None):
         if not newInterface:
             return
-        edges = [e for e in self.getEdges() if isinstance(e.getOther(self), Interface)]
+        edges = list(self.getEdges(Interface))
         if len(edges) > 0 and (edges[0].getOther(self) == newInterface):
             edges[0].verify(collectorName, timeout)
         else:
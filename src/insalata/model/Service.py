@@ -1,12 +1,12 @@
 from xml.etree.ElementTree import SubElement
-from insalata.model.Node import Node
+from insalata.model.Node import Node, mutation
 from insalata.model.PartOfEdge import PartOfEdge
 from insalata.model.Layer3Address import Layer3Address
 
 #represents a service
 class Service(Node):
-    def __init__(self, port, protocol, type, collectorName=None, timeout=None, address=None):
-        Node.__init__(self, collectorName=collectorName, timeout=timeout)
+    def __init__(self, port, protocol, type, collectorName=None, timeout=None, address=None, scheduler=None, statistics=None):
+        Node.__init__(self, collectorName=collectorName, timeout=timeout, scheduler=scheduler, statistics=statistics)
         self.port = port
         self.type = type
         self.protocol = protocol
@@ -16,20 +16,19 @@ class Service(Node):
             PartOfEdge(self, address, collectorName=collectorName, timeout=timeout)
 
     def getAddress(self):
-        addresses = [a for a in self.getAllNeighbors(Layer3Address)]
-        return addresses[0] if len(addresses) > 0 else None
+        return self.getNeighbor(Layer3Address)
 
+    @mutation
     def setAddress(self, address, collectorName, timeout):
         if not address:
             return
         if address != self.getAddress():
-            for edge in self.getEdges(): #Delete old edges
-                if isinstance(edge.getOther(self), Layer3Address):
-                    edge.delete(association="address", changed=self)
+            for edge in self.getEdges(Layer3Address): #Delete old edges
+                edge.delete(association="address", changed=self)
             PartOfEdge(self, address, collectorName=collectorName, timeout=timeout, association="address", changed=self)
 
         else:
-            for edge in [e for e in self.getEdges() if e.getOther(self) == address]:
+            for edge in self.getEdgesTo(address):
                 edge.verify(collectorName, timeout)
         self.verify(collectorName, timeout)
     
@@ -45,13 +44,15 @@ class Service(Node):
     def getProtocol(self):
         return self.protocol
 
+    @mutation
     def setProduct(self, product):
         if self.getProduct() != product:
             self.product = product
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "product", "value" : product })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "product", "value" : product } if self.wants("product") else None)
     def getProduct(self):
         return self.product
 
+    @mutation
     def setVersion(self, version, collectorName=None, timeout=None):
         """
         Set the service version.
@@ -67,7 +68,7 @@ class Service(Node):
         """
         if self.getVersion() != version:
             self.version = version
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "version", "value" : version })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "version", "value" : version } if self.wants("version") else None)
         self.verify(collectorName, timeout)
 
 
@@ -77,6 +78,7 @@ class Service(Node):
     def getType(self):
         return self.type if self.type else ''
 
+    @mutation
     def setType(self, value, collectorName=None, timeout=None):
         """
         Set the service type.
@@ -92,7 +94,7 @@ class Service(Node):
         """
         if self.getType() != value:
             self.type = value
-            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "type", "value" : type })
+            self.getOnChangeEvent().trigger(self, { "type" : "set", "member" : "type", "value" : type } if self.wants("type") else None)
         self.verify(collectorName, timeout)
 
     def getIp(self):
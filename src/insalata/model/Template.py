@@ -17,8 +17,7 @@ class Template(Node):
         return self.getID()
 
     def getLocation(self):
-        loc = self.getAllNeighbors(Location)
-        return list(loc)[0] if len(loc) > 0 else None
+        return self.getNeighbor(Location)
 
     def getMetadata(self):
         return self.metadata
@@ -0,0 +1,129 @@
+import threading
+
+from insalata.model.Event import Subscription
+
+KINDS = ("new", "changed", "deleted")
+
+class TopicRegistry:
+    """
+    Subscriptions to the object events of a graph filtered by object type, event kind and member.
+
+    The subscriptions matching a kind and a class are computed once and cached until the subscriptions change.
+    The graph asks the registry whether a change has any subscriber before it builds the arguments of its event.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__subscriptions = dict() #Subscription -> (types, kinds, members)
+        self.__cache = dict() #(kind, class) -> Tuple of (subscription, members) matching the kind and class
+
+    def subscribe(self, fun, types=None, kinds=None, members=None, weak=False):
+        """
+        Subscribe a handler to the events of some objects.
+
+        :param fun: Function called with the graph and the arguments of the event
+        :type fun: function reference
+
+        :param types: (optional) Classes of the objects, subclasses match as well. All objects if None
+        :type types: set
+
+        :param kinds: (optional) Kinds of the events: 'new', 'changed' or 'deleted'. All kinds if None
+        :type kinds: set
+
+        :param members: (optional) Names of the members whose changes are delivered, e.g. 'powerState'.
+                        Only restricts the 'changed' events. All members if None
+        :type members: set
+
+        :param weak: Only hold a weak reference to the handler (See insalata.model.Event.Event.subscribe)
+        :type weak: bool
+
+        :returns: Token to cancel the subscription with
+        :rtype: insalata.model.Event.Subscription
+        """
+        if kinds is not None:
+            kinds = frozenset(kinds)
+            for kind in kinds:
+                if kind not in KINDS:
+                    raise ValueError("Unknown event kind '{0}'.".format(kind))
+        types = tuple(types) if types is not None else None
+        members = frozenset(members) if members is not None else None
+
+        subscription = Subscription(self, fun, weak)
+        with self.__lock:
+            self.__subscriptions[subscription] = (types, kinds, members)
+            self.__cache = dict()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Cancel a subscription. Cancelling a subscription twice has no effect.
+
+        :param subscription: Token returned by subscribe
+        :type subscription: insalata.model.Event.Subscription
+        """
+        with self.__lock:
+            if self.__subscriptions.pop(subscription, None) is None:
+                return
+            subscription.event = None
+            subscription.handler = None
+            subscription.reference = None
+            self.__cache = dict()
+
+    def getSubscriptionCount(self):
+        return len(self.__subscriptions)
+
+    def getSubscribers(self, kind, type):
+        """
+        Get the subscriptions matching a kind of event of objects of a class.
+
+        :returns: Tuple of (subscription, members) with members being None if all members match
+        :rtype: tuple
+        """
+        cache = self.__cache
+        subscribers = cache.get((kind, type))
+        if subscribers is None:
+            with self.__lock:
+                subscribers = tuple((subscription, members) for subscription, (types, kinds, members) in self.__subscriptions.items()
+                                    if (kinds is None or kind in kinds) and (types is None or issubclass(type, types)))
+                if cache is self.__cache:
+                    cache[(kind, type)] = subscribers
+        return subscribers
+
+    def wants(self, kind, type, member=None):
+        """
+        Test if any subscription matches an event.
+
+        :param kind: Kind of the event: 'new', 'changed' or 'deleted'
+        :type kind: str
+
+        :param type: Class of the object
+        :type type: class
+
+        :param member: (optional) Changed member
+        :type member: str
+        """
+        for _, members in self.getSubscribers(kind, type):
+            if members is None or kind != "changed" or member in members:
+                return True
+        return False
+
+    def publish(self, kind, type, sender, args):
+        """
+        Deliver an event to the matching subscriptions.
+
+        :param kind: Kind of the event: 'new', 'changed' or 'deleted'
+        :type kind: str
+
+        :param type: Class of the object
+        :type type: class
+
+        :param sender: Graph triggering the event
+        :type sender: insalata.model.Graph.Graph
+
+        :param args: Arguments of the event
+        :type args: dict
+        """
+        member = args.get("member")
+        for subscription, members in self.getSubscribers(kind, type):
+            if members is None or kind != "changed" or member in members:
+                subscription(sender, args)
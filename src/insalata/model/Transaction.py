@@ -0,0 +1,147 @@
+from collections import OrderedDict
+
+class Transaction:
+    """
+    Collector scoped transaction on a graph.
+
+    Mutations inside a transaction are applied to the graph immediately, but the graph is locked
+    once for the whole transaction and all events raised by the collector thread are staged.
+    On commit the staged events are coalesced into one change set:
+        - Only the last value of a changed member is kept
+        - Adding and removing the same association cancels out
+        - Objects created and deleted inside the transaction are dropped completely
+    Mutations are not rolled back if the with block raises an exception. The partial change set is published
+    with the flag 'aborted' and the error that ended the transaction.
+
+    Usage:
+        with graph.transaction(collectorName, timeout) as transaction:
+            interface = graph.getOrCreateInterface(mac, collectorName, timeout)
+            interface.setMtu(mtu, collectorName, timeout)
+    """
+
+    def __init__(self, graph, collectorName, timeout):
+        """
+        Create a new transaction. The transaction begins when the with block is entered.
+
+        :param graph: Graph this transaction is working on
+        :type graph: insalata.model.Graph.Graph
+
+        :param collectorName: Name of the collector running this transaction
+        :type collectorName: str
+
+        :param timeout: Timeout of the collector
+        :type timeout: int
+        """
+        self.graph = graph
+        self.collectorName = collectorName
+        self.timeout = timeout
+
+        #Objects are identified by id() as the IDs of some model objects change with their values
+        self.__objects = dict() #id(object) -> Object => Keeps the identities valid during the transaction
+        self.__new = OrderedDict() #id(object) -> Arguments of the objectNewEvent
+        self.__changed = OrderedDict() #(id(object), member[, value]) -> Arguments of the objectChangedEvent
+        self.__deleted = OrderedDict() #id(object) -> Arguments of the objectDeletedEvent
+        self.__error = None #Exception that ended the with block
+
+    def __enter__(self):
+        self.graph.beginTransaction(self)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.__error = excValue
+        self.graph.commitTransaction(self)
+        return False
+
+    def getCollectorName(self):
+        return self.collectorName
+
+    def getTimeout(self):
+        return self.timeout
+
+    def __objectKey(self, obj):
+        self.__objects[id(obj)] = obj
+        return id(obj)
+
+    def addNew(self, obj, args):
+        """
+        Stage an objectNewEvent.
+
+        :param obj: The created object
+        :type obj: insalata.model.Node.Node
+
+        :param args: Arguments of the event
+        :type args: dict
+        """
+        self.__new[self.__objectKey(obj)] = dict(args)
+
+    def addChanged(self, obj, args):
+        """
+        Stage an objectChangedEvent and coalesce it with the changes staged before.
+
+        :param obj: The changed object
+        :type obj: insalata.model.Node.Node
+
+        :param args: Arguments of the event
+        :type args: dict
+        """
+        args = dict(args)
+        objectKey = self.__objectKey(obj)
+        member = args.get("member")
+
+        if args["type"] == "set":
+            key = (objectKey, member)
+            self.__changed.pop(key, None) #Move the member to the end to keep the order of the changes
+            self.__changed[key] = args
+            return
+
+        key = (objectKey, member, args.get("value"))
+        opposite = "delete" if args["type"] == "add" else "add"
+        staged = self.__changed.get(key)
+        if staged is not None and staged["type"] == opposite: #Association restored => Nothing changed
+            del self.__changed[key]
+        else:
+            self.__changed.pop(key, None)
+            self.__changed[key] = args
+
+    def addDeleted(self, obj, args):
+        """
+        Stage an objectDeletedEvent and drop all staged changes of the deleted object.
+
+        :param obj: The deleted object
+        :type obj: insalata.model.Node.Node
+
+        :param args: Arguments of the event
+        :type args: dict
+        """
+        objectKey = self.__objectKey(obj)
+        for key in [k for k in self.__changed if k[0] == objectKey]:
+            del self.__changed[key]
+        if self.__new.pop(objectKey, None) is None: #Object existed before this transaction
+            self.__deleted[objectKey] = dict(args)
+
+    def getError(self):
+        """
+        Get the exception that ended this transaction or None if it was completed.
+        """
+        return self.__error
+
+    def isEmpty(self):
+        return len(self.__new) == 0 and len(self.__changed) == 0 and len(self.__deleted) == 0
+
+    def getChangeSet(self):
+        """
+        Get the coalesced changes of this transaction.
+
+        :returns: Dictionary containing the collector, the lists 'new', 'changed' and 'deleted'
+                  with the arguments of the corresponding graph events, the flag 'aborted' if the transaction
+                  was ended by an exception and the message of this exception as 'error' (None if completed)
+        :rtype: dict
+        """
+        return {
+            "collector" : self.collectorName,
+            "aborted" : self.__error is not None,
+            "error" : None if self.__error is None else "{0}: {1}".format(type(self.__error).__name__, self.__error),
+            "new" : list(self.__new.values()),
+            "changed" : list(self.__changed.values()),
+            "deleted" : list(self.__deleted.values())
+        }
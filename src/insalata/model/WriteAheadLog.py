@@ -0,0 +1,394 @@
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import traceback
+import uuid
+import weakref
+import zlib
+from functools import partial
+
+DEFAULT_FSYNC_INTERVAL = 0.1 #Seconds between two group commits
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024 #Bytes after which a new segment is started
+DEFAULT_COMPACTION_SIZE = 64 * 1024 * 1024 #Bytes of log after which a new checkpoint replaces it
+
+MAGIC = b"INSALATA-WAL1\n" #Start of every segment
+RECORD_HEADER = struct.Struct("<II") #Length and CRC32 of a record
+SUFFIX = ".log"
+
+class WriteAheadLog:
+    """
+    Write-ahead log of the changes of a graph between two checkpoints.
+
+    Every object reported by the mutationEvent of the graph is marked as changed. Every fsyncInterval seconds the
+    changes are committed as one group: The states of all changed objects (attributes, leases and edges, see
+    insalata.model.Graph.Graph.getObjectState) and the numbers of the deleted objects are taken under the read lock,
+    appended as one record to the current segment and synced to disk. Objects changed several times in one interval
+    are written once.
+
+    Objects are identified by numbers. Checkpoints written by this log assign the numbers of their objects and a new
+    identifier. Segments carry the identifier of their checkpoint in their file name and are named
+    <checkpoint file>.<identifier>.<number>.log. A segment is closed once it exceeds segmentSize bytes.
+    If the segments of the current checkpoint exceed compactionSize bytes a new checkpoint is written and
+    the old segments are removed.
+
+    Recovery restores the checkpoint and replays the records of its segments in order. A torn record at the
+    end of a segment, e.g. after a crash while writing, ends the replay of this segment.
+    """
+
+    def __init__(self, graph, checkpointPath, fsyncInterval=DEFAULT_FSYNC_INTERVAL, segmentSize=DEFAULT_SEGMENT_SIZE,
+                 compactionSize=DEFAULT_COMPACTION_SIZE, logger=None):
+        """
+        Create a new log. Call recover to restore the graph and start to begin logging.
+
+        :param graph: Graph to log
+        :type graph: insalata.model.Graph.Graph
+
+        :param checkpointPath: Path of the checkpoint file. The segments are stored in the same directory
+        :type checkpointPath: str
+
+        :param fsyncInterval: Seconds between two group commits
+        :type fsyncInterval: float
+
+        :param segmentSize: Bytes after which a new segment is started
+        :type segmentSize: int
+
+        :param compactionSize: Bytes of all segments after which a new checkpoint is written
+        :type compactionSize: int
+
+        :param logger: (optional) Logger for errors, the logger of this module by default
+        :type logger: logging:Logger
+        """
+        self.graph = graph
+        self.checkpointPath = checkpointPath
+        self.directory = os.path.dirname(os.path.abspath(checkpointPath))
+        self.prefix = os.path.basename(checkpointPath) + "."
+        self.fsyncInterval = float(fsyncInterval)
+        self.segmentSize = int(segmentSize)
+        self.compactionSize = int(compactionSize)
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.__lock = threading.Lock() #Protects the changed objects, taken by the threads changing the graph
+        self.__writeLock = threading.RLock() #Serializes group commits and checkpoints
+        self.__changed = dict() #id(object) -> Changed object
+        self.__deleted = dict() #id(object) -> Deleted object
+        self.__mutations = 0 #Number of mutations since the last group commit
+
+        self.__numbers = { id(graph) : -1 } #id(object) -> Number in the log
+        self.__references = dict() #id(object) -> Weak reference dropping the number once the object is reclaimed
+        self.__nextNumber = 0
+
+        self.__checkpoint = None #Identifier of the checkpoint the segments belong to
+        self.__segment = None #File of the current segment
+        self.__segmentNumber = 0
+        self.__segmentBytes = 0
+        self.__logBytes = 0 #Bytes of all segments of the current checkpoint
+
+        self.__statistics = {
+            "commits" : 0,
+            "mutations" : 0,
+            "objects" : 0,
+            "bytes" : 0,
+            "syncTime" : 0,
+            "checkpoints" : 0
+        }
+
+        self.__subscription = None #Subscription to the mutation event while the log is running
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__stopped = False
+
+    def __number(self, node):
+        """
+        Get the number of an object in the log. Objects without number get the next one.
+        """
+        number = self.__numbers.get(id(node))
+        if number is None:
+            number = self.__numbers[id(node)] = self.__nextNumber
+            self.__references[id(node)] = weakref.ref(node, partial(self.__forget, id(node)))
+            self.__nextNumber += 1
+        return number
+
+    def __forget(self, key, reference):
+        """
+        Drop the number of a reclaimed object => Its id() can be used by a new object.
+        """
+        if self.__references.get(key) is reference:
+            self.__numbers.pop(key, None)
+            self.__references.pop(key, None)
+
+    def __onMutation(self, sender, args):
+        with self.__lock:
+            if args["kind"] == "deleted":
+                self.__changed.pop(id(sender), None)
+                self.__deleted[id(sender)] = sender
+            else:
+                self.__changed[id(sender)] = sender
+            self.__mutations += 1
+
+    def __segmentPaths(self, checkpoint):
+        """
+        Get the paths of the segments of a checkpoint in order.
+        """
+        prefix = self.prefix + str(checkpoint) + "."
+        segments = list()
+        for fileName in os.listdir(self.directory):
+            if fileName.startswith(prefix) and fileName.endswith(SUFFIX):
+                number = fileName[len(prefix):-len(SUFFIX)]
+                if number.isdigit():
+                    segments.append((int(number), os.path.join(self.directory, fileName)))
+        return [path for _, path in sorted(segments)]
+
+    @staticmethod
+    def readSegment(path):
+        """
+        Read the records of a segment. Reading stops at the first incomplete or corrupt record.
+
+        :param path: Path of the segment
+        :type path: str
+
+        :returns: Generator of the records (See flush)
+        :rtype: generator
+        """
+        with open(path, "rb") as fileHandler:
+            if fileHandler.read(len(MAGIC)) != MAGIC:
+                return
+            while True:
+                header = fileHandler.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                length, checksum = RECORD_HEADER.unpack(header)
+                data = fileHandler.read(length)
+                if len(data) < length or zlib.crc32(data) != checksum:
+                    return
+                yield pickle.loads(data)
+
+    def recover(self):
+        """
+        Restore the graph from the checkpoint and replay the records of its segments.
+        The graph has to be empty. Nothing is restored if there is no checkpoint.
+
+        :returns: Dictionary with the restored 'version', the number of replayed 'records' and 'mutations'
+                  and the 'time' in seconds or None if there is no checkpoint
+        :rtype: dict
+        """
+        if not os.path.isfile(self.checkpointPath):
+            return None
+        start = time.time()
+        with open(self.checkpointPath, "rb") as fileHandler:
+            state = pickle.load(fileHandler)
+        restored = list()
+        version = self.graph.restoreCheckpoint(state, restored)
+
+        nodes = dict(enumerate(restored)) #Number -> Object
+        numbers = dict((id(node), number) for number, node in nodes.items())
+        numbers[id(self.graph)] = -1
+        records = 0
+        mutations = 0
+        if state.get("checkpoint") is not None:
+            for path in self.__segmentPaths(state["checkpoint"]):
+                for record in self.readSegment(path):
+                    self.graph.applyObjectStates(record["objects"], record["deleted"], record["version"], nodes, numbers)
+                    version = record["version"]
+                    records += 1
+                    mutations += record["mutations"]
+        return {
+            "version" : version,
+            "records" : records,
+            "mutations" : mutations,
+            "time" : time.time() - start
+        }
+
+    def start(self):
+        """
+        Write a checkpoint of the graph and start logging its changes.
+        """
+        self.__subscription = self.graph.getMutationEvent().subscribe(self.__onMutation)
+        self.checkpoint()
+        with self.__condition:
+            self.__stopped = False
+            self.__thread = threading.Thread(target=self.__run, name="WriteAheadLog-{0}".format(self.graph.getID()))
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def stop(self):
+        """
+        Commit the pending changes, stop logging and close the current segment.
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        if self.__subscription is not None:
+            self.__subscription.cancel()
+        with self.__writeLock:
+            self.flush()
+            self.__closeSegment()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                if not self.__stopped:
+                    self.__condition.wait(self.fsyncInterval)
+                if self.__stopped:
+                    return
+            try:
+                self.flush()
+                if self.__logBytes >= self.compactionSize:
+                    self.checkpoint()
+            except Exception:
+                self.__error("Error in write-ahead log of {0}: {1}".format(self.graph.getID(), traceback.format_exc().replace("\n", "--")))
+
+    def __error(self, message):
+        self.logger.error(message)
+
+    def flush(self):
+        """
+        Commit the changes since the last commit as one record and sync it to disk.
+
+        A record is a dictionary:
+            - version   Version of the graph including the changes
+            - mutations Number of mutations contained in the record
+            - objects   List of tuples (number, object state, edge states) of the changed objects
+            - deleted   Numbers of the deleted objects
+
+        :returns: Number of mutations committed
+        :rtype: int
+        """
+        with self.__writeLock:
+            with self.graph.reading(): #No object changes while the states are taken => The states are consistent
+                with self.__lock:
+                    changed, deleted, mutations = self.__changed, self.__deleted, self.__mutations
+                    self.__changed, self.__deleted, self.__mutations = dict(), dict(), 0
+                if mutations == 0:
+                    return 0
+                record = self.__collect(changed, deleted)
+                record["mutations"] = mutations
+            self.__append(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+            self.__statistics["commits"] += 1
+            self.__statistics["mutations"] += mutations
+            self.__statistics["objects"] += len(record["objects"])
+            return mutations
+
+    def __collect(self, changed, deleted):
+        """
+        Take the states of the changed objects. The caller has to hold the read lock of the graph.
+        Objects reachable from a changed object that have no number yet, e.g. the templates of a new location,
+        are numbered and written as well.
+        """
+        graph = self.graph
+        numbers = self.__numbers
+        for node in list(changed.values()):
+            if node.getDeprecated():
+                del changed[id(node)]
+                deleted[id(node)] = node
+
+        pending = list(changed.values())
+        written = list()
+        while pending:
+            node = pending.pop()
+            self.__number(node)
+            written.append(node)
+            for neighbor in node.getAllNeighbors():
+                if id(neighbor) not in numbers and not neighbor.getDeprecated():
+                    self.__number(neighbor)
+                    pending.append(neighbor)
+
+        objects = list()
+        for node in written:
+            edgeStates = [graph.getEdgeState(edge, numbers) for edge in node.getEdges()]
+            objects.append((numbers[id(node)], graph.getObjectState(node, numbers), [e for e in edgeStates if e is not None]))
+
+        removed = list()
+        for key in deleted:
+            number = numbers.pop(key, None)
+            self.__references.pop(key, None)
+            if number is not None:
+                removed.append(number)
+
+        return {
+            "version" : graph.getVersion(),
+            "objects" : objects,
+            "deleted" : removed
+        }
+
+    def __append(self, data):
+        """
+        Append a record to the current segment and sync it. Starts a new segment if the current one is full.
+        The caller has to hold the write lock.
+        """
+        if self.__segment is None or self.__segmentBytes >= self.segmentSize:
+            self.__closeSegment()
+            self.__segmentNumber += 1
+            path = os.path.join(self.directory, "{0}{1}.{2:06d}{3}".format(self.prefix, self.__checkpoint, self.__segmentNumber, SUFFIX))
+            self.__segment = open(path, "ab")
+            self.__segment.write(MAGIC)
+            self.__segmentBytes = len(MAGIC)
+
+        self.__segment.write(RECORD_HEADER.pack(len(data), zlib.crc32(data)) + data)
+        self.__segment.flush()
+        start = time.monotonic()
+        os.fsync(self.__segment.fileno())
+        self.__statistics["syncTime"] += time.monotonic() - start
+
+        size = RECORD_HEADER.size + len(data)
+        self.__segmentBytes += size
+        self.__logBytes += size
+        self.__statistics["bytes"] += size
+
+    def __closeSegment(self):
+        if self.__segment is not None:
+            self.__segment.close()
+            self.__segment = None
+
+    def checkpoint(self):
+        """
+        Write a new checkpoint of the graph and remove the segments of the previous one.
+
+        The objects are numbered in the order of the checkpoint. No record is committed until the checkpoint
+        file is replaced => After a crash the previous checkpoint and its segments are still complete.
+
+        :returns: Version of the graph contained in the checkpoint
+        :rtype: int
+        """
+        with self.__writeLock:
+            self.flush()
+            nodes = list()
+            with self.graph.reading():
+                state = self.graph.getCheckpoint(nodes)
+                state["checkpoint"] = uuid.uuid4().hex
+                self.__numbers = dict((id(node), number) for number, node in enumerate(nodes))
+                self.__numbers[id(self.graph)] = -1
+                self.__references = dict((id(node), weakref.ref(node, partial(self.__forget, id(node)))) for node in nodes)
+                self.__nextNumber = len(nodes)
+            version = self.graph.saveCheckpoint(self.checkpointPath, state)
+
+            self.__closeSegment()
+            self.__checkpoint = state["checkpoint"]
+            self.__segmentNumber = 0
+            self.__logBytes = 0
+            self.__statistics["checkpoints"] += 1
+
+            for fileName in os.listdir(self.directory):
+                if fileName.startswith(self.prefix) and fileName.endswith(SUFFIX) and not fileName.startswith(self.prefix + self.__checkpoint + "."):
+                    try:
+                        os.remove(os.path.join(self.directory, fileName))
+                    except OSError as e:
+                        self.__error("Cannot remove segment {0}: {1}".format(fileName, e))
+            return version
+
+    def getStatistics(self):
+        """
+        Get the counters of this log.
+
+        :returns: Number of group commits, committed mutations and written object states, written bytes,
+                  time in seconds spent in fsync, number of checkpoints and the bytes of the current segments
+        :rtype: dict
+        """
+        with self.__writeLock:
+            statistics = dict(self.__statistics)
+            statistics["logBytes"] = self.__logBytes
+            return statistics
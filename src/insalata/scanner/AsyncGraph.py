@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+from functools import partial
+
+#Methods of the graph binding the graph lock or a transaction to the calling thread
+THREAD_BOUND = frozenset(("reading", "writing", "transaction", "beginTransaction", "commitTransaction"))
+
+#Thread pool executing the blocking calls of the current asynchronous run. Set by the CollectorExecutor for its runs,
+#the default executor of the running loop is used if None
+blockingExecutor = contextvars.ContextVar("blockingExecutor", default=None)
+
+def runBlocking(fun, *args, **kwargs):
+    """
+    Execute a blocking function in a thread of the blocking executor of the current run (See blockingExecutor).
+    The function runs in a copy of the current context => Its changes of the graph are counted for the collector.
+
+    :param fun: Function to execute
+    :type fun: function reference
+
+    :returns: Awaitable result of the function
+    :rtype: asyncio.Future
+    """
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(blockingExecutor.get(), partial(context.run, fun, *args, **kwargs))
+
+class AsyncGraph:
+    """
+    Graph as seen by asynchronous collectors.
+
+    The graph lock is reentrant per thread and transactions are stored per thread. All tasks of the event loop
+    share its thread => Two interleaved tasks would share the lock and the transaction of each other and a task
+    waiting for the lock would block the whole loop. Every method of the graph is therefore executed in a thread of
+    the blocking executor of the collectors and returns an awaitable. Methods of the objects of the graph are executed with call, transactions
+    with inTransaction. The lock and transactions can not be held across an await.
+
+    Usage:
+        host = await graph.getOrCreateHost(id, collectorName, timeout)
+        await graph.call(host.setCPUs, cpus, collectorName, timeout)
+        await graph.inTransaction(collectorName, timeout, update, hosts)
+    """
+
+    def __init__(self, graph):
+        """
+        Create a new facade.
+
+        :param graph: Graph of the environment
+        :type graph: insalata.model.Graph.Graph
+        """
+        self.graph = graph
+
+    def __getattr__(self, name):
+        if name in THREAD_BOUND:
+            raise AttributeError("{0} binds the graph to the calling thread, use call or inTransaction.".format(name))
+        attribute = getattr(self.graph, name)
+        return partial(self.call, attribute) if callable(attribute) else attribute
+
+    def call(self, fun, *args, **kwargs):
+        """
+        Execute a function accessing the graph or its objects in a thread of the blocking executor.
+
+        :param fun: Function to execute, e.g. a setter of a host
+        :type fun: function reference
+
+        :returns: Awaitable result of the function
+        :rtype: asyncio.Future
+        """
+        return runBlocking(fun, *args, **kwargs)
+
+    def inTransaction(self, collectorName, timeout, fun, *args, **kwargs):
+        """
+        Execute a function in one transaction of the graph (See insalata.model.Graph.Graph.transaction).
+        The whole transaction is executed by one thread of the blocking executor.
+
+        :param collectorName: Name of the collector running the transaction
+        :type collectorName: str
+
+        :param timeout: Timeout of the collector
+        :type timeout: int
+
+        :param fun: Function changing the graph
+        :type fun: function reference
+
+        :returns: Awaitable result of the function
+        :rtype: asyncio.Future
+        """
+        return runBlocking(self.__transaction, collectorName, timeout, fun, args, kwargs)
+
+    def __transaction(self, collectorName, timeout, fun, args, kwargs):
+        with self.graph.transaction(collectorName, timeout):
+            return fun(*args, **kwargs)
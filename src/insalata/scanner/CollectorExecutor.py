@@ -0,0 +1,325 @@
+import asyncio
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from insalata.scanner import AsyncGraph
+
+DEFAULT_SIZE = 4 #Threads executing the collectors of one environment
+DEFAULT_LIMIT = 1 #Runs of one collector executed at the same time
+DEFAULT_BLOCKING_SIZE = 8 #Threads executing the blocking calls of the asynchronous collectors of one environment
+
+class CollectorExecutor:
+    """
+    Bounded pool of threads executing the collector runs of one environment.
+
+    Submitted runs wait in one queue in the order they are submitted. A thread takes the first run whose collector
+    has less running runs than its limit => A slow collector does not block the others and never occupies more
+    threads than allowed. The threads are started once instead of one thread for every run.
+
+    Runs of asynchronous collectors are scheduled on one event loop of the executor and do not occupy a thread while
+    they wait => They can wait for many hosts concurrently. The loop and its thread are started with the first
+    asynchronous run. Stopping an asynchronous run cancels it. Their blocking calls, including all calls of the graph
+    (See insalata.scanner.AsyncGraph.runBlocking), are executed by a dedicated pool of blockingSize threads
+    => They neither compete with other users of the default executor of the loop nor grow it.
+
+    The time a run waits in the queue, its execution time and the total run time are recorded for every collector.
+    """
+
+    def __init__(self, name, size=DEFAULT_SIZE, logger=None, onFinished=None, blockingSize=DEFAULT_BLOCKING_SIZE):
+        """
+        Create a new executor and start its threads.
+
+        :param name: Name of the environment. Used for the threads
+        :type name: str
+
+        :param size: Number of threads
+        :type size: int
+
+        :param logger: (optional) Logger for errors of the finished callbacks
+        :type logger: logging:Logger
+
+        :param onFinished: (optional) Function called without arguments after every run, also stopped ones
+        :type onFinished: function reference
+
+        :param blockingSize: (optional) Number of threads executing the blocking calls of asynchronous collectors
+        :type blockingSize: int
+        """
+        self.name = name
+        self.size = max(1, int(size))
+        self.logger = logger
+        self.onFinished = onFinished
+        self.blockingSize = max(1, int(blockingSize))
+
+        self.__pending = deque() #Submitted runs: (worker, submit time)
+        self.__running = dict() #Worker executed by a thread or the event loop -> Task of an asynchronous run
+        self.__limits = dict() #Collector -> Maximum number of runs executed at the same time
+        self.__collectors = dict() #Collector -> Counters of its runs
+        self.__condition = threading.Condition()
+        self.__stopped = False
+        self.__loop = None #Event loop of the asynchronous collectors
+        self.__loopThread = None
+        self.__blocking = None #Thread pool of the blocking calls of the asynchronous collectors, started with the loop
+
+        self.__submitted = 0
+        self.__discarded = 0
+        self.__maxPending = 0
+
+        self.__threads = list()
+        for i in range(self.size):
+            thread = threading.Thread(target=self.__run, name="CollectorExecutor-{0}-{1}".format(name, i))
+            thread.daemon = True
+            thread.start()
+            self.__threads.append(thread)
+
+    def setLimit(self, collector, limit):
+        """
+        Set the number of runs of a collector executed at the same time.
+
+        :param collector: Name of the collector
+        :type collector: str
+
+        :param limit: Maximum number of concurrent runs, at least 1
+        :type limit: int
+        """
+        with self.__condition:
+            self.__limits[collector] = max(1, int(limit))
+            self.__condition.notify_all()
+
+    def submit(self, worker):
+        """
+        Queue a run of a collector.
+
+        :param worker: Run to execute
+        :type worker: insalata.scanner.Worker.Worker
+
+        :returns: False if the executor is stopped
+        :rtype: bool
+        """
+        with self.__condition:
+            if self.__stopped:
+                return False
+            self.__pending.append((worker, time.monotonic()))
+            self.__counters(worker.CMName)["pending"] += 1
+            self.__submitted += 1
+            if len(self.__pending) > self.__maxPending:
+                self.__maxPending = len(self.__pending)
+            self.__condition.notify()
+            return True
+
+    def canAccept(self, collector):
+        """
+        Test if a run of a collector submitted now would not wait for its limit.
+
+        :param collector: Name of the collector
+        :type collector: str
+        """
+        with self.__condition:
+            counters = self.__collectors.get(collector)
+            if counters is None:
+                return True
+            return counters["running"] + counters["pending"] < self.__limits.get(collector, DEFAULT_LIMIT)
+
+    def __counters(self, collector):
+        counters = self.__collectors.get(collector)
+        if counters is None:
+            counters = self.__collectors[collector] = {
+                "runs" : 0, "running" : 0, "pending" : 0,
+                "queueTime" : 0.0, "maxQueueTime" : 0.0,
+                "executionTime" : 0.0, "maxExecutionTime" : 0.0,
+                "runTime" : 0.0, "maxRunTime" : 0.0
+            }
+        return counters
+
+    def __next(self):
+        """
+        Remove the first pending run whose collector is below its limit from the queue.
+        """
+        for i, (worker, submitted) in enumerate(self.__pending):
+            counters = self.__counters(worker.CMName)
+            if counters["running"] < self.__limits.get(worker.CMName, DEFAULT_LIMIT):
+                del self.__pending[i]
+                counters["pending"] -= 1
+                counters["running"] += 1
+                return worker, submitted
+        return None
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                entry = None
+                while not self.__stopped:
+                    entry = self.__next()
+                    if entry is not None:
+                        break
+                    self.__condition.wait()
+                if entry is None:
+                    return
+                worker, submitted = entry
+                self.__running[worker] = None
+
+            started = time.monotonic()
+            if worker.asynchronous:
+                self.__getLoop().call_soon_threadsafe(self.__startTask, worker, submitted, started)
+                continue
+
+            try:
+                worker.run()
+            except Exception as e: #Errors of the collector are handled by the worker, this is the finished callback
+                self.__logError(worker, e)
+            self.__finished(worker, submitted, started)
+
+    def __getLoop(self):
+        with self.__condition:
+            if self.__loop is None:
+                self.__blocking = ThreadPoolExecutor(self.blockingSize, "CollectorBlocking-{0}".format(self.name))
+                self.__loop = asyncio.new_event_loop()
+                self.__loopThread = threading.Thread(target=self.__loop.run_forever, name="CollectorLoop-{0}".format(self.name))
+                self.__loopThread.daemon = True
+                self.__loopThread.start()
+            return self.__loop
+
+    def __startTask(self, worker, submitted, started):
+        """
+        Start an asynchronous run on the event loop.
+        """
+        AsyncGraph.blockingExecutor.set(self.__blocking) #Copied into the context of the task
+        task = asyncio.ensure_future(worker.runAsync())
+        task.add_done_callback(partial(self.__finished, worker, submitted, started))
+        with self.__condition:
+            if worker in self.__running:
+                self.__running[worker] = task
+            if worker.stopRequested(): #Stopped before the task was known
+                task.cancel()
+
+    def __logError(self, worker, error):
+        if self.logger is not None:
+            self.logger.error("Error after collector {0} finished: {1}".format(worker.CMName, "".join(traceback.format_exception(type(error), error, error.__traceback__)).replace("\n", "--")))
+
+    def __finished(self, worker, submitted, started, task=None):
+        """
+        Record a finished run.
+        """
+        if task is not None and not task.cancelled() and task.exception() is not None:
+            self.__logError(worker, task.exception())
+        finished = time.monotonic()
+
+        with self.__condition:
+            self.__running.pop(worker, None)
+            counters = self.__counters(worker.CMName)
+            counters["running"] -= 1
+            counters["runs"] += 1
+            for key, duration in (("queueTime", started - submitted), ("executionTime", finished - started), ("runTime", finished - submitted)):
+                counters[key] += duration
+                maxKey = "max" + key[0].upper() + key[1:]
+                if duration > counters[maxKey]:
+                    counters[maxKey] = duration
+            self.__condition.notify_all()
+
+        if self.onFinished is not None:
+            self.onFinished()
+
+    def drain(self, stop=False, timeout=None):
+        """
+        Wait until no run is pending or executed.
+
+        :param stop: Discard the pending runs and request the running collectors to stop instead of finishing them.
+                     The finished callbacks of stopped runs are not called, asynchronous runs are cancelled
+        :type stop: bool
+
+        :param timeout: (optional) Maximum time in seconds to wait
+        :type timeout: float
+
+        :returns: True if the executor is idle, False if the timeout elapsed
+        :rtype: bool
+        """
+        discarded = 0
+        with self.__condition:
+            if stop:
+                discarded = len(self.__pending)
+                while self.__pending:
+                    worker, _ = self.__pending.popleft()
+                    worker.stop()
+                    self.__counters(worker.CMName)["pending"] -= 1
+                self.__discarded += discarded
+                for worker, task in self.__running.items():
+                    worker.stop()
+                    if task is not None:
+                        self.__loop.call_soon_threadsafe(task.cancel)
+        if discarded > 0 and self.onFinished is not None: #Discarded runs free their collectors as well
+            self.onFinished()
+        with self.__condition:
+            return self.__condition.wait_for(lambda: not self.__running and (stop or not self.__pending), timeout)
+
+    def stop(self, timeout=None):
+        """
+        Stop the running collectors, discard the pending runs and stop the threads of this executor.
+
+        :param timeout: (optional) Maximum time in seconds to wait for the running collectors
+        :type timeout: float
+        """
+        self.drain(True, timeout)
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        for thread in self.__threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        with self.__condition:
+            loop, self.__loop = self.__loop, None
+            blocking, self.__blocking = self.__blocking, None
+        if blocking is not None:
+            blocking.shutdown(wait=False) #Threads of runBlocking end with their current call
+        if loop is not None and self.__loopThread is not threading.current_thread():
+            if hasattr(loop, "shutdown_default_executor"): #Python 3.9+, older versions leave the threads to the interpreter exit
+                try:
+                    asyncio.run_coroutine_threadsafe(loop.shutdown_default_executor(), loop).result(timeout) #Threads of the finished callbacks
+                except Exception as e:
+                    if self.logger is not None:
+                        self.logger.warning("Threads of asynchronous collectors of {0} not stopped: {1}".format(self.name, e))
+            loop.call_soon_threadsafe(loop.stop)
+            self.__loopThread.join(timeout)
+            if not self.__loopThread.is_alive():
+                loop.close()
+
+    def getRunningCount(self):
+        return len(self.__running)
+
+    def getStatistics(self):
+        """
+        Get the counters of this executor.
+
+        :returns: Dictionary with the number of threads, of running and pending runs, the maximal queue length,
+                  the number of submitted and discarded runs and for each collector its limit, the number of finished,
+                  running and pending runs and the average and maximal queue, execution and run time in seconds
+        :rtype: dict
+        """
+        with self.__condition:
+            collectors = dict()
+            for collector, counters in self.__collectors.items():
+                runs = counters["runs"]
+                collectors[collector] = {
+                    "limit" : self.__limits.get(collector, DEFAULT_LIMIT),
+                    "runs" : runs,
+                    "running" : counters["running"],
+                    "pending" : counters["pending"],
+                    "queueTime" : counters["queueTime"] / runs if runs else 0.0,
+                    "maxQueueTime" : counters["maxQueueTime"],
+                    "executionTime" : counters["executionTime"] / runs if runs else 0.0,
+                    "maxExecutionTime" : counters["maxExecutionTime"],
+                    "runTime" : counters["runTime"] / runs if runs else 0.0,
+                    "maxRunTime" : counters["maxRunTime"]
+                }
+            return {
+                "size" : self.size,
+                "blockingSize" : self.blockingSize,
+                "running" : len(self.__running),
+                "pending" : len(self.__pending),
+                "maxPending" : self.__maxPending,
+                "submitted" : self.__submitted,
+                "discarded" : self.__discarded,
+                "collectors" : collectors
+            }
@@ -1,19 +1,35 @@
+import asyncio
 import threading
 import sys
 import traceback
 
-class Worker(threading.Thread):
-    def __init__(self, target, collectorModuleName, finishedCallback, logger):
-        threading.Thread.__init__(self)
+from insalata.model.Graph import currentCollector
+from insalata.scanner import AsyncGraph
+
+class Worker:
+    """
+    One run of a collector module. The run is executed by a thread of the CollectorExecutor of the environment.
+    The collector receives the worker to check if it shall stop.
 
+    Collectors defined as 'async def scan(graph, connectionInfo, logger, ctx)' are executed on the event loop of the
+    executor instead. They receive the worker as ctx and are cancelled if they are stopped.
+    Asynchronous collectors must not call the graph or its objects directly: The graph lock and transactions are
+    bound to threads and all tasks of the loop share one thread. They receive the graph wrapped in an
+    insalata.scanner.AsyncGraph.AsyncGraph, which executes every call in a thread of the blocking executor of the
+    CollectorExecutor. The finished callback of an asynchronous run is executed in a thread of the default executor of the loop.
+
+    The changes of the graph made during the run are counted for the collector (See insalata.model.Graph.currentCollector).
+    """
+    def __init__(self, target, collectorModuleName, finishedCallback, logger):
         self.__stopEvent = threading.Event()
         self.target = target
         self.finishedCallback = finishedCallback
         self.logger = logger
         self.CMName = collectorModuleName
-        self.setDaemon(True)
+        self.asynchronous = asyncio.iscoroutinefunction(getattr(target, "func", target)) #Collectors are bound with functools.partial
 
     def run(self):
+        token = currentCollector.set(self.CMName)
         try:
             self.target(self)
         except KeyError as e:
@@ -21,10 +37,43 @@ class Worker(threading.Thread):
         except Exception as e:
             self.logger.error("Error while executing scan!")
             self.logger.error("{0}: {1}".format(type(e), traceback.format_exc().replace("\n", "--")))
+        finally:
+            currentCollector.reset(token)
 
         if not self.__stopEvent.isSet():
             self.finishedCallback(self)
 
+    async def runAsync(self):
+        """
+        Execute an asynchronous collector on the running event loop.
+        """
+        currentCollector.set(self.CMName) #Every task runs in its own context
+        try:
+            await self.target(self)
+        except asyncio.CancelledError: #Stopped => The executor records the cancelled task
+            raise
+        except KeyError as e:
+            self.logger.error("Missing key '{0}' in configuration file for module {1}.".format(e.args[0], self.CMName))
+        except Exception as e:
+            self.logger.error("Error while executing scan!")
+            self.logger.error("{0}: {1}".format(type(e), traceback.format_exc().replace("\n", "--")))
+
+        if not self.__stopEvent.isSet(): #The callback walks the graph => Not on the loop and not counted for the collector
+            await asyncio.get_running_loop().run_in_executor(None, self.finishedCallback, self)
+
+    def runBlocking(self, fun, *args, **kwargs):
+        """
+        Execute a blocking function, e.g. of a synchronous client library, in a thread of the blocking executor.
+        Only usable by asynchronous collectors. Changes of the graph made by the function are counted for the collector.
+
+        :param fun: Function to execute
+        :type fun: function reference
+
+        :returns: Awaitable result of the function
+        :rtype: asyncio.Future
+        """
+        return AsyncGraph.runBlocking(fun, *args, **kwargs)
+
     def stop(self):
         self.__stopEvent.set()
 
@@ -38,7 +38,7 @@ def scan(graph, connectionInfo, logger, thread):
         currentNetworks.add(l2network.getID())
         l2network.verify(name, timeout)
 
-        interfaces = [a.getInterface() for a in graph.getAllNeighbors(Layer3Address) if a.getNetwork() == l3network]
+        interfaces = [a.getInterface() for a in graph.getNetworkMembers(l3network)]
         for interface in interfaces:
             if not interface:
                 continue
@@ -45,11 +45,10 @@ def scan(graph, connectionInfo, logger, thread):
     for hostName in connectionInfo['hosts']:
         logger.debug("Executing Nmap on network component: '{}'".format(hostName))
         if hostName != "localhost":
-            scanHost = [h for h in graph.getAllNeighbors(Host) if h.getID() == hostName] #Host executing nmap
-            if len(scanHost) == 0: # Error handling if nmap host not in graph
+            host = graph.getHost(hostName) #Host executing nmap
+            if host is None: # Error handling if nmap host not in graph
                 logger.error("No host object found for hostname {0}. Nmap scan failed!".format(hostName))
                 continue
-            host = scanHost[0]
 
             if not ((host.getPowerState() is None) or (host.getPowerState() == 'Running')):
                 logger.error("Host {0} is not running. Skipping nmap scan")
@@ -94,7 +93,7 @@ def scan(graph, connectionInfo, logger, thread):
                         continue
                     address = addrXml.attrib["addr"]
                     logger.debug("Found entry for address {0} in nmap scan.".format(address))
-                    addressNode = getAddressNode(networkNode, address)
+                    addressNode = getAddressNode(graph, networkNode, address)
                     if addressNode is None:
                         addressNode = graph.getOrCreateLayer3Address(address, name, timeout)
 
@@ -127,15 +126,19 @@ def scan(graph, connectionInfo, logger, thread):
 
                     addressNode.verify(name, timeout)
 
-                for host in [h for h in graph.getAllNeighbors(Host) if h.getID() == hostName.split(".")[0]]:
-                    host.verify(name, timeout)
+                scannedHost = graph.getHost(hostName.split(".")[0])
+                if scannedHost is not None:
+                    scannedHost.verify(name, timeout)
         base.releaseSSHConnection(ssh)
 
 
-def getAddressNode(network, address):
+def getAddressNode(graph, network, address):
     """
     Get the Layer3Address node of a host that has the igven address.
     
+    :param graph: Data Interface object for this scanner
+    :type graph: :class: `Graph`
+
     :param network: Hostnames the host could have -> Nmap scan
     :type network: Layer3Network
 
@@ -146,7 +149,7 @@ def getAddressNode(network, address):
     :rtype: Layer3Address
     """
 
-    addresses = [a for a in network.getAllNeighbors(Layer3Address) if a.getID() == address]
-    if len(addresses) == 0:
+    addressNode = graph.getLayer3Address(address)
+    if addressNode is None or addressNode.getNetwork() is not network:
         return None
-    return addresses[0]
\ No newline at end of file
+    return addressNode
\ No newline at end of file
@@ -48,70 +48,71 @@ def scan(graph, connectionInfo, logger, thread):
         if not ansible:
             continue
 
-        #get Information
-        for intf in interfaceInformation:
-            if intf['type'] == 'loopback' or intf['mac'] != "00:00:00:00:00:00":
-                continue
-            interface = graph.getOrCreateInterface(intf['mac'], name, timeout)
-            interface.verify(name, timeout)
-            host.addInterface(interface, name, timeout)
-            #interface = [interface for interface in hostInterfaces if interface.getMAC() == intf['mac']] #Get the right host interface
-            #if len(interface) == 0:
-            #    continue
-            #interface = interface[0]
-
-            try:
-                interface.setMtu(intf['mtu'], name, timeout)
-                interface.setRate(int(intf['speed']) * 1000, name, timeout)
-            except:
-                pass #Normal case on virtual interfaces
-
-            if 'type' in intf:
-                if intf['type'] == 'manual' or intf['type'] == 'static':
-                    staticInterface = True
-                else:
-                    staticInterface = False
-
-
-            ansibleIntf = "ansible_" + intf['name'].replace("-", "_")
-            if 'ipv4' not in ansible['ansible_facts'][ansibleIntf].keys():
-                continue
-            stillExistingAddresses = set() # Set of still existing addresses on this host (insalata.model.Layer3Address)
-            if isinstance(ansible['ansible_facts'][ansibleIntf]['ipv4'], list):
-                addressesElements = list(ansible['ansible_facts'][ansibleIntf]['ipv4'])
-            else: # Single dict
-                addressesElements = [ansible['ansible_facts'][ansibleIntf]['ipv4']]
-            for addressEl in addressesElements:
-                netmask = None
+        #get Information => Apply the changes of this host as one transaction
+        with graph.transaction(name, timeout):
+            for intf in interfaceInformation:
+                if intf['type'] == 'loopback' or intf['mac'] != "00:00:00:00:00:00":
+                    continue
+                interface = graph.getOrCreateInterface(intf['mac'], name, timeout)
+                interface.verify(name, timeout)
+                host.addInterface(interface, name, timeout)
+                #interface = [interface for interface in hostInterfaces if interface.getMAC() == intf['mac']] #Get the right host interface
+                #if len(interface) == 0:
+                #    continue
+                #interface = interface[0]
+
                 try:
-                    interfaceAddress = addressEl['address']
-                    netmask = addressEl['netmask']
-                except KeyError as e:
-                    logger.error("Ansible was not able to detect the {0} on interface {1}".format(e.args[0], intf['name']))
+                    interface.setMtu(intf['mtu'], name, timeout)
+                    interface.setRate(int(intf['speed']) * 1000, name, timeout)
+                except:
+                    pass #Normal case on virtual interfaces
+
+                if 'type' in intf:
+                    if intf['type'] == 'manual' or intf['type'] == 'static':
+                        staticInterface = True
+                    else:
+                        staticInterface = False
+
+
+                ansibleIntf = "ansible_" + intf['name'].replace("-", "_")
+                if 'ipv4' not in ansible['ansible_facts'][ansibleIntf].keys():
                     continue
-                gateway = intf['gateway'] if "gateway" in list(intf.keys()) else None
-                address = graph.getOrCreateLayer3Address(interfaceAddress, name, timeout, netmask=netmask, gateway=gateway)
-                address.setStatic(staticInterface)
-                address.verify(name, timeout)
-                interface.addAddress(address)
-                stillExistingAddresses.add(address)
-
-            # Remove old addresses
-            for old_adr_edge in [e for e in interface.getEdges() if isinstance(e.getOther(interface), Layer3Address) and e.getOther(interface) not in stillExistingAddresses]:
-                logger.critical(str(type(old_adr_edge)))
-                logger.critical(old_adr_edge.getOther(interface).getID())
-                old_adr_edge.removeVerification(name, timeout)
-                old_adr_edge.getOther(interface).removeVerification(name, timeout)
-
-
-            # At the end: Create Layer3networks
-            for address in stillExistingAddresses:
-                netmask = address.getNetmask()
-                if not netmask: # we are not able to determine the network address if no netmask is set => Take /32
-                    netmask = "255.255.255.255"
-                netAddress = ipAddressHelper.getNetAddress(address.getID(), netmask)
-                l3network = graph.getOrCreateLayer3Network(netAddress + "/" + str(ipAddressHelper.getPrefix(netmask)), name, timeout, netAddress, netmask)
-                l3network.verify(name, timeout)
-                address.setNetwork(l3network)
+                stillExistingAddresses = set() # Set of still existing addresses on this host (insalata.model.Layer3Address)
+                if isinstance(ansible['ansible_facts'][ansibleIntf]['ipv4'], list):
+                    addressesElements = list(ansible['ansible_facts'][ansibleIntf]['ipv4'])
+                else: # Single dict
+                    addressesElements = [ansible['ansible_facts'][ansibleIntf]['ipv4']]
+                for addressEl in addressesElements:
+                    netmask = None
+                    try:
+                        interfaceAddress = addressEl['address']
+                        netmask = addressEl['netmask']
+                    except KeyError as e:
+                        logger.error("Ansible was not able to detect the {0} on interface {1}".format(e.args[0], intf['name']))
+                        continue
+                    gateway = intf['gateway'] if "gateway" in list(intf.keys()) else None
+                    address = graph.getOrCreateLayer3Address(interfaceAddress, name, timeout, netmask=netmask, gateway=gateway)
+                    address.setStatic(staticInterface)
+                    address.verify(name, timeout)
+                    interface.addAddress(address)
+                    stillExistingAddresses.add(address)
+
+                # Remove old addresses
+                for old_adr_edge in [e for e in interface.getEdges(Layer3Address) if e.getOther(interface) not in stillExistingAddresses]:
+                    logger.critical(str(type(old_adr_edge)))
+                    logger.critical(old_adr_edge.getOther(interface).getID())
+                    old_adr_edge.removeVerification(name)
+                    old_adr_edge.getOther(interface).removeVerification(name)
+
+
+                # At the end: Create Layer3networks
+                for address in stillExistingAddresses:
+                    netmask = address.getNetmask()
+                    if not netmask: # we are not able to determine the network address if no netmask is set => Take /32
+                        netmask = "255.255.255.255"
+                    netAddress = ipAddressHelper.getNetAddress(address.getID(), netmask)
+                    l3network = graph.getOrCreateLayer3Network(netAddress + "/" + str(ipAddressHelper.getPrefix(netmask)), name, timeout, netAddress, netmask)
+                    l3network.verify(name, timeout)
+                    address.setNetwork(l3network)
 
         base.releaseSSHConnection(ssh)
\ No newline at end of file
@@ -68,12 +68,9 @@ def scan(graph, connectionInfo, logger, thread):
                     continue
                 mac = answer[1]._value
                 mac = ":".join([format(c, "x").zfill(2) for c in mac])
-                interfaces = [i for i in graph.getAllNeighbors(Interface) if i.getMAC() == mac]
-                if len(interfaces) == 0:
+                interface = graph.getInterfaceByMac(mac)
+                if interface is None:
                     logger.error("No suitable interface found for mac '{0}' on host {1}; Collector: {2}.".format(mac, host.getID(), name))
-                    interface = None
-                else:
-                    interface = interfaces[0]
 
                 answer = SnmpWrapper.checkReturnSnmp(request.getValue(SnmpWrapper.Values["netmask"], identifier), host, name, user, logger)
                 if not answer:
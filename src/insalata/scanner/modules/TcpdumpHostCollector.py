@@ -61,7 +61,7 @@ def scan(graph, connectionInfo, logger, thread):
 
         # We only want to add the address as a host to the graph if no l3address with the ID already exists
         # This would lead to an incorrect graph state, as one host is represented multiple times
-        if len([a for a in graph.getAllNeighbors(Layer3Address) if a.getID() == src]) == 0:
+        if graph.getLayer3Address(src) is None:
             host = graph.getOrCreateHost(src, name, timeout, location=location)
             host.setLocation(location)
             logger.debug("Tcpdump: Added host to graph: {}".format(host.getID()))
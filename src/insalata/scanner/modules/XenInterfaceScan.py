@@ -94,7 +94,7 @@ def scan(graph, connectionInfo, logger, thread):
         stillExistingHostInterfaces = hostInterfacesOnServer
         for interface in currentHostInterfaces:
             if not interface.getMAC() in hostInterfacesOnServer:
-                for edge in [e for e in host.getEdges() if e.getOther(host) == interface]:
+                for edge in host.getEdgesTo(interface):
                     edge.removeVerification(name)
 
         for mac in stillExistingHostInterfaces:
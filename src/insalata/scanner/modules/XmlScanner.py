@@ -152,12 +152,10 @@ def readInterfaces(graph, interfacesXml, host, logger, name, timeout, readElemen
             logger.warning("No network attribute found for interface '{0}'.".format(ifaceXml.attrib["mac"]))
             continue
 
-        network = [n for n in graph.getAllNeighbors(Layer2Network) if n.getID() == ifaceXml.attrib["network"]]
-        if len(network) == 0:
+        network = graph.getLayer2Network(ifaceXml.attrib["network"])
+        if network is None:
             logger.warning("No suitable network found for interface '{0}'.".format(ifaceXml.attrib["mac"]))
             continue
-        else:
-            network = network[0]
 
         interface = graph.getOrCreateInterface(ifaceXml.attrib["mac"], name, timeout, network=network)
         readElements.add(interface)
@@ -203,13 +201,11 @@ def readLayer3Addresses(graph, layer3AddressesXml, interface, logger, name, time
     for addressXml in layer3AddressesXml:
         network = None
         if "network" in addressXml.attrib: 
-            network = [n for n in graph.getAllNeighbors(Layer3Network) if n.getID() == addressXml.attrib["network"]]
-            if len(network) == 0:
+            network = graph.getLayer3Network(addressXml.attrib["network"])
+            if network is None:
                 logger.warning("No suitable network found for {0}.".format(addressXml.attrib["network"]))
-                network = None
                 netmask = None
             else:
-                network = network[0]
                 netmask = network.getNetmask() if not "netmask" in addressXml.attrib else addressXml.attrib["netmask"]
 
             gateway = None if not "gateway" in addressXml.attrib else addressXml.attrib["gateway"]
@@ -328,11 +324,9 @@ def readRoutes(graph, routingXml, host, logger, name, timeout, readElements):
         for routeXml in routingXml:
             interface = None
             if "interface" in routeXml.attrib:
-                interface = [i for i in graph.getAllNeighbors(Interface) if i.getID() == routeXml.attrib["interface"]]
-                if len(interface) == 0:
+                interface = graph.getInterfaceByID(routeXml.attrib["interface"])
+                if interface is None:
                     logger.debug("No interface found found for route. Interface: {0}.".format(routeXml.attrib["interface"]))
-                else:
-                    interface = interface[0]
 
             route = graph.getOrCreateRoute(name, timeout, host, routeXml.attrib["destination"], routeXml.attrib["genmask"], routeXml.attrib["gateway"], interface)
             host.addRoute(route, name, timeout)
@@ -368,17 +362,13 @@ def readFirewallRules(graph, rulesXml, host, logger, name, timeout, readElements
     if not rulesXml:
         return
     for ruleXml in rulesXml:
-        interface = [i for i in graph.getAllNeighbors(Interface) if "inInterface" in ruleXml.attrib and i.getID() == ruleXml.attrib["inInterface"]]
-        inInterface = interface[0] if len(interface) > 0 else None
+        inInterface = graph.getInterfaceByID(ruleXml.attrib["inInterface"]) if "inInterface" in ruleXml.attrib else None
 
     if rulesXml:
         logger.debug("Reading all firewall rules from XML for host {0}.".format(host.getID()))
         for ruleXml in rulesXml:
-            interface = [i for i in graph.getAllNeighbors(Interface) if "inInterface" in ruleXml.attrib and i.getID() == ruleXml.attrib["inInterface"]]
-            inInterface = interface[0] if len(interface) > 0 else None
-
-            interface = [i for i in graph.getAllNeighbors(Interface) if "outInterface" in ruleXml.attrib and i.getID() == ruleXml.attrib["outInterface"]]
-            outInterface = interface[0] if len(interface) > 0 else None
+            inInterface = graph.getInterfaceByID(ruleXml.attrib["inInterface"]) if "inInterface" in ruleXml.attrib else None
+            outInterface = graph.getInterfaceByID(ruleXml.attrib["outInterface"]) if "outInterface" in ruleXml.attrib else None
 
             srcnet = destnet = srcports = destports = protocol = None
             if "chain" in ruleXml.attrib:
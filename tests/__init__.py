@@ -0,0 +1,9 @@
+"""
+Tests of INSALATA. Run them from the root of the repository:
+
+    python -m unittest
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
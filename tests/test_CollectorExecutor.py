@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import threading
+import time
+import unittest
+
+from insalata.model.Graph import Graph
+from insalata.scanner.AsyncGraph import AsyncGraph
+from insalata.scanner.CollectorExecutor import CollectorExecutor
+from insalata.scanner.Worker import Worker
+
+TIMEOUT = 20
+HOSTS = 50
+
+def mac(collector, i):
+    return "00:16:3e:{0:02x}:{1:02x}:{2:02x}".format(collector, i >> 8 & 255, i & 255)
+
+class CollectorExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph("async")
+        self.executor = CollectorExecutor("async", 2)
+        self.logger = logging.getLogger("test")
+        self.finished = dict() #Collector -> Thread executing the finished callback
+        self.changeSets = list()
+        self.graph.getChangeSetEvent().add(lambda sender, changeSet: self.changeSets.append(changeSet))
+
+    def tearDown(self):
+        self.executor.stop(TIMEOUT)
+        self.graph.stop()
+
+    def submit(self, name, scan):
+        self.executor.setLimit(name, 1)
+        def finished(worker):
+            self.finished[worker.CMName] = threading.current_thread()
+        async def run(ctx):
+            await scan(AsyncGraph(self.graph), name, ctx)
+        self.executor.submit(Worker(run, name, finished, self.logger))
+
+    async def collect(self, graph, name, ctx):
+        number = int(name[-1])
+        for i in range(HOSTS):
+            host = await graph.getOrCreateHost("{0}-host{1}".format(name, i), name, 600)
+            await graph.call(host.setCPUs, number, name, 600)
+            await asyncio.sleep(0) #Let the other collector interleave
+            interfaces = [mac(number, 2 * i), mac(number, 2 * i + 1)]
+            await graph.inTransaction(name, 600, self.addInterfaces, host, interfaces, name)
+
+    def addInterfaces(self, host, macs, name):
+        for address in macs:
+            host.addInterface(self.graph.getOrCreateInterface(address, name, 600), name, 600)
+
+    def testConcurrentAsyncCollectorsMutatingTheGraph(self):
+        self.submit("collector1", self.collect)
+        self.submit("collector2", self.collect)
+        self.assertTrue(self.executor.drain(timeout=TIMEOUT))
+
+        for name, number in (("collector1", 1), ("collector2", 2)):
+            for i in range(HOSTS):
+                host = self.graph.getHost("{0}-host{1}".format(name, i))
+                self.assertIsNotNone(host)
+                self.assertEqual(host.getCPUs(), number)
+                self.assertEqual(sorted(interface.getMAC() for interface in host.getInterfaces()), [mac(number, 2 * i), mac(number, 2 * i + 1)])
+            self.assertGreater(self.graph.getChangeCount(name), 0)
+            self.assertNotEqual(self.finished[name].name, "CollectorLoop-async") #Finished callback not on the loop
+
+        #Every transaction is published on its own and only contains the changes of its collector
+        self.assertEqual(len(self.changeSets), 2 * HOSTS)
+        for changeSet in self.changeSets:
+            number = int(changeSet["collector"][-1])
+            macs = sorted(args["values"]["mac"] for args in changeSet["new"])
+            self.assertEqual(len(macs), 2)
+            self.assertEqual(macs[0][:11], mac(number, 0)[:11])
+            self.assertEqual(macs[1][:11], mac(number, 0)[:11])
+
+    def testLoopRunsWhileTheGraphIsLocked(self):
+        ticks = [0]
+        async def tick(graph, name, ctx):
+            while not ctx.stopRequested():
+                ticks[0] += 1
+                await asyncio.sleep(0.01)
+        async def wait(graph, name, ctx):
+            await graph.getOrCreateHost("host", name, 600) #Waits for the lock in a thread of the loop
+
+        self.submit("ticker", tick)
+        time.sleep(0.1)
+        with self.graph.writing():
+            self.submit("waiter", wait)
+            time.sleep(0.1)
+            before = ticks[0]
+            time.sleep(0.5)
+            self.assertGreater(ticks[0] - before, 10)
+        self.assertFalse(self.executor.drain(timeout=0.5)) #The ticker is still running
+        self.assertIsNotNone(self.graph.getHost("host"))
+
+    def testBlockingCallsUseTheDedicatedExecutor(self):
+        threads = list()
+        async def block(graph, name, ctx):
+            threads.append(await ctx.runBlocking(lambda: threading.current_thread().name))
+            await graph.getOrCreateHost("host", name, 600)
+            threads.append(await graph.call(lambda: threading.current_thread().name))
+
+        self.submit("blocking", block)
+        self.assertTrue(self.executor.drain(timeout=TIMEOUT))
+        self.assertEqual(len(threads), 2)
+        for name in threads:
+            self.assertTrue(name.startswith("CollectorBlocking-async"), name)
+        self.assertEqual(self.executor.getStatistics()["blockingSize"], 8)
+
+    def testStoppedRunIsCancelled(self):
+        started = threading.Event()
+        async def sleep(graph, name, ctx):
+            started.set()
+            await asyncio.sleep(TIMEOUT)
+
+        self.submit("sleeper", sleep)
+        self.assertTrue(started.wait(TIMEOUT))
+        self.assertTrue(self.executor.drain(True, TIMEOUT))
+        self.assertNotIn("sleeper", self.finished) #No finished callback for a stopped run
+        self.assertEqual(self.executor.getStatistics()["collectors"]["sleeper"]["runs"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
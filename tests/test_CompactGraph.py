@@ -0,0 +1,79 @@
+import unittest
+
+from insalata.model.Edge import EDGE, PART_OF, CONTAINS
+from insalata.model.Graph import Graph
+
+class CompactGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph("graph")
+        location = self.graph.getOrCreateLocation("location", "collector", 600)
+        hosts = [self.graph.getOrCreateHost("host{0}".format(i), "collector", 600, location) for i in range(2)]
+        interfaces = [self.graph.getOrCreateInterface("00:16:3e:00:00:0{0}".format(i), "collector", 600) for i in range(2)]
+        for host, interface in zip(hosts, interfaces):
+            host.addInterface(interface, "collector", 600)
+        network = self.graph.getOrCreateLayer2Network("network", "collector", 600, location)
+        interfaces[0].setNetwork(network, "collector", 600)
+        self.graph.getOrCreateLayer3Address("10.0.0.1", "collector", 600) #Not connected to any other object
+
+        self.compact = self.graph.compact()
+        self.location = self.compact.getIndex("Location", "location")
+        self.hosts = [self.compact.getIndex("Host", "host{0}".format(i)) for i in range(2)]
+        self.interfaces = [self.compact.getIndex("Interface", "enx00163e00000{0}".format(i)) for i in range(2)]
+        self.network = self.compact.getIndex("Layer2Network", "network")
+        self.address = self.compact.getIndex("Layer3Address", "10.0.0.1")
+
+    def tearDown(self):
+        self.graph.stop()
+
+    def neighbors(self, node, kind=None):
+        start, end = self.compact.indptr[node], self.compact.indptr[node + 1]
+        return set(n for n, k in zip(self.compact.indices[start:end], self.compact.edgeKinds[start:end]) if kind is None or k == kind)
+
+    def testRowsMatchTheGraph(self):
+        self.assertEqual(self.compact.getNodeCount(), 7)
+        self.assertEqual(self.compact.getEdgeCount(), 6) #Edges to the root are not contained
+        self.assertEqual(self.compact.getVersion(), self.graph.getVersion())
+        self.assertEqual(self.compact.getType(self.hosts[0]), "Host")
+        self.assertEqual(self.compact.getID(self.network), "network")
+        self.assertIsNone(self.compact.getIndex("Host", "unknown"))
+
+        self.assertEqual(set(self.compact.getNeighbors(self.hosts[0])), {self.location, self.interfaces[0]})
+        self.assertEqual(self.neighbors(self.hosts[0], CONTAINS), {self.interfaces[0]})
+        self.assertEqual(self.neighbors(self.interfaces[0], PART_OF), {self.hosts[0]})
+        self.assertEqual(self.neighbors(self.interfaces[0], EDGE), {self.network})
+        self.assertEqual(self.compact.getDegree(self.location), 3)
+        self.assertEqual(self.compact.getDegree(self.address), 0)
+        self.assertEqual(list(self.compact.getDegrees()), [self.compact.getDegree(n) for n in range(7)])
+
+    def testDegreeStatistics(self):
+        statistics = self.compact.getDegreeStatistics()
+        self.assertEqual(statistics["Host"], { "count" : 2, "min" : 2, "max" : 2, "mean" : 2 })
+        self.assertEqual(statistics["Interface"], { "count" : 2, "min" : 1, "max" : 2, "mean" : 1.5 })
+
+    def testTraversal(self):
+        depths = dict(self.compact.traverse(self.hosts[0]))
+        self.assertEqual(depths[self.hosts[0]], 0)
+        self.assertEqual(depths[self.location], 1)
+        self.assertEqual(depths[self.hosts[1]], 2)
+        self.assertEqual(depths[self.interfaces[1]], 3)
+        self.assertNotIn(self.address, depths)
+
+        self.assertEqual(set(self.compact.getReachable(self.hosts[0], maxDepth=1)), {self.hosts[0], self.location, self.interfaces[0]})
+        self.assertEqual(set(self.compact.getReachable(self.location, types=["Host"])), {self.location, self.hosts[0], self.hosts[1]})
+        self.assertEqual(set(self.compact.getReachable(self.hosts[0], edgeKinds=[CONTAINS])), {self.hosts[0], self.interfaces[0]})
+
+    def testConnectedComponents(self):
+        components, labels = self.compact.getConnectedComponents()
+        self.assertEqual(components, 2)
+        self.assertEqual(len(set(labels[n] for n in self.hosts + self.interfaces + [self.location, self.network])), 1)
+        self.assertNotEqual(labels[self.address], labels[self.location])
+        self.assertEqual(self.compact.getComponentSizes(), [6, 1])
+
+    def testArraysAreNotChangedByTheGraph(self):
+        self.graph.getOrCreateHost("host2", "collector", 600)
+        self.assertEqual(self.compact.getNodeCount(), 7)
+        self.assertEqual(self.graph.compact().getNodeCount(), 8)
+
+if __name__ == '__main__':
+    unittest.main()
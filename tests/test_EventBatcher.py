@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+
+from insalata.model.Event import Event
+from insalata.model.EventBatcher import EventBatcher
+from insalata.model.EventDispatcher import BLOCK, DROP_OLDEST, COALESCE
+
+TIMEOUT = 20
+
+def change(value, member="cpu"):
+    return {"objectType" : "Host", "object" : "host", "type" : "set", "member" : member, "value" : value}
+
+class EventBatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = [Event(), Event(), Event()]
+        self.gate = threading.Event()
+        self.batches = list()
+
+    def batcher(self, queueSize, policy, holdsLock=None):
+        batcher = EventBatcher("test", *self.events, maxSize=100, window=0, queueSize=queueSize, policy=policy, holdsLock=holdsLock)
+        def handler(sender, batch):
+            self.gate.wait(TIMEOUT)
+            self.batches.append([args["value"] for _, args in batch["events"]])
+        batcher.getBatchEvent().add(handler)
+        return batcher
+
+    def block(self, batcher):
+        """
+        Deliver a first batch whose handler waits for the gate => The following events stay in the buffer.
+        """
+        self.events[2].trigger(None, change(-1))
+        deadline = time.monotonic() + TIMEOUT
+        while batcher.getStatistics()["depth"] > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def testDropOldestBoundsTheBuffer(self):
+        batcher = self.batcher(3, DROP_OLDEST)
+        self.block(batcher)
+        for value in range(5):
+            self.events[2].trigger(None, change(value))
+        statistics = batcher.getStatistics()
+        self.assertEqual(statistics["depth"], 3)
+        self.assertEqual(statistics["dropped"], 2)
+
+        self.gate.set()
+        batcher.stop(TIMEOUT)
+        self.assertEqual(self.batches, [[-1], [2, 3, 4]])
+        self.assertEqual(batcher.getStatistics()["delivered"], 4)
+
+    def testCoalesceOnlyWhenFull(self):
+        batcher = self.batcher(2, COALESCE)
+        self.block(batcher)
+        self.events[2].trigger(None, change(0))
+        self.events[2].trigger(None, change(1, "memory"))
+        self.events[2].trigger(None, change(2)) #Full => Replaces the pending change of the cpu
+        self.assertEqual(batcher.getStatistics()["coalesced"], 1)
+
+        self.gate.set()
+        batcher.stop(TIMEOUT)
+        self.assertEqual(self.batches, [[-1], [2, 1]])
+
+    def testBlockDoesNotBlockTheLockHolder(self):
+        batcher = self.batcher(1, BLOCK, holdsLock=lambda: True)
+        self.block(batcher)
+        for value in range(3): #Would wait forever without holdsLock
+            self.events[2].trigger(None, change(value))
+        self.assertEqual(batcher.getStatistics()["overflowed"], 2)
+
+        self.gate.set()
+        batcher.stop(TIMEOUT)
+        self.assertEqual(self.batches, [[-1], [0, 1, 2]])
+
+    def testUnknownPolicy(self):
+        with self.assertRaises(ValueError):
+            EventBatcher("test", *self.events, policy="unknown")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+
+from insalata.model.Graph import Graph
+from insalata.model.EventDispatcher import EventDispatcher, BLOCK, COALESCE
+
+TIMEOUT = 20
+
+def change(value, member="cpu"):
+    return {"objectType" : "Host", "object" : "host", "type" : "set", "member" : member, "value" : value}
+
+class EventDispatcherTest(unittest.TestCase):
+
+    def testCoalesceOnlyWhenFull(self):
+        gate = threading.Event()
+        delivered = list()
+        def handler(sender, args):
+            gate.wait(TIMEOUT)
+            delivered.append(args["value"])
+
+        dispatcher = EventDispatcher("coalesce", 3, COALESCE)
+        dispatcher.put(handler, None, change(0)) #Taken by the delivery thread, which waits for the gate
+        time.sleep(0.1)
+        dispatcher.put(handler, None, change(1))
+        dispatcher.put(handler, None, change(2)) #Room left => Queued although the first one has the same key
+        self.assertEqual(dispatcher.getStatistics()["coalesced"], 0)
+        dispatcher.put(handler, None, change(3, "memory"))
+        dispatcher.put(handler, None, change(4)) #Full => Replaces the newest pending change of the cpu
+        statistics = dispatcher.getStatistics()
+        self.assertEqual(statistics["coalesced"], 1)
+        self.assertEqual(statistics["dropped"], 0)
+        self.assertEqual(statistics["depth"], 3)
+
+        gate.set()
+        dispatcher.stop(TIMEOUT)
+        self.assertEqual(delivered, [0, 1, 4, 3])
+
+    def testBlockWithHandlerReadingTheGraph(self):
+        graph = Graph("dispatch")
+        dispatcher = EventDispatcher("block", 2, BLOCK, holdsLock=graph.holdsLock)
+        delivered = list()
+        def handler(sender, args):
+            with graph.reading():
+                delivered.append(len(graph.getHosts()))
+            time.sleep(0.005)
+        dispatcher.wrap(graph.getObjectNewEvent()).add(handler)
+
+        def collect():
+            location = graph.getOrCreateLocation("location", "test", 600)
+            for i in range(20): #Events triggered under the write lock of the graph
+                graph.getOrCreateHost("host{0}".format(i), "test", 600, location)
+            with graph.transaction("test", 600): #Events published after the lock is released
+                for i in range(20, 40):
+                    graph.getOrCreateHost("host{0}".format(i), "test", 600, location)
+
+        collector = threading.Thread(target=collect)
+        collector.daemon = True
+        collector.start()
+        collector.join(TIMEOUT)
+        self.assertFalse(collector.is_alive(), "Collector deadlocked with the delivery thread")
+
+        dispatcher.stop(TIMEOUT)
+        graph.stop()
+        statistics = dispatcher.getStatistics()
+        self.assertEqual(statistics["delivered"], 41)
+        self.assertEqual(statistics["dropped"], 0)
+        self.assertGreater(statistics["overflowed"] + statistics["blocked"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
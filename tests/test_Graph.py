@@ -0,0 +1,241 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from insalata.model.Edge import CONTAINS
+from insalata.model.Graph import Graph
+from insalata.model.Host import Host
+
+TIMEOUT = 20
+
+class GraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph("graph")
+
+    def tearDown(self):
+        self.graph.stop()
+
+    def testUpsertReturnsTheIndexedObject(self):
+        location = self.graph.getOrCreateLocation("Location", "collector", 600)
+        host = self.graph.getOrCreateHost("host", "collector", 600, location)
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        address = self.graph.getOrCreateLayer3Address("10.0.0.1", "collector", 600)
+
+        self.assertIs(self.graph.getOrCreateHost("host", "other", 600, location), host)
+        self.assertIs(self.graph.getOrCreateInterface("00:16:3e:00:00:01", "other", 600), interface)
+        self.assertIs(self.graph.getOrCreateLayer3Address("10.0.0.1", "other", 600), address)
+        self.assertIs(self.graph.getOrCreateLocation("location", "other", 600), location) #Locations ignore the case
+        self.assertIs(self.graph.getHost("host"), host)
+        self.assertIs(self.graph.getInterfaceByMac("00:16:3e:00:00:01"), interface)
+        self.assertIs(self.graph.getLayer3Address("10.0.0.1"), address)
+        self.assertEqual(set(host.getScanners().keys()), {"collector", "other"})
+        self.assertEqual(len(self.graph.getHosts()), 1)
+
+    def testDeletedObjectsLeaveTheIndex(self):
+        host = self.graph.getOrCreateHost("host", "collector", 600)
+        host.delete()
+        self.assertIsNone(self.graph.getHost("host"))
+
+        created = self.graph.getOrCreateHost("host", "collector", 600)
+        self.assertIsNot(created, host)
+        self.assertIs(self.graph.getHost("host"), created)
+
+    def testRoutesAreKeyedByTheirHost(self):
+        first = self.graph.getOrCreateHost("first", "collector", 600)
+        second = self.graph.getOrCreateHost("second", "collector", 600)
+        routes = list()
+        for host in (first, second):
+            route = self.graph.getOrCreateRoute("collector", 600, host, "0.0.0.0", "0.0.0.0", "10.0.0.254")
+            host.addRoute(route, "collector", 600)
+            routes.append(route)
+
+        self.assertIsNot(routes[0], routes[1])
+        self.assertIs(self.graph.getOrCreateRoute("collector", 600, first, "0.0.0.0", "0.0.0.0", "10.0.0.254"), routes[0])
+        self.assertIs(self.graph.getRoute(second, "0.0.0.0", "0.0.0.0", "10.0.0.254"), routes[1])
+        self.assertIsNone(self.graph.getRoute(first, "10.0.0.0", "255.0.0.0", "10.0.0.254"))
+
+    def testFirewallRulesAreKeyedByTheirHost(self):
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        hosts = [self.graph.getOrCreateHost("host{0}".format(i), "collector", 600) for i in range(2)]
+        rules = list()
+        for host in hosts:
+            rule = self.graph.getOrCreateFirewallRule("collector", 600, host, "INPUT", "ACCEPT", "tcp", inInterface=interface)
+            host.addFirewallRule(rule, "collector", 600)
+            rules.append(rule)
+
+        self.assertIsNot(rules[0], rules[1])
+        for host, rule in zip(hosts, rules):
+            self.assertIs(self.graph.getOrCreateFirewallRule("collector", 600, host, "INPUT", "ACCEPT", "tcp", inInterface=interface), rule)
+        self.assertIsNone(self.graph.getFirewallRule(hosts[0], "INPUT", "DROP", "tcp", inInterface=interface))
+
+    def testSecondaryIndexes(self):
+        location = self.graph.getOrCreateLocation("location", "collector", 600)
+        l2network = self.graph.getOrCreateLayer2Network("l2network", "collector", 600, location)
+        l3network = self.graph.getOrCreateLayer3Network("l3network", "collector", 600, "10.0.0.0", "255.255.255.0")
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+
+        self.assertIs(self.graph.getLayer2Network("l2network"), l2network)
+        self.assertIs(self.graph.getLayer3Network("l3network"), l3network)
+        self.assertIs(self.graph.getInterfaceByID("enx00163e000001"), interface)
+        self.assertIsNone(self.graph.getLayer2Network("l3network")) #Indexes are kept per type
+
+        interface.delete()
+        self.assertIsNone(self.graph.getInterfaceByID("enx00163e000001"))
+        self.assertIsNone(self.graph.getInterfaceByMac("00:16:3e:00:00:01"))
+
+    def testRoutesLeaveTheHostIndex(self):
+        host = self.graph.getOrCreateHost("host", "collector", 600)
+        route = self.graph.getOrCreateRoute("collector", 600, host, "0.0.0.0", "0.0.0.0", "10.0.0.254")
+        self.assertIsNone(self.graph.getRoute(host, "0.0.0.0", "0.0.0.0", "10.0.0.254")) #Not yet added to the host
+        host.addRoute(route, "collector", 600)
+        self.assertIs(self.graph.getRoute(host, "0.0.0.0", "0.0.0.0", "10.0.0.254"), route)
+
+        route.delete()
+        self.assertIsNone(self.graph.getRoute(host, "0.0.0.0", "0.0.0.0", "10.0.0.254"))
+        created = self.graph.getOrCreateRoute("collector", 600, host, "0.0.0.0", "0.0.0.0", "10.0.0.254")
+        self.assertIsNot(created, route)
+
+    def testFrozenGraphKeepsItsVerifications(self):
+        host = self.graph.getOrCreateHost("host", "collector", 0.3)
+        self.graph.freeze()
+        remaining = host.getScanners()["collector"].getRemaining()
+        time.sleep(0.6)
+        self.assertIs(self.graph.getHost("host"), host)
+        self.assertFalse(host.getDeprecated())
+        self.assertEqual(host.getScanners()["collector"].getRemaining(), remaining)
+
+        self.graph.melt()
+        deadline = time.monotonic() + TIMEOUT
+        while not host.getDeprecated() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(host.getDeprecated())
+        self.assertIsNone(self.graph.getHost("host"))
+
+    def testSettersWaitForReaders(self):
+        host = self.graph.getOrCreateHost("host", "collector", 600)
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        done = threading.Event()
+        def change():
+            host.setCPUs(4, "collector", 600)
+            host.addInterface(interface, "collector", 600)
+            done.set()
+
+        with self.graph.reading():
+            writer = threading.Thread(target=change)
+            writer.daemon = True
+            writer.start()
+            self.assertFalse(done.wait(0.3))
+            self.assertIsNone(host.getCPUs())
+            self.assertEqual(host.getInterfaces(), frozenset())
+        self.assertTrue(done.wait(TIMEOUT))
+        self.assertEqual(host.getCPUs(), 4)
+        self.assertEqual(host.getInterfaces(), frozenset([interface]))
+        self.assertGreater(self.graph.getLockStatistics()["contendedWrites"], 0)
+
+    def testSnapshotsAreReadOnly(self):
+        host = self.graph.getOrCreateHost("host", "collector", 600)
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        snapshot = self.graph.snapshot()
+        self.assertIs(self.graph.snapshot(), snapshot) #Shared at the same version
+        copied = snapshot.getHost("host")
+        self.assertIsNot(copied, host)
+
+        with self.assertRaises(RuntimeError):
+            copied.setCPUs(4, "collector", 600)
+        with self.assertRaises(RuntimeError):
+            copied.addInterface(snapshot.getInterfaceByMac("00:16:3e:00:00:01"), "collector", 600)
+        with self.assertRaises(RuntimeError):
+            copied.delete()
+        with self.assertRaises(RuntimeError):
+            snapshot.getOrCreateHost("other", "collector", 600)
+        self.assertIsNone(copied.getCPUs())
+        self.assertFalse(copied.getDeprecated())
+
+        host.setCPUs(4, "collector", 600) #The graph itself stays writable
+        self.assertIsNone(copied.getCPUs())
+        copy = self.graph.copy()
+        copy.getHost("host").setCPUs(2)
+        self.assertEqual(host.getCPUs(), 4)
+
+    def testBreadthFirstTraversal(self):
+        location = self.graph.getOrCreateLocation("location", "collector", 600)
+        hosts = [self.graph.getOrCreateHost("host{0}".format(i), "collector", 600, location) for i in range(2)]
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        hosts[0].addInterface(interface, "collector", 600)
+
+        depths = dict((node.getID(), depth) for node, depth in self.graph.traverse(hosts[0]))
+        self.assertEqual(depths, {"host0" : 0, "location" : 1, interface.getID() : 1, "host1" : 2}) #The root is not entered
+        self.assertEqual([node for node, _ in self.graph.traverse(hosts[0], edgeKinds=[CONTAINS])], [hosts[0], interface])
+        self.assertEqual(set(node for node, _ in self.graph.traverse(location, types=[Host])), {location, hosts[0], hosts[1]})
+        self.assertEqual(set(node for node, _ in self.graph.traverse(hosts, maxDepth=0)), set(hosts))
+        self.assertEqual(len(list(self.graph.traverse())), 4) #Every object once
+
+    def testCheckpointRoundTrip(self):
+        location = self.graph.getOrCreateLocation("location", "collector", 600)
+        host = self.graph.getOrCreateHost("host", "collector", 600, location)
+        host.setCPUs(4, "collector", 600)
+        network = self.graph.getOrCreateLayer2Network("network", "collector", 600, location)
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        interface.setNetwork(network, "collector", 600)
+        host.addInterface(interface, "collector", 600)
+        address = self.graph.getOrCreateLayer3Address("10.0.0.1", "collector", 600)
+        interface.addAddress(address, "collector", 600)
+        route = self.graph.getOrCreateRoute("collector", 600, host, "0.0.0.0", "0.0.0.0", "10.0.0.254")
+        host.addRoute(route, "collector", 600)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint")
+            version = self.graph.saveCheckpoint(path)
+            self.assertEqual(os.listdir(directory), ["checkpoint"]) #No temporary file is left
+            restored = Graph("graph")
+            try:
+                self.assertEqual(restored.loadCheckpoint(path), version)
+                self.assertEqual(restored.getVersion(), version)
+
+                copied = restored.getHost("host")
+                self.assertEqual(copied.getCPUs(), 4)
+                self.assertEqual(copied.getLocation().getID(), "location")
+                self.assertEqual([i.getMAC() for i in copied.getInterfaces()], ["00:16:3e:00:00:01"])
+                self.assertIs(restored.getInterfaceByMac("00:16:3e:00:00:01").getNetwork(), restored.getLayer2Network("network"))
+                self.assertEqual([a.getID() for a in restored.getInterfaceByMac("00:16:3e:00:00:01").getAddresses()], ["10.0.0.1"])
+                self.assertIsNotNone(restored.getRoute(copied, "0.0.0.0", "0.0.0.0", "10.0.0.254"))
+                self.assertEqual(len(list(restored.traverse())), len(list(self.graph.traverse())))
+                self.assertAlmostEqual(copied.getScanners()["collector"].getRemaining(), 600, delta=5) #Leases keep their remaining time
+
+                self.assertIs(restored.getOrCreateHost("host", "collector", 600), copied) #The indexes are rebuilt
+                with self.assertRaises(RuntimeError): #Only into an empty graph
+                    restored.loadCheckpoint(path)
+            finally:
+                restored.stop()
+
+    def testCheckpointFormatIsChecked(self):
+        state = self.graph.getCheckpoint()
+        state["format"] = -1
+        with self.assertRaises(ValueError):
+            self.graph.restoreCheckpoint(state)
+
+    def testExtendOnlyRecordedVerifications(self):
+        old = self.graph.getOrCreateHost("old", "collector", 10) #Renewed before the run
+        self.graph.recordVerifications("collector")
+        since = self.graph.getScheduler().now()
+        hosts = [self.graph.getOrCreateHost("host{0}".format(i), "collector", 10) for i in range(5)]
+        other = self.graph.getOrCreateHost("other", "other", 10)
+
+        self.assertEqual(self.graph.extendVerifications("collector", 100, since), len(hosts))
+        self.assertEqual(self.graph.extendVerifications("collector", 100, since), 0) #The record was taken
+        for host in hosts:
+            self.assertGreater(host.getScanners()["collector"].getRemaining(), 100)
+        self.assertLessEqual(old.getScanners()["collector"].getRemaining(), 10)
+        self.assertLessEqual(other.getScanners()["other"].getRemaining(), 10)
+
+    def testVerificationsAreOnlyRecordedOnRequest(self):
+        since = self.graph.getScheduler().now()
+        host = self.graph.getOrCreateHost("host", "collector", 10)
+        self.assertEqual(self.graph.extendVerifications("collector", 100, since), 0)
+        self.assertLessEqual(host.getScanners()["collector"].getRemaining(), 10)
+
+if __name__ == '__main__':
+    unittest.main()
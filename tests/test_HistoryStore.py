@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+
+from insalata.model.Graph import Graph
+from insalata.model.HistoryStore import HistoryStore
+
+TIMEOUT = 20
+
+def waitFor(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class HistoryStoreTest(unittest.TestCase):
+
+    def testStateAt(self):
+        graph = Graph("history")
+        history = HistoryStore(graph, keyframeInterval=10)
+        host = graph.getOrCreateHost("host", "test", 600)
+        for cpus in range(1, 50):
+            host.setCPUs(cpus, "test", 600)
+            if cpus == 20:
+                time.sleep(0.01)
+                middle = time.time()
+                time.sleep(0.01)
+
+        _, values = history.getStateAt(middle)[("Host", "host")]
+        self.assertEqual(values["cpu"], 20)
+        _, values = history.getStateAt(time.time())[("Host", "host")]
+        self.assertEqual(values["cpu"], 49)
+        history.stop()
+        graph.stop()
+
+    def testInternTableIsPruned(self):
+        graph = Graph("history")
+        history = HistoryStore(graph, keyframeInterval=10, retention=0)
+        host = graph.getOrCreateHost("host", "test", 600)
+        for cpus in range(1, 5000): #Every value is interned once and dropped with its records
+            host.setCPUs(cpus, "test", 600)
+        self.assertTrue(waitFor(lambda: history.getCodeCount() < 100))
+
+        _, values = history.getStateAt(time.time())[("Host", "host")]
+        self.assertEqual(values["cpu"], 4999)
+        history.stop()
+        graph.stop()
+
+    def testStateAtWhileRecordsAreDropped(self):
+        graph = Graph("history")
+        history = HistoryStore(graph, keyframeInterval=10, retention=0)
+        host = graph.getOrCreateHost("host", "test", 600)
+        host.setCPUs(1, "test", 600)
+        stopped = threading.Event()
+        def change():
+            cpus = 1
+            while not stopped.is_set():
+                cpus += 1
+                host.setCPUs(cpus, "test", 600)
+        collector = threading.Thread(target=change)
+        collector.daemon = True
+        collector.start()
+
+        try:
+            for i in range(200): #Replayed outside the lock while the keyframe thread drops records and frees codes
+                _, values = history.getStateAt(time.time())[("Host", "host")]
+                self.assertIsInstance(values["cpu"], int)
+        finally:
+            stopped.set()
+            collector.join(TIMEOUT)
+        history.stop()
+        graph.stop()
+
+    def testKeyframesAreNotTakenByTheGraphEvents(self):
+        graph = Graph("history")
+        history = HistoryStore(graph, keyframeInterval=1)
+        host = graph.getOrCreateHost("host", "test", 600)
+        threads = set()
+        original = history._HistoryStore__copyState
+        def copyState(state):
+            threads.add(threading.current_thread())
+            return original(state)
+        history._HistoryStore__copyState = copyState
+
+        for cpus in range(1, 20):
+            host.setCPUs(cpus, "test", 600)
+        self.assertTrue(waitFor(lambda: len(threads) > 0))
+        self.assertNotIn(threading.current_thread(), threads)
+        history.stop()
+        graph.stop()
+
+if __name__ == '__main__':
+    unittest.main()
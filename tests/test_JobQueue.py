@@ -0,0 +1,62 @@
+import queue
+import threading
+import unittest
+
+from insalata.JobQueue import JobQueue
+
+TIMEOUT = 20
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = JobQueue()
+
+    def testOneTimeJobKeepsTheInterval(self):
+        self.assertTrue(self.queue.put("xen", 5, 10))
+        self.assertFalse(self.queue.put("xen", 0, -1))
+        self.assertEqual(self.queue.get(0), (0, 10, "xen"))
+
+    def testPeriodicJobReplacesAOneTimeJob(self):
+        self.queue.put("xen", 0, -1)
+        self.queue.put("xen", 5, 10)
+        self.assertEqual(self.queue.get(0), (0, 10, "xen"))
+
+    def testCoalescedJobKeepsItsPosition(self):
+        self.queue.put("first", 5, 10)
+        self.queue.put("second", 5, 10)
+        self.queue.put("first", 5, 20)
+        self.assertEqual(self.queue.getDepth(), 2)
+        self.assertEqual(self.queue.get(0), (5, 10, "first"))
+        self.assertEqual(self.queue.get(0), (5, 10, "second"))
+
+        statistics = self.queue.getStatistics()
+        self.assertEqual(statistics["enqueued"], 2)
+        self.assertEqual(statistics["coalesced"], 1)
+        self.assertEqual(statistics["upgraded"], 0)
+        self.assertEqual(statistics["maxDepth"], 2)
+
+    def testPriorityOrder(self):
+        self.queue.put("low", 5, 10)
+        self.queue.put("high", 1, 10)
+        self.queue.put("low", 0, 10) #Upgraded
+        self.assertEqual([self.queue.get(0)[2] for _ in range(2)], ["low", "high"])
+        self.assertEqual(self.queue.getStatistics()["upgraded"], 1)
+
+    def testReadyFilter(self):
+        self.queue.put("busy", 1, 10)
+        self.queue.put("idle", 5, 10)
+        self.assertEqual(self.queue.get(0, lambda name: name != "busy")[2], "idle")
+        with self.assertRaises(queue.Empty):
+            self.queue.get(0.05, lambda name: name != "busy")
+        self.assertEqual(self.queue.getStatistics()["pending"], ["busy"])
+
+    def testGetWaitsForAJob(self):
+        timer = threading.Timer(0.05, self.queue.put, ["xen", 5, 10])
+        timer.start()
+        try:
+            self.assertEqual(self.queue.get(TIMEOUT), (5, 10, "xen"))
+        finally:
+            timer.cancel()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+
+from insalata.LeaseScheduler import LeaseScheduler
+
+TIMEOUT = 20
+RESOLUTION = 0.01
+
+class LeaseSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = LeaseScheduler("test", resolution=RESOLUTION)
+        self.expired = list()
+        self.event = threading.Event()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def expire(self, name):
+        self.expired.append(name)
+        self.event.set()
+
+    def testLeasesExpireInOrder(self):
+        self.scheduler.schedule(0.2, self.expire, ["late"])
+        self.scheduler.schedule(0.05, self.expire, ["early"])
+        self.assertEqual(self.scheduler.getLeaseCount(), 2)
+        deadline = time.monotonic() + TIMEOUT
+        while len(self.expired) < 2 and time.monotonic() < deadline:
+            time.sleep(RESOLUTION)
+        self.assertEqual(self.expired, ["early", "late"])
+        self.assertEqual(self.scheduler.getLeaseCount(), 0)
+
+    def testRenewedLeaseDoesNotExpire(self):
+        lease = self.scheduler.schedule(0.1, self.expire, ["lease"])
+        for i in range(5):
+            time.sleep(0.05)
+            self.assertTrue(lease.renew())
+        self.assertEqual(self.expired, [])
+        self.assertTrue(self.event.wait(TIMEOUT))
+        self.assertTrue(lease.getOver())
+        self.assertFalse(lease.renew()) #Expired leases have to be replaced
+
+    def testCanceledLeaseDoesNotExpire(self):
+        lease = self.scheduler.schedule(0.05, self.expire, ["lease"])
+        lease.cancel()
+        self.assertEqual(self.scheduler.getLeaseCount(), 0)
+        self.assertIsNone(lease.getRemaining())
+        self.assertFalse(self.event.wait(0.2))
+
+    def testInfiniteLeaseIsNotScheduled(self):
+        lease = self.scheduler.schedule(-1, self.expire, ["lease"])
+        self.assertEqual(self.scheduler.getLeaseCount(), 0)
+        self.assertIsNone(lease.getRemaining())
+
+    def testExtendKeepsTheDuration(self):
+        lease = self.scheduler.schedule(10, self.expire, ["lease"])
+        self.assertTrue(lease.extend(20))
+        self.assertGreater(lease.getRemaining(), 20)
+        self.assertEqual(lease.duration, 10)
+        lease.cancel()
+        self.assertFalse(lease.extend(20))
+
+    def testPausedClockKeepsTheRemainingTime(self):
+        lease = self.scheduler.schedule(0.1, self.expire, ["lease"])
+        self.scheduler.pauseClock()
+        self.assertTrue(self.scheduler.isPaused())
+        remaining = lease.getRemaining()
+        now = self.scheduler.now()
+        time.sleep(0.3)
+        self.assertEqual(self.scheduler.now(), now)
+        self.assertEqual(lease.getRemaining(), remaining)
+        self.assertEqual(self.expired, [])
+
+        self.scheduler.resumeClock()
+        self.assertFalse(self.scheduler.isPaused())
+        self.assertTrue(self.event.wait(TIMEOUT))
+        self.assertEqual(self.expired, ["lease"])
+
+    def testBatchIsExecutedUnderTheLock(self):
+        held = threading.local()
+        class Lock:
+            def __enter__(self):
+                held.value = True
+            def __exit__(self, *args):
+                held.value = False
+        scheduler = LeaseScheduler("locked", resolution=RESOLUTION, lock=Lock)
+        try:
+            scheduler.schedule(0.01, lambda: self.expire(getattr(held, "value", False)))
+            self.assertTrue(self.event.wait(TIMEOUT))
+            self.assertEqual(self.expired, [True])
+        finally:
+            scheduler.stop()
+
+    def testJournalRecordsRenewedLeases(self):
+        lease = self.scheduler.schedule(10, self.expire, ["lease"])
+        self.scheduler.record("collector", lease) #Ignored without journal
+        self.assertEqual(self.scheduler.takeJournal("collector"), set())
+
+        self.scheduler.keepJournal("collector")
+        self.scheduler.record("collector", lease)
+        self.assertEqual(self.scheduler.takeJournal("collector"), {lease})
+        self.assertEqual(self.scheduler.takeJournal("collector"), set()) #A new journal was started
+
+if __name__ == '__main__':
+    unittest.main()
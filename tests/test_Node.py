@@ -0,0 +1,95 @@
+import unittest
+
+from insalata.model.Edge import Edge, PART_OF
+from insalata.model.Host import Host
+from insalata.model.Interface import Interface
+from insalata.model.Layer3Address import Layer3Address
+from insalata.model.Location import Location
+from insalata.model.Node import Node
+from insalata.model.PartOfEdge import PartOfEdge
+from insalata.model.Route import Route
+
+class Part(Node):
+    """
+    Node whose global ID is prefixed with the global ID of the node it is part of.
+    """
+    def __init__(self, name):
+        Node.__init__(self)
+        self.name = name
+        self.computed = 0
+
+    def getGlobalID(self):
+        return self.getCachedGlobalID(self.__computeGlobalID)
+
+    def __computeGlobalID(self):
+        self.computed += 1
+        containers = [e.getOther(self) for e in self.getEdges() if e.getKind(self) == PART_OF]
+        return containers[0].getGlobalID() + "/" + self.name if containers else self.name
+
+class NodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.host = Host("host")
+        self.interfaces = [Interface("00:16:3e:00:00:0{0}".format(i)) for i in range(3)]
+        self.location = Location("location")
+        self.edges = [Edge(self.host, interface) for interface in self.interfaces]
+        Edge(self.host, self.location)
+
+    def testNeighborsAreBucketedByClass(self):
+        self.assertEqual(self.host.getAllNeighbors(Interface), frozenset(self.interfaces))
+        self.assertEqual(self.host.getAllNeighbors(Location), frozenset([self.location]))
+        self.assertEqual(self.host.getAllNeighbors(Layer3Address), frozenset())
+        self.assertEqual(len(self.host.getAllNeighbors()), 4)
+        self.assertEqual(len(self.host.getAllNeighbors(Node)), 4) #Buckets of all subclasses
+        self.assertEqual(self.host.getEdges(Interface), frozenset(self.edges))
+        self.assertEqual(self.interfaces[0].getAllNeighbors(Host), frozenset([self.host]))
+
+    def testRemovedEdgesLeaveTheirBucket(self):
+        self.edges[0].delete()
+        self.assertEqual(self.host.getAllNeighbors(Interface), frozenset(self.interfaces[1:]))
+        self.assertEqual(self.interfaces[0].getAllNeighbors(), frozenset())
+        for edge in self.edges[1:]:
+            edge.delete()
+        self.assertEqual(self.host.getEdges(Interface), frozenset())
+        self.assertEqual(self.host.getAllNeighbors(), frozenset([self.location]))
+
+    def testEdgesToANeighbor(self):
+        self.assertEqual(self.host.getEdgesTo(self.interfaces[1]), [self.edges[1]])
+        self.assertEqual(self.host.getEdgesTo(Interface("00:16:3e:00:00:09")), [])
+        self.assertEqual(self.host.getEdgesTo(None), [])
+
+    def testSingleValuedAssociationIsCached(self):
+        self.assertIs(self.host.getLocation(), self.location)
+        other = Location("other")
+        self.host.setLocation(other)
+        self.assertIs(self.host.getLocation(), other) #The cache was dropped with the edge
+        self.assertIsNone(self.interfaces[0].getNetwork())
+
+    def testGlobalIDFollowsTheContainer(self):
+        route = Route("0.0.0.0", "0.0.0.0", "10.0.0.254")
+        self.assertEqual(route.getGlobalID(), route.getID())
+        self.host.addRoute(route)
+        self.assertEqual(route.getGlobalID(), "host_" + route.getID())
+        for edge in route.getEdges():
+            edge.delete()
+        self.assertEqual(route.getGlobalID(), route.getID())
+
+        address = Layer3Address("10.0.0.1")
+        self.assertEqual(address.getGlobalID(), "10.0.0.1")
+        self.interfaces[0].addAddress(address)
+        self.assertEqual(address.getGlobalID(), "enx00163e000000_10.0.0.1")
+
+    def testGlobalIDsOfPartsAreInvalidated(self):
+        nodes = [Part(name) for name in ("a", "b", "c")]
+        PartOfEdge(nodes[1], nodes[0])
+        PartOfEdge(nodes[2], nodes[1])
+        self.assertEqual(nodes[2].getGlobalID(), "a/b/c")
+        self.assertEqual(nodes[2].getGlobalID(), "a/b/c")
+        self.assertEqual(nodes[2].computed, 1) #Cached
+
+        PartOfEdge(nodes[0], Part("root"))
+        self.assertEqual(nodes[2].getGlobalID(), "root/a/b/c") #Dropped along the parts of the changed node
+        self.assertEqual(nodes[2].computed, 2)
+
+if __name__ == '__main__':
+    unittest.main()
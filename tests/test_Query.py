@@ -0,0 +1,74 @@
+import json
+import unittest
+
+from insalata.model.Graph import Graph
+from insalata.model.Host import Host
+from insalata.model.Query import Query, parse
+
+class QueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph("graph")
+        network = self.graph.getOrCreateLayer2Network("network", "collector", 600)
+        for i in range(5):
+            host = self.graph.getOrCreateHost("host{0}".format(i), "collector", 600)
+            host.setCPUs(i + 1, "collector", 600)
+            interface = self.graph.getOrCreateInterface("00:16:3e:00:00:0{0}".format(i), "collector", 600)
+            host.addInterface(interface, "collector", 600)
+            interface.setMtu(9000 if i % 2 == 0 else 1500, "collector", 600)
+            if i < 3:
+                interface.setNetwork(network, "collector", 600)
+
+    def tearDown(self):
+        self.graph.stop()
+
+    def ids(self, expression, **kwargs):
+        return [result["id"] for result in parse(expression).execute(self.graph, **kwargs)["results"]]
+
+    def testParser(self):
+        query = Query("Host where cpus >= 2 and (interface.mtu = 9000 or not interface.l2network)")
+        self.assertIs(query.type, Host)
+        self.assertEqual(query.condition[0], "and")
+        self.assertEqual(query.condition[1][0], ("compare", ["cpus"], ">=", 2))
+        self.assertEqual(query.condition[1][1][0], "or")
+        self.assertEqual(query.condition[1][1][1][1], ("not", ("compare", ["interface", "l2network"], None, None)))
+        self.assertEqual(Query("hosts where id in ('a', \"b\\\"c\", 1.5, null)").condition, ("compare", ["id"], "in", ["a", 'b"c', 1.5, None]))
+        self.assertIsNone(Query("Host").condition)
+        self.assertIs(parse("Host"), parse("Host")) #Cached
+
+        for expression in ["Unknown", "Host where", "Host where cpus >", "Host where (cpus = 1", "Host cpus", "Host where cpus = 1 and", "Host where $"]:
+            with self.assertRaises(ValueError, msg=expression):
+                Query(expression)
+
+    def testConditions(self):
+        self.assertEqual(self.ids("Host where cpus > 3"), ["host3", "host4"])
+        self.assertEqual(self.ids("Host where interface.mtu = 9000 and cpus != 1"), ["host2", "host4"])
+        self.assertEqual(self.ids("Host where not interface.l2network"), ["host3", "host4"])
+        self.assertEqual(self.ids("Host where interface.l2network.id = 'network'"), ["host0", "host1", "host2"]) #Seeded by the index
+        self.assertEqual(self.ids("Host where id = 'unknown'"), [])
+        self.assertEqual(self.ids("Host where id ~ '[02]$'"), ["host0", "host2"])
+        self.assertEqual(self.ids("Interface where mtu in (1500)"), ["enx00163e000001", "enx00163e000003"])
+
+    def testPagination(self):
+        pages = list()
+        cursor = None
+        while cursor != "":
+            page = parse("Host").execute(self.graph, limit=2, cursor=cursor)
+            pages.append([result["id"] for result in page["results"]])
+            cursor = page["cursor"]
+        self.assertEqual(pages, [["host0", "host1"], ["host2", "host3"], ["host4"]])
+
+        self.assertEqual(len(self.ids("Host", limit=0)), 1) #At least one result per page
+        self.assertEqual(len(self.ids("Host", limit=5)), 5)
+        self.assertEqual(parse("Host").execute(self.graph, limit=5)["cursor"], "") #No further page
+        self.assertEqual(self.ids("Host", cursor=json.dumps(["host3", "Host"])), ["host4"])
+        with self.assertRaises(ValueError):
+            parse("Host").execute(self.graph, cursor="{")
+
+    def testResultValues(self):
+        result = parse("Host where id = 'host1'").execute(self.graph)["results"][0]
+        self.assertEqual(result["type"], "Host")
+        self.assertEqual(result["values"]["cpus"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
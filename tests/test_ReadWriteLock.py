@@ -0,0 +1,73 @@
+import threading
+import time
+import unittest
+
+from insalata.helper.ReadWriteLock import ReadWriteLock
+
+TIMEOUT = 20
+
+class ReadWriteLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def start(self, target):
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def testReadersShareTheLock(self):
+        entered = threading.Event()
+        def read():
+            with self.lock.reading():
+                entered.set()
+        with self.lock.reading():
+            self.start(read)
+            self.assertTrue(entered.wait(TIMEOUT))
+
+    def testWaitingWriterIsPreferred(self):
+        order = list()
+        def write():
+            with self.lock.writing():
+                order.append("writer")
+        def read():
+            with self.lock.reading():
+                order.append("reader")
+
+        with self.lock.reading():
+            writer = self.start(write)
+            while self.lock.getStatistics()["waitingWriters"] == 0:
+                time.sleep(0.01)
+            reader = self.start(read) #Waits behind the writer although the lock is only read
+            time.sleep(0.1)
+            self.assertEqual(order, [])
+        writer.join(TIMEOUT)
+        reader.join(TIMEOUT)
+        self.assertEqual(order, ["writer", "reader"])
+        self.assertEqual(self.lock.getStatistics()["contendedReads"], 1)
+
+    def testReentrantAcquisition(self):
+        with self.lock.writing():
+            with self.lock.writing():
+                with self.lock.reading(): #A writer may read
+                    self.assertTrue(self.lock.isWriting())
+            self.assertTrue(self.lock.isWriting())
+        self.assertFalse(self.lock.isWriting())
+        self.assertEqual(self.lock.getStatistics()["writes"], 2)
+
+    def testUpgradeIsRefused(self):
+        with self.lock.reading():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquireWrite()
+        with self.lock.writing(): #The lock is still usable
+            pass
+
+    def testReleaseWithoutHolding(self):
+        with self.assertRaises(RuntimeError):
+            self.lock.releaseWrite()
+        with self.assertRaises(RuntimeError):
+            self.lock.releaseRead()
+
+if __name__ == '__main__':
+    unittest.main()
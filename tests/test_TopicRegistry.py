@@ -0,0 +1,96 @@
+import gc
+import unittest
+
+from insalata.model.Graph import Graph
+from insalata.model.Host import Host
+from insalata.model.Service import Service
+from insalata.model.DhcpService import DhcpService
+from insalata.model.TopicRegistry import TopicRegistry
+
+class TopicRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = TopicRegistry()
+        self.events = list()
+
+    def handler(self, sender, args):
+        self.events.append(args["member"] if "member" in args else args["object"])
+
+    def testFilters(self):
+        self.registry.subscribe(self.handler, types={Service}, kinds={"changed"}, members={"version"})
+        self.assertTrue(self.registry.wants("changed", DhcpService, "version")) #Subclasses match
+        self.assertFalse(self.registry.wants("changed", DhcpService, "product"))
+        self.assertFalse(self.registry.wants("changed", Host, "version"))
+        self.assertFalse(self.registry.wants("new", Service))
+
+        self.registry.publish("changed", DhcpService, None, { "member" : "product" })
+        self.registry.publish("changed", DhcpService, None, { "member" : "version" })
+        self.registry.publish("changed", Host, None, { "member" : "version" })
+        self.assertEqual(self.events, ["version"])
+
+    def testMembersOnlyRestrictChanges(self):
+        self.registry.subscribe(self.handler, members={"cpu"})
+        self.assertTrue(self.registry.wants("new", Host))
+        self.assertTrue(self.registry.wants("deleted", Host))
+        self.assertFalse(self.registry.wants("changed", Host, "memoryMin"))
+
+    def testCancelledSubscriptionIsDropped(self):
+        subscription = self.registry.subscribe(self.handler, kinds={"new"})
+        self.assertTrue(self.registry.wants("new", Host)) #Cached
+        subscription.cancel()
+        subscription.cancel()
+        self.assertEqual(self.registry.getSubscriptionCount(), 0)
+        self.assertFalse(self.registry.wants("new", Host)) #The cache was dropped
+        self.registry.publish("new", Host, None, { "object" : "host" })
+        self.assertEqual(self.events, [])
+
+    def testWeakSubscription(self):
+        class Handler:
+            def __call__(self, sender, args):
+                pass
+        handler = Handler()
+        subscription = self.registry.subscribe(handler, weak=True)
+        del handler
+        gc.collect()
+        self.assertFalse(subscription.isActive())
+        self.assertEqual(self.registry.getSubscriptionCount(), 0)
+
+    def testUnknownKind(self):
+        with self.assertRaises(ValueError):
+            self.registry.subscribe(self.handler, kinds={"unknown"})
+
+class GraphTopicTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph("graph")
+        self.host = self.graph.getOrCreateHost("host", "collector", 600)
+        self.events = list()
+
+    def tearDown(self):
+        self.graph.stop()
+
+    def testChangesAreDeliveredByMember(self):
+        self.assertFalse(self.host.wants("cpu")) #Nobody consumes the arguments
+        self.host.setCPUs(2, "collector", 600)
+
+        self.graph.subscribe(lambda sender, args: self.events.append((args["member"], args["value"])), types={Host}, members={"cpu"})
+        self.assertTrue(self.host.wants("cpu"))
+        self.assertFalse(self.host.wants("powerState"))
+        self.host.setCPUs(4, "collector", 600)
+        self.host.setPowerState("running", "collector", 600)
+        self.assertEqual(self.events, [("cpu", 4)])
+        self.assertEqual(self.host.getPowerState(), "running")
+
+    def testVersionAdvancesWithoutConsumer(self):
+        version = self.graph.getVersion()
+        self.host.setCPUs(2, "collector", 600)
+        self.assertEqual(self.graph.getVersion(), version + 1)
+
+    def testPlainEventsWantEveryChange(self):
+        self.graph.getObjectChangedEvent().add(lambda sender, args: self.events.append(args["member"]))
+        self.assertTrue(self.host.wants("powerState"))
+        self.host.setPowerState("running", "collector", 600)
+        self.assertEqual(self.events, ["powerState"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from insalata.model.Graph import Graph
+
+class TransactionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph("graph")
+        self.changeSets = list()
+        self.graph.getChangeSetEvent().add(lambda sender, changeSet: self.changeSets.append(changeSet))
+        self.host = self.graph.getOrCreateHost("host", "collector", 600)
+
+    def tearDown(self):
+        self.graph.stop()
+
+    def testLastValueWins(self):
+        with self.graph.transaction("collector", 600):
+            for cpus in range(1, 5):
+                self.host.setCPUs(cpus, "collector", 600)
+
+        self.assertEqual(len(self.changeSets), 1)
+        changeSet = self.changeSets[0]
+        self.assertFalse(changeSet["aborted"])
+        self.assertIsNone(changeSet["error"])
+        self.assertEqual([(args["member"], args["value"]) for args in changeSet["changed"]], [("cpu", 4)])
+
+    def testRestoredAssociationCancels(self):
+        first = self.graph.getOrCreateLayer2Network("first", "collector", 600)
+        second = self.graph.getOrCreateLayer2Network("second", "collector", 600)
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        interface.setNetwork(first, "collector", 600)
+
+        with self.graph.transaction("collector", 600):
+            interface.setNetwork(second, "collector", 600)
+            interface.setNetwork(first, "collector", 600)
+            self.host.setCPUs(2, "collector", 600)
+
+        self.assertEqual(len(self.changeSets), 1)
+        self.assertEqual([args["member"] for args in self.changeSets[0]["changed"]], ["cpu"])
+        self.assertIs(interface.getNetwork(), first)
+
+    def testCreatedAndDeletedObjectIsDropped(self):
+        with self.graph.transaction("collector", 600):
+            host = self.graph.getOrCreateHost("temporary", "collector", 600)
+            host.setCPUs(2, "collector", 600)
+            host.delete()
+            self.host.setCPUs(2, "collector", 600)
+
+        changeSet = self.changeSets[0]
+        self.assertEqual(changeSet["new"], [])
+        self.assertEqual(changeSet["deleted"], [])
+        self.assertEqual([args["object"] for args in changeSet["changed"]], ["host"])
+
+    def testDeletedObjectDropsItsChanges(self):
+        with self.graph.transaction("collector", 600):
+            self.host.setCPUs(2, "collector", 600)
+            self.host.delete()
+
+        changeSet = self.changeSets[0]
+        self.assertEqual(changeSet["changed"], [])
+        self.assertEqual(len(changeSet["deleted"]), 1)
+
+    def testFailedTransactionIsPublishedAsAborted(self):
+        with self.assertRaises(ValueError):
+            with self.graph.transaction("collector", 600):
+                self.host.setCPUs(2, "collector", 600)
+                raise ValueError("collector failed")
+
+        self.assertEqual(len(self.changeSets), 1)
+        changeSet = self.changeSets[0]
+        self.assertTrue(changeSet["aborted"])
+        self.assertEqual(changeSet["error"], "ValueError: collector failed")
+        self.assertEqual(len(changeSet["changed"]), 1)
+        self.assertFalse(self.graph.holdsLock()) #The lock is released
+
+    def testNestedTransactionsArePublishedOnce(self):
+        with self.graph.transaction("collector", 600):
+            with self.graph.transaction("collector", 600):
+                self.host.setCPUs(2, "collector", 600)
+            self.assertEqual(self.changeSets, [])
+        self.assertEqual(len(self.changeSets), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from insalata.model.Graph import Graph
+from insalata.model.WriteAheadLog import WriteAheadLog, SUFFIX
+
+class WriteAheadLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint")
+        self.graphs = list()
+        self.graph = self.newGraph()
+        self.log = WriteAheadLog(self.graph, self.path, fsyncInterval=3600) #Records are committed by flush
+        self.log.start()
+
+        self.location = self.graph.getOrCreateLocation("location", "collector", 600)
+        self.host = self.graph.getOrCreateHost("host", "collector", 600, self.location)
+
+    def tearDown(self):
+        self.log.stop()
+        for graph in self.graphs:
+            graph.stop()
+        self.directory.cleanup()
+
+    def newGraph(self):
+        graph = Graph("graph")
+        self.graphs.append(graph)
+        return graph
+
+    def recover(self):
+        graph = self.newGraph()
+        return graph, WriteAheadLog(graph, self.path).recover()
+
+    def segments(self):
+        return sorted(f for f in os.listdir(self.directory.name) if f.endswith(SUFFIX))
+
+    def testRecoveryReplaysTheRecords(self):
+        self.log.flush()
+        self.host.setCPUs(4, "collector", 600)
+        interface = self.graph.getOrCreateInterface("00:16:3e:00:00:01", "collector", 600)
+        self.host.addInterface(interface, "collector", 600)
+        self.graph.getOrCreateHost("deleted", "collector", 600).delete()
+        self.assertGreater(self.log.flush(), 0)
+
+        graph, result = self.recover()
+        self.assertEqual(result["records"], 2)
+        self.assertEqual(result["version"], self.graph.getVersion())
+        self.assertEqual(graph.getVersion(), self.graph.getVersion())
+        host = graph.getHost("host")
+        self.assertEqual(host.getCPUs(), 4)
+        self.assertEqual(host.getLocation().getID(), "location")
+        self.assertEqual([i.getMAC() for i in host.getInterfaces()], ["00:16:3e:00:00:01"])
+        self.assertIsNone(graph.getHost("deleted"))
+
+    def testTornRecordEndsTheReplay(self):
+        self.host.setCPUs(2, "collector", 600)
+        self.log.flush()
+        segment = os.path.join(self.directory.name, self.segments()[-1])
+        self.host.setCPUs(8, "collector", 600)
+        self.log.flush()
+        with open(segment, "r+b") as fileHandler: #Cut the last record
+            fileHandler.truncate(os.path.getsize(segment) - 1)
+
+        graph, result = self.recover()
+        self.assertEqual(result["records"], 1)
+        self.assertEqual(graph.getHost("host").getCPUs(), 2)
+
+    def testCheckpointRemovesTheSegments(self):
+        self.host.setCPUs(2, "collector", 600)
+        self.log.flush()
+        self.assertEqual(len(self.segments()), 1)
+        self.log.checkpoint()
+        self.assertEqual(self.segments(), [])
+        self.assertEqual(self.log.getStatistics()["checkpoints"], 2)
+
+        graph, result = self.recover()
+        self.assertEqual(result["records"], 0)
+        self.assertEqual(graph.getHost("host").getCPUs(), 2)
+
+    def testNothingToRecover(self):
+        self.assertIsNone(WriteAheadLog(self.newGraph(), os.path.join(self.directory.name, "missing")).recover())
+
+if __name__ == '__main__':
+    unittest.main()